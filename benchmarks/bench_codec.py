@@ -0,0 +1,85 @@
+"""
+Micro-benchmarks of the JSON codecs: encoding of commands, decoding of sync
+responses, and round-trips of the local cache.
+
+    $ pip install -e .
+    $ python benchmarks/bench_codec.py
+"""
+import datetime
+import timeit
+
+from todoist import models
+from todoist.api import state_default
+from todoist.codec import CODECS
+
+
+def make_commands(count=100):
+    return [
+        {
+            "type": "item_update",
+            "uuid": "a7c8a7b2-0e3b-11eb-adc1-0242ac120002",
+            "args": {
+                "id": 1000000 + i,
+                "content": "Task number %d" % i,
+                "due": {"date": datetime.date(2020, 1, 1 + i % 28)},
+                "priority": i % 4 + 1,
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def make_sync_data(count=10000):
+    return {
+        "sync_token": "token",
+        "full_sync": True,
+        "items": [
+            {
+                "id": 1000000 + i,
+                "content": "Task number %d" % i,
+                "project_id": 2000 + i % 50,
+                "section_id": None,
+                "labels": [3000 + i % 7],
+                "priority": i % 4 + 1,
+                "checked": 0,
+                "due": {"date": "2020-01-%02d" % (1 + i % 28), "is_recurring": False},
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def available_codecs():
+    for codec_class in CODECS:
+        try:
+            yield codec_class()
+        except ImportError:
+            pass
+
+
+def bench(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print("  %-30s %10.3f ms" % (name, seconds * 1000))
+
+
+def main():
+    commands = make_commands()
+    sync_data = make_sync_data()
+    state = {"items": [models.Item(item, None) for item in sync_data["items"]]}
+
+    for codec in available_codecs():
+        print(codec.name)
+        body = codec.dumps(sync_data).encode("utf-8")
+        cache = codec.dumps(state, default=state_default, pretty=True)
+        bench("encode 100 commands", lambda: codec.dumps(commands), 200)
+        bench("decode sync (10k items)", lambda: codec.loads(body), 10)
+        bench(
+            "cache write (10k items)",
+            lambda: codec.dumps(state, default=state_default, pretty=True),
+            10,
+        )
+        bench("cache read (10k items)", lambda: codec.loads(cache), 10)
+
+
+if __name__ == "__main__":
+    main()
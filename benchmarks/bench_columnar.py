@@ -0,0 +1,77 @@
+"""
+Statistics over 100k items: loops over the models of the local state,
+compared with the columnar copy of the items.
+
+    $ pip install -e .
+    $ python benchmarks/bench_columnar.py
+"""
+import collections
+import timeit
+
+from todoist.api import TodoistAPI
+from todoist.models import Item
+
+COUNT = 100000
+
+
+def make_api(count=COUNT):
+    api = TodoistAPI("token", cache=None)
+    api.state["items"] = [
+        Item(
+            {
+                "id": 1000000 + i,
+                "content": "Task number %d" % i,
+                "project_id": 2000 + i % 50,
+                "priority": i % 4 + 1,
+                "checked": int(i % 7 == 0),
+                "due": (
+                    {"date": "2020-%02d-%02d" % (1 + i % 12, 1 + i % 28)}
+                    if i % 3
+                    else None
+                ),
+            },
+            api,
+        )
+        for i in range(count)
+    ]
+    return api
+
+
+def loop_stats(items):
+    priorities = collections.Counter(item["priority"] for item in items)
+    days = collections.Counter(
+        item["due"]["date"][:10] for item in items if item["due"] is not None
+    )
+    totals, done = collections.Counter(), collections.Counter()
+    for item in items:
+        totals[item["project_id"]] += 1
+        done[item["project_id"]] += item["checked"]
+    rates = dict((key, float(done[key]) / totals[key]) for key in totals)
+    return priorities, days, rates
+
+
+def columnar_stats(columns):
+    return (
+        columns.count_by("priority"),
+        columns.count_by_date("due"),
+        columns.completion_rates(by="project_id"),
+    )
+
+
+def main():
+    api = make_api()
+    items = api.state["items"]
+    print("%d items" % COUNT)
+    seconds = min(timeit.repeat(lambda: api.enable_item_columns(), number=1, repeat=3))
+    print("  %-28s %8.1f ms" % ("building the columns", seconds * 1000))
+    columns = api.item_columns
+    for name, func in [
+        ("loops over the models", lambda: loop_stats(items)),
+        ("columnar", lambda: columnar_stats(columns)),
+    ]:
+        seconds = min(timeit.repeat(func, number=1, repeat=5))
+        print("  %-28s %8.1f ms" % (name, seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Queries of the items due within a week, and of the Today view, among 100k
+items: parsing and filtering the due dates of every item (and joining them
+with the day orders), compared with the indexes of the items manager.
+
+    $ pip install -e .
+    $ python benchmarks/bench_due.py
+"""
+import datetime
+import timeit
+
+from todoist.api import TodoistAPI
+from todoist.models import Item, parse_due_date
+
+COUNT = 100000
+START = datetime.datetime(2020, 3, 2)
+END = START + datetime.timedelta(days=7)
+TODAY = START.date()
+
+
+def make_api(count=COUNT):
+    api = TodoistAPI("token", cache=None)
+    api.state["items"] = [
+        Item(
+            {
+                "id": 1000000 + i,
+                "content": "Task number %d" % i,
+                "due": (
+                    {"date": "2020-%02d-%02dT10:00:00" % (1 + i % 12, 1 + i % 28)}
+                    if i % 3
+                    else None
+                ),
+            },
+            api,
+        )
+        for i in range(count)
+    ]
+    api.state["day_orders"] = dict((str(1000000 + i), i % 50) for i in range(count))
+    return api
+
+
+def scan(items):
+    due = []
+    for item in items:
+        if item["due"] is not None:
+            date = parse_due_date(item["due"]["date"])
+            if START <= date < END:
+                due.append((date, item))
+    due.sort(key=lambda pair: pair[0])
+    return [item for _, item in due]
+
+
+def scan_today(items, day_orders):
+    today = []
+    for item in items:
+        if item["due"] is not None:
+            date = parse_due_date(item["due"]["date"]).date()
+            if date <= TODAY:
+                order = day_orders.get(str(item["id"]), -1)
+                today.append((date < TODAY, date, order, item))
+    today.sort(key=lambda entry: (not entry[0], entry[1], entry[2]))
+    return [entry[-1] for entry in today]
+
+
+def main():
+    api = make_api()
+    items = api.state["items"]
+    print("%d items, %d due within the week" % (COUNT, len(scan(items))))
+    seconds = min(timeit.repeat(lambda: api.items.due_index, number=1, repeat=1))
+    print("  %-24s %10.2f ms" % ("building the index", seconds * 1000))
+    seconds = min(timeit.repeat(lambda: api.items.day_index, number=1, repeat=1))
+    print("  %-24s %10.2f ms" % ("building the day index", seconds * 1000))
+    day_orders = api.state["day_orders"]
+    for name, func in [
+        ("parsing every item", lambda: scan(items)),
+        ("due_between()", lambda: api.items.due_between(START, END)),
+        ("Today, joining", lambda: scan_today(items, day_orders)),
+        ("today()", lambda: api.items.today(TODAY)),
+    ]:
+        seconds = min(timeit.repeat(func, number=1, repeat=5))
+        print("  %-24s %10.2f ms" % (name, seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Memory saved by interning the repeated values of the local state, on a
+synthetic large account whose items arrive over many syncs.
+
+    $ pip install -e .
+    $ python benchmarks/bench_interning.py
+"""
+import gc
+import json
+import time
+import tracemalloc
+
+from todoist.api import TodoistAPI
+from todoist.models import Item
+
+ITEMS = 50000
+SYNCS = 100
+
+
+def make_syncs(items=ITEMS, syncs=SYNCS):
+    """
+    Returns the bodies of the syncs bringing the items of the account.
+    """
+    per_sync = items // syncs
+    bodies = []
+    for sync in range(syncs):
+        batch = []
+        for n in range(per_sync):
+            i = sync * per_sync + n
+            batch.append(
+                {
+                    "id": 3000000000 + i,
+                    "content": "Task number %d" % i,
+                    "project_id": 2200000000 + i % 40,
+                    "section_id": 2300000000 + i % 120 if i % 3 else None,
+                    "user_id": 1000000,
+                    "added_by_uid": 1000000,
+                    "responsible_uid": None,
+                    "labels": [2100000000 + i % 15],
+                    "priority": i % 4 + 1,
+                    "checked": 0,
+                    "date_added": "2020-01-01T10:%02d:%02dZ" % (i // 60 % 60, i % 60),
+                    "due": {
+                        "date": "2020-%02d-%02d" % (1 + i % 12, 1 + i % 28),
+                        "string": "every day" if i % 5 == 0 else "tomorrow",
+                        "lang": "en",
+                        "is_recurring": i % 5 == 0,
+                        "timezone": None,
+                    },
+                }
+            )
+        bodies.append(json.dumps({"items": batch}))
+    return bodies
+
+
+def load(bodies, intern_values, trace=True):
+    """
+    Loads the items of the syncs into a new API object, as its sync would,
+    and returns it along with the memory it holds and the time it took.
+    `_update_state()` isn't used, as its linear lookup of existing objects
+    would dominate the time.
+    """
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = time.time()
+    api = TodoistAPI("token", cache=None, intern_values=intern_values)
+    items = api.state["items"]
+    for body in bodies:
+        for obj in json.loads(body)["items"]:
+            if api.interner is not None:
+                obj = api.interner.intern(obj)
+            items.append(Item(obj, api))
+    elapsed = time.time() - start
+    if not trace:
+        return api, None, elapsed
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return api, size, elapsed
+
+
+def main():
+    bodies = make_syncs()
+    print("%d items over %d syncs" % (ITEMS, SYNCS))
+    results = {}
+    for intern_values in (False, True):
+        # Timed without tracemalloc, which slows down allocations.
+        elapsed = load(bodies, intern_values, trace=False)[2]
+        api, size = load(bodies, intern_values)[:2]
+        results[intern_values] = size
+        report = api.memory_report()
+        print(
+            "  interning %-3s %8.1f MB held  %6.2f s to merge  "
+            "%8d duplicate strings left"
+            % (
+                "on" if intern_values else "off",
+                size / 1e6,
+                elapsed,
+                report["duplicate_strings"],
+            )
+        )
+        if api.interner is not None:
+            stats = api.interner.stats()
+            print(
+                "  interner: %d values, %d duplicates replaced, %.1f MB saved"
+                % (stats["values"], stats["interned"], stats["saved_bytes"] / 1e6)
+            )
+    saved = results[False] - results[True]
+    print(
+        "  memory saved: %.1f MB (%.0f%%)"
+        % (saved / 1e6, 100.0 * saved / results[False])
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of the models wrapping the objects of the local state: memory per
+object and construction time of 100k items, compared with models keeping
+their attributes in a __dict__.
+
+    $ pip install -e .
+    $ python benchmarks/bench_models.py
+"""
+import gc
+import timeit
+import tracemalloc
+
+from todoist import models
+
+COUNT = 100000
+
+
+class DictItem(object):
+    """
+    Model with the same attributes as `models.Item`, but no __slots__.
+    """
+
+    def __init__(self, data, api):
+        self.temp_id = ""
+        self.data = data
+        self.api = api
+
+
+def make_items(count=COUNT):
+    return [
+        {
+            "id": 1000000 + i,
+            "content": "Task number %d" % i,
+            "project_id": 2000 + i % 50,
+            "priority": i % 4 + 1,
+            "checked": 0,
+        }
+        for i in range(count)
+    ]
+
+
+def dict_bytes(items):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    copies = [dict(item) for item in items]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del copies
+    return float(size) / len(items)
+
+
+def wrapper_bytes(model, items):
+    """
+    Returns the memory allocated by wrapping the items, per item.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    wrapped = [model(item, None) for item in items]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del wrapped
+    return float(size) / len(items)
+
+
+def main():
+    items = make_items()
+    print("%d items, %.1f bytes per data dict" % (COUNT, dict_bytes(items)))
+    for name, model in [("slotted models.Item", models.Item), ("__dict__", DictItem)]:
+        seconds = min(
+            timeit.repeat(lambda: [model(item, None) for item in items], number=1)
+        )
+        print(
+            "  %-20s %8.1f bytes/object %10.1f ms to wrap"
+            % (name, wrapper_bytes(model, items), seconds * 1000)
+        )
+
+
+if __name__ == "__main__":
+    main()
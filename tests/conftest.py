@@ -1,4 +1,8 @@
+import json
+import time
+
 import pytest
+import requests
 
 import todoist
 
@@ -92,3 +96,89 @@ def _cleanup(api_endpoint, api_token):
         if project["name"] != "Inbox":
             project.delete()
     api.commit()
+
+
+class FakeResponse(object):
+    """
+    Stand-in for a `requests.Response`, for the tests that run offline.
+    """
+
+    def __init__(self, data, status_code=200, headers=None):
+        self.data = data
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    @property
+    def text(self):
+        return json.dumps(self.data) if not isinstance(self.data, str) else self.data
+
+    @property
+    def content(self):
+        return self.text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        content = self.content
+        for start in range(0, len(content), chunk_size):
+            end = start + chunk_size
+            yield content[start:end]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(response=self)
+
+
+class FakeSession(object):
+    """
+    Stand-in for a `requests.Session`, which records the requests it gets and
+    replies with the queued responses.  A queued response can be a dict, a
+    `FakeResponse`, an exception to raise, or a callable which gets the
+    request and returns any of those.
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        response = self.responses.pop(0) if self.responses else {}
+        if callable(response):
+            response = response(method, url, kwargs)
+        if isinstance(response, Exception):
+            raise response
+        if not isinstance(response, FakeResponse):
+            response = FakeResponse(response)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def sent_commands(self, index=-1):
+        return json.loads(self.requests[index][2]["data"]["commands"])
+
+
+def wait_for(condition, timeout=5.0):
+    """
+    Waits until a condition is true, for the tests involving background
+    threads, and returns whether it became true before the timeout.
+    """
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def session():
+    return FakeSession()
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path) + "/"
@@ -0,0 +1,49 @@
+from conftest import wait_for
+
+import todoist
+
+
+def test_auto_commit_on_size(session):
+    api = todoist.TodoistAPI("token", session=session, cache=None)
+    api.enable_auto_commit(max_commands=3, max_delay=60)
+    for i in range(3):
+        api.items.delete(i)
+    assert wait_for(lambda: len(session.requests) == 1)
+    assert len(session.sent_commands()) == 3
+    assert len(api.queue) == 0
+    api.disable_auto_commit()
+
+
+def test_auto_commit_on_delay(session):
+    api = todoist.TodoistAPI("token", session=session, cache=None)
+    committer = api.enable_auto_commit(max_commands=100, max_delay=0.05)
+    api.items.delete(1)
+    assert wait_for(lambda: len(session.requests) == 1)
+    stats = committer.stats()
+    assert stats["flushes"] == 1
+    assert stats["flushed_commands"] == 1
+    assert stats["queue_depth"] == 0
+    api.disable_auto_commit()
+
+
+def test_auto_commit_priority(session):
+    api = todoist.TodoistAPI("token", session=session, cache=None)
+    api.enable_auto_commit(max_commands=100, max_delay=60)
+    api.items.delete(1)
+    with api.priority():
+        api.items.complete(2)
+    assert wait_for(lambda: len(session.requests) == 1)
+    assert [c["type"] for c in session.sent_commands()] == [
+        "item_delete",
+        "item_complete",
+    ]
+    api.disable_auto_commit()
+
+
+def test_disable_auto_commit_flushes(session):
+    api = todoist.TodoistAPI("token", session=session, cache=None)
+    api.enable_auto_commit(max_commands=100, max_delay=60)
+    api.items.delete(1)
+    api.disable_auto_commit()
+    assert len(session.requests) == 1
+    assert len(api.queue) == 0
@@ -0,0 +1,45 @@
+import datetime
+import json
+
+import pytest
+
+from todoist.codec import CODECS, JSONCodec, get_codec
+
+
+def available_codecs():
+    codecs = []
+    for codec_class in CODECS:
+        try:
+            codecs.append(codec_class())
+        except ImportError:
+            pass
+    return codecs
+
+
+@pytest.mark.parametrize("codec", available_codecs(), ids=lambda c: c.name)
+def test_codecs_match_stdlib(codec):
+    obj = {
+        "type": "item_add",
+        "args": {
+            "content": "Tâche",
+            "due": {"date": datetime.date(2020, 1, 2)},
+            "date_completed": datetime.datetime(2020, 1, 2, 3, 4, 5),
+            "time": datetime.time(6, 7, 8),
+        },
+        "ids_to_orders": {1: 2},
+    }
+    expected = json.loads(JSONCodec().dumps(obj))
+    assert json.loads(codec.dumps(obj)) == expected
+    assert json.loads(codec.dumps(obj, pretty=True)) == expected
+    assert expected["args"]["date_completed"] == "2020-01-02T03:04:05"
+    assert codec.loads(codec.dumps(obj)) == expected
+    assert codec.loads(codec.dumps(obj).encode("utf-8")) == expected
+
+
+def test_get_codec():
+    assert get_codec("json").name == "json"
+    assert get_codec().name == available_codecs()[0].name
+    codec = JSONCodec()
+    assert get_codec(codec) is codec
+    with pytest.raises(ValueError):
+        get_codec("unknown")
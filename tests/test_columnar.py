@@ -0,0 +1,94 @@
+import datetime
+import subprocess
+import sys
+
+import pytest
+
+from todoist.api import TodoistAPI
+
+numpy = pytest.importorskip("numpy")
+
+
+def make_item(i, **fields):
+    item = {
+        "id": i,
+        "content": "Task %d" % i,
+        "project_id": 10 + i % 2,
+        "section_id": None,
+        "priority": 1 + i % 4,
+        "checked": 0,
+        "due": {"date": "2020-01-%02dT10:00:00Z" % (1 + i % 3)},
+    }
+    item.update(fields)
+    return item
+
+
+def test_item_columns():
+    api = TodoistAPI("token", cache=None)
+    api._update_state({"items": [make_item(i) for i in range(6)]})
+    columns = api.enable_item_columns()
+    assert len(columns) == 6
+    assert columns.count_by("priority") == {1: 2, 2: 2, 3: 1, 4: 1}
+    assert columns.count_by("project_id") == {10: 3, 11: 3}
+    assert columns.count_by_date("due") == {
+        datetime.date(2020, 1, 1): 2,
+        datetime.date(2020, 1, 2): 2,
+        datetime.date(2020, 1, 3): 2,
+    }
+
+    # Sync deltas: an update, a new item, and a deleted one.
+    api._update_state(
+        {
+            "items": [
+                make_item(1, checked=1, due=None),
+                make_item(6, project_id=12),
+                make_item(0, is_deleted=1),
+            ]
+        }
+    )
+    assert len(columns) == 6
+    assert sorted(columns["id"].tolist()) == [1, 2, 3, 4, 5, 6]
+    assert columns.completion_rates() == {10: 0.0, 11: 1.0 / 3, 12: 0.0}
+    mask = columns.where(project_id=[11, 12]) & (columns["checked"] == 0)
+    assert sorted(item["id"] for item in columns.select(mask)) == [3, 5, 6]
+    assert not columns.where(project_id=99).any()
+    assert numpy.isnat(columns["due"][columns.where(id=1)]).all()
+
+    api.disable_item_columns()
+    api._update_state({"items": [make_item(7)]})
+    assert len(columns) == 6
+
+
+def test_item_columns_with_local_items(session):
+    api = TodoistAPI("token", session=session, cache=None, optimistic=True)
+    api._update_state({"user": {"inbox_project": 10}, "items": [make_item(1)]})
+    columns = api.enable_item_columns()
+    item = api.items.add("Local", priority=4)
+    assert len(api.queue) == 1
+    assert len(columns) == 2
+    assert columns["id"][columns.where(priority=4)].tolist() == [-1]
+
+    # Then the real id arrives with the sync.
+    api._replace_temp_id(item.temp_id, 2)
+    api._update_state({"items": [make_item(2, priority=4)]})
+    assert len(columns) == 2
+    assert columns["id"][columns.where(priority=4)].tolist() == [2]
+
+
+def test_item_columns_with_optimistic_delete(session):
+    api = TodoistAPI("token", session=session, cache=None, optimistic=True)
+    api._update_state({"items": [make_item(1), make_item(2)]})
+    columns = api.enable_item_columns()
+    index = api.items.due_index
+    api.items.get_by_id(1, only_local=True).delete()
+    assert len(api.state["items"]) == 1
+    assert columns["id"].tolist() == [2]
+    assert api.items.due_index is index
+
+
+def test_numpy_is_only_imported_once_enabled():
+    code = (
+        "import sys, todoist.api; "
+        "sys.exit('numpy' in sys.modules or 'todoist.columnar' in sys.modules)"
+    )
+    assert subprocess.call([sys.executable, "-c", code]) == 0
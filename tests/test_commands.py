@@ -0,0 +1,191 @@
+import json
+import os
+
+import pytest
+import requests
+
+import todoist
+from todoist import commands
+from todoist.codec import default_codec
+from todoist.commands import CommandJournal, CommandQueue, QueueFull
+
+
+def test_journal_replay_skips_acknowledged_and_duplicates(cache_dir):
+    journal = CommandJournal(cache_dir + "token.queue")
+    journal.record({"type": "item_add", "uuid": "1"})
+    journal.record({"type": "item_add", "uuid": "2"})
+    journal.record({"type": "item_add", "uuid": "1"})
+    journal.acknowledge(["2"])
+    with open(journal.path, "a") as f:
+        f.write('{"cmd": {"type": "item_')  # partial write before a crash
+    assert journal.replay() == [{"type": "item_add", "uuid": "1"}]
+
+
+def test_queue_discard_compacts_journal(cache_dir):
+    journal = CommandJournal(cache_dir + "token.queue")
+    queue = CommandQueue(journal=journal)
+    queue.append({"uuid": "1"})
+    queue.append({"uuid": "2"})
+    queue.discard([{"uuid": "1"}])
+    assert journal.replay() == [{"uuid": "2"}]
+    del queue[:]
+    assert journal.replay() == []
+    queue.append({"uuid": "3"})
+    queue.discard(list(queue))
+    with open(journal.path) as f:
+        assert f.read() == ""
+
+
+def test_journal_compacts_after_acknowledgements(cache_dir):
+    journal = CommandJournal(cache_dir + "token.queue", compact_after=3)
+    queue = CommandQueue(journal=journal)
+    queue.append({"uuid": "0"})
+    for i in range(1, 5):
+        queue.append({"uuid": str(i)})
+        queue.discard([{"uuid": str(i - 1)}])
+    with open(journal.path) as f:
+        assert len(f.readlines()) == 3  # compacted once 3 were acknowledged
+    assert journal.replay() == [{"uuid": "4"}]
+
+
+def test_journal_survives_a_crash_during_compaction(cache_dir, monkeypatch):
+    def crash(src, dst):
+        raise KeyboardInterrupt
+
+    journal = CommandJournal(cache_dir + "token.queue")
+    journal.record({"uuid": "1"})
+    journal.record({"uuid": "2"})
+    journal.acknowledge(["1"])
+    monkeypatch.setattr(commands, "_replace", crash)
+    with pytest.raises(KeyboardInterrupt):
+        journal.compact([{"uuid": "2"}])
+    monkeypatch.undo()
+    assert os.path.exists(journal.path + ".tmp")
+    assert CommandJournal(journal.path).replay() == [{"uuid": "2"}]
+    assert not os.path.exists(journal.path + ".tmp")
+
+    # Journals compacted by removing the previous one first.
+    journal.compact([{"uuid": "2"}, {"uuid": "3"}])
+    os.rename(journal.path, journal.path + ".tmp")
+    assert CommandJournal(journal.path).replay() == [{"uuid": "2"}, {"uuid": "3"}]
+
+
+def test_persisted_queue_resolves_temp_ids_after_restart(session, cache_dir):
+    api = todoist.TodoistAPI(
+        "token", session=session, cache=cache_dir, persist_queue=True
+    )
+    project = api.projects.add("Project")
+    api.items.add("Task", project_id=project["id"])
+
+    def reply(method, url, kwargs):
+        cmd = json.loads(kwargs["data"]["commands"])[0]
+        return {
+            "sync_status": {cmd["uuid"]: "ok"},
+            "temp_id_mapping": {cmd["temp_id"]: 100},
+        }
+
+    session.responses = [reply, requests.ConnectionError()]
+    assert api.drain(batch_size=1) == 1
+
+    # Crash, and restart.
+    api = todoist.TodoistAPI(
+        "token", session=session, cache=cache_dir, persist_queue=True
+    )
+    session.responses = [{"sync_status": {api.queue[0]["uuid"]: "ok"}}]
+    api.drain()
+    assert session.sent_commands()[0]["args"]["project_id"] == 100
+
+
+def test_persisted_queue_survives_restart(session, cache_dir):
+    api = todoist.TodoistAPI(
+        "token", session=session, cache=cache_dir, persist_queue=True
+    )
+    api.state["user"]["inbox_project"] = 1
+    api.items.add("Task1")
+    api.items.add("Task2")
+
+    api = todoist.TodoistAPI(
+        "token", session=session, cache=cache_dir, persist_queue=True
+    )
+    assert [cmd["args"]["content"] for cmd in api.queue] == ["Task1", "Task2"]
+
+
+def test_drain_sends_batches_and_keeps_unsent(session, cache_dir):
+    api = todoist.TodoistAPI(
+        "token", session=session, cache=cache_dir, persist_queue=True
+    )
+    for i in range(5):
+        api.items.delete(i)
+    session.responses = [{}, requests.ConnectionError()]
+    assert api.drain(batch_size=2) == 2
+    assert len(session.sent_commands(0)) == 2
+    assert [cmd["args"]["id"] for cmd in api.queue] == [2, 3, 4]
+
+    api = todoist.TodoistAPI(
+        "token", session=session, cache=cache_dir, persist_queue=True
+    )
+    assert [cmd["args"]["id"] for cmd in api.queue] == [2, 3, 4]
+    assert api.drain(batch_size=2) == 3
+    assert len(api.queue) == 0
+
+
+def test_bounded_queue_raises_when_full():
+    queue = CommandQueue()
+    queue.set_limits(max_commands=2, block=False)
+    queue.append({"uuid": "1"})
+    queue.append({"uuid": "2"})
+    with pytest.raises(QueueFull):
+        queue.append({"uuid": "3"})
+    queue.discard([{"uuid": "1"}])
+    queue.append({"uuid": "3"})
+
+
+def test_bounded_queue_by_bytes():
+    queue = CommandQueue()
+    queue.set_limits(max_bytes=40, block=True, timeout=0.01)
+    queue.append({"uuid": "1", "args": {"content": "x" * 10}})
+    with pytest.raises(QueueFull):
+        queue.append({"uuid": "2", "args": {"content": "x" * 10}})
+    queue.discard([{"uuid": "1"}])
+    assert queue.size_bytes == 0
+
+
+def test_bounded_queue_measures_with_its_codec(cache_dir):
+    class Codec(object):
+        def dumps(self, obj, **kwargs):
+            return json.dumps(obj, indent=4)
+
+        def loads(self, data):
+            return json.loads(data)
+
+    cmd = {"uuid": "1", "args": {"content": "x"}}
+    queue = CommandQueue(codec=Codec())
+    queue.set_limits(max_bytes=1000)
+    queue.append(cmd)
+    assert queue.size_bytes == len(json.dumps(cmd, indent=4))
+
+    # Commands replayed from the journal are counted as well.
+    journal = CommandJournal(cache_dir + "token.queue")
+    journal.record(cmd)
+    queue = CommandQueue()
+    queue.set_limits(max_bytes=1000)
+    queue.attach_journal(journal)
+    assert queue.size_bytes == len(default_codec.dumps(cmd))
+
+
+def test_bounded_queue_blocks_until_committed(session):
+    api = todoist.TodoistAPI("token", session=session, cache=None)
+    api.queue.set_limits(max_commands=5)
+    api.enable_auto_commit(max_commands=100, max_delay=60)
+    max_depth = 0
+    for i in range(50):
+        api.items.delete(i)
+        max_depth = max(max_depth, len(api.queue))
+    api.disable_auto_commit()
+    assert max_depth <= 5
+    sent = [
+        cmd["args"]["id"]
+        for i in range(len(session.requests))
+        for cmd in session.sent_commands(i)
+    ]
+    assert sent == list(range(50))
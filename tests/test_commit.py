@@ -0,0 +1,163 @@
+import json
+
+import pytest
+import requests
+from conftest import FakeResponse
+
+import todoist
+from todoist.api import SyncError
+from todoist.backoff import Backoff
+
+TRANSIENT = {"error": "Service unavailable", "http_code": 503}
+PERMANENT = {"error": "Invalid argument", "http_code": 400}
+
+
+@pytest.fixture
+def api(session):
+    api = todoist.TodoistAPI("token", session=session, cache=None)
+    api.backoff = Backoff(base=0, jitter=False)
+    return api
+
+
+def statuses(**errors):
+    """Replies to a sync with the given error for each command type."""
+
+    def reply(method, url, kwargs):
+        commands = json.loads(kwargs["data"]["commands"])
+        return {
+            "sync_status": {
+                cmd["uuid"]: errors.get(cmd["type"], "ok") for cmd in commands
+            }
+        }
+
+    return reply
+
+
+def test_commit_keeps_failed_commands_for_retry(api, session):
+    api.items.delete(1)
+    api.items.complete(2)
+    session.responses = [statuses(item_complete=PERMANENT)]
+    with pytest.raises(SyncError) as excinfo:
+        api.commit()
+    assert excinfo.value.error == PERMANENT
+    assert [cmd["type"] for cmd, _ in excinfo.value.failures] == ["item_complete"]
+    assert len(api.queue) == 0
+    assert [cmd["type"] for cmd in api.retry_queue] == ["item_complete"]
+
+    api.retry_failed()
+    session.responses = [statuses()]
+    api.commit()
+    assert [cmd["type"] for cmd in session.sent_commands()] == ["item_complete"]
+    assert api.retry_queue == []
+
+
+def test_commit_retries_transient_failures(api, session):
+    api.items.delete(1)
+    api.items.complete(2)
+    session.responses = [statuses(item_complete=TRANSIENT), statuses()]
+    ret = api.commit()
+    assert len(session.requests) == 2
+    assert [cmd["type"] for cmd in session.sent_commands()] == ["item_complete"]
+    assert all(status == "ok" for status in ret["sync_status"].values())
+    assert len(api.queue) == 0
+
+
+def test_commit_retries_failed_requests(api, session):
+    api.items.delete(1)
+    session.responses = [TRANSIENT, statuses()]
+    api.commit()
+    assert len(session.requests) == 2
+    assert len(api.queue) == 0
+
+    api.items.complete(2)
+    session.responses = [PERMANENT]
+    with pytest.raises(SyncError) as excinfo:
+        api.commit()
+    assert excinfo.value.error == PERMANENT
+    assert [cmd["type"] for cmd in api.retry_queue] == ["item_complete"]
+
+
+def test_commit_gives_up_after_max_retries(api, session):
+    api.max_retries = 2
+    api.items.complete(2)
+    session.responses = [statuses(item_complete=TRANSIENT)] * 3
+    ret = api.commit(raise_on_error=False)
+    assert len(session.requests) == 3
+    assert list(ret["sync_status"].values()) == [TRANSIENT]
+    assert [cmd["type"] for cmd in api.retry_queue] == ["item_complete"]
+
+
+def test_commit_resends_with_same_uuids(api, session):
+    api.max_resends = 2
+    api.items.delete(1)
+    api.items.complete(2)
+    uuids = [cmd["uuid"] for cmd in api.queue]
+    session.responses = [requests.Timeout(), requests.ConnectionError(), statuses()]
+    api.commit()
+    assert len(session.requests) == 3
+    for i in range(3):
+        assert [cmd["uuid"] for cmd in session.sent_commands(i)] == uuids
+    assert len(api.queue) == 0
+
+
+def test_commit_keeps_unconfirmed_commands_after_resend(api, session):
+    api.max_resends = 1
+    api.items.delete(1)
+    api.items.complete(2)
+    deleted_uuid = api.queue[0]["uuid"]
+    session.responses = [
+        requests.Timeout(),
+        {"sync_status": {deleted_uuid: "ok"}},
+    ]
+    api.commit()
+    assert [cmd["type"] for cmd in api.queue] == ["item_complete"]
+
+
+def test_commit_without_resends_keeps_queue(api, session):
+    api.items.delete(1)
+    session.responses = [requests.Timeout()]
+    with pytest.raises(requests.Timeout):
+        api.commit()
+    assert len(session.requests) == 1
+    assert len(api.queue) == 1
+
+
+def test_commit_keeps_responses_which_are_not_json(api, session):
+    api.items.complete(2)
+    session.responses = [
+        statuses(item_complete=TRANSIENT),
+        FakeResponse("no sync_status here", 502),
+    ]
+    ret = api.commit(raise_on_error=False)
+    assert ret["sync_status"] == {api.retry_queue[0]["uuid"]: TRANSIENT}
+    assert [cmd["type"] for cmd in api.retry_queue] == ["item_complete"]
+
+
+def test_failed_commands_are_kept_in_the_journal(session, cache_dir):
+    def restart():
+        api = todoist.TodoistAPI(
+            "token", session=session, cache=cache_dir, persist_queue=True
+        )
+        api.backoff = Backoff(base=0, jitter=False)
+        return api
+
+    api = restart()
+    api.items.delete(1)
+    api.items.complete(2)
+    session.responses = [statuses(item_complete=PERMANENT)]
+    api.commit(raise_on_error=False)
+    api = restart()
+    assert len(api.queue) == 0
+    assert [cmd["type"] for cmd in api.retry_queue] == ["item_complete"]
+
+    api.retry_failed()
+    api = restart()
+    assert [cmd["type"] for cmd in api.queue] == ["item_complete"]
+    assert api.retry_queue == []
+
+    session.responses = [statuses(item_complete=PERMANENT)]
+    api.commit(raise_on_error=False)
+    assert [cmd["type"] for cmd in api.drop_failed()] == ["item_complete"]
+    api = restart()
+    assert len(api.queue) == 0
+    assert api.retry_queue == []
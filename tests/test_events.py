@@ -0,0 +1,42 @@
+import json
+
+from todoist.api import TodoistAPI
+
+
+def test_apply_event(session, cache_dir):
+    api = TodoistAPI("token", session=session, cache=cache_dir)
+    item = {"id": 1, "content": "Task", "checked": 0, "project_id": 10}
+    assert api.apply_event(
+        "item:added", {"event_name": "item:added", "event_data": item}
+    )
+    assert api.items.get_by_id(1, only_local=True)["content"] == "Task"
+
+    assert api.apply_event("item:updated", dict(item, content="Renamed"))
+    assert api.apply_event("item:completed", dict(item, content="Renamed"))
+    assert api.items.get_by_id(1, only_local=True)["content"] == "Renamed"
+    assert api.items.get_by_id(1, only_local=True)["checked"] == 1
+
+    assert api.apply_event("note:added", {"id": 2, "item_id": 1, "content": "a"})
+    assert api.apply_event("note:added", {"id": 3, "project_id": 10, "content": "b"})
+    assert [n["id"] for n in api.state["notes"]] == [2]
+    assert [n["id"] for n in api.state["project_notes"]] == [3]
+
+    assert not api.apply_event("reminder:fired", {"id": 4, "item_id": 1})
+    assert api.state["reminders"] == []
+
+    assert api.apply_event("item:deleted", item)
+    assert api.items.get_by_id(1, only_local=True) is None
+    assert session.requests == []
+
+    def cached():
+        with open(cache_dir + "token.json") as f:
+            return json.load(f)
+
+    # Only the first event was written, the others are written in a batch.
+    assert [i["content"] for i in cached()["items"]] == ["Task"]
+    api.flush_cache()
+    assert cached()["items"] == []
+    assert len(cached()["notes"]) == 1
+
+    assert api.apply_event("note:deleted", {"id": 2, "item_id": 1}, flush=True)
+    assert cached()["notes"] == []
@@ -0,0 +1,66 @@
+import requests
+
+from todoist.api import TodoistAPI
+from todoist.hooks import HTTPHooks, request_size, sent_size
+
+
+class RecordingHooks(HTTPHooks):
+    def __init__(self):
+        self.before = []
+        self.after = []
+
+    def before_request(self, info):
+        self.before.append(info)
+
+    def after_response(self, info):
+        self.after.append(info)
+
+
+def test_http_hooks(session):
+    api = TodoistAPI("token", session=session, cache=None)
+    hooks = api.http_hooks = RecordingHooks()
+    api.items.add("Task", project_id=1)
+    session.responses = [{"sync_token": "A", "sync_status": {}}, {"id": 1}]
+    api.commit()
+    api.items.get(1)
+
+    assert hooks.before == hooks.after
+    sync, get = hooks.after
+    assert (sync.method, sync.endpoint) == ("POST", "/sync/v8/sync")
+    assert sync.command_count == 1
+    assert sync.status == 200
+    assert sync.request_bytes > 0 and sync.response_bytes > 0
+    assert sync.latency >= 0
+    assert (get.method, get.endpoint) == ("GET", "/sync/v8/items/get")
+    assert get.command_count == 0
+
+
+def test_http_hooks_archive_and_errors(session):
+    api = TodoistAPI("token", session=session, cache=None)
+    hooks = api.http_hooks = RecordingHooks()
+    session.responses = [{"items": [], "has_more": False}, requests.ConnectionError()]
+    api.items_archive.for_project(1).next_page(None)
+    try:
+        api.sync()
+    except requests.ConnectionError:
+        pass
+    archive, sync = hooks.after
+    assert archive.endpoint == "/sync/v8/archive/items"
+    assert isinstance(sync.error, requests.ConnectionError)
+    assert sync.status is None
+
+
+def test_request_size():
+    data = {"token": "abc", "commands": '[{"type":"item_add"}]'}
+    encoded = "token=abc&commands=" + data["commands"] + "&"
+    assert request_size({"data": data}) == len(encoded)
+    assert request_size({"data": "raw body"}) == 8
+
+    class Prepared(object):
+        body = "token=abc"
+
+    class Response(object):
+        request = Prepared()
+
+    assert sent_size(Response()) == 9
+    assert sent_size(object()) is None
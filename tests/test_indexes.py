@@ -0,0 +1,131 @@
+import datetime
+
+from todoist.api import TodoistAPI
+from todoist.models import Item, parse_due_date
+
+
+def due(date):
+    return {"date": date, "string": date, "is_recurring": False}
+
+
+def make_api(session, **kwargs):
+    api = TodoistAPI("token", session=session, cache=None, **kwargs)
+    api._update_state(
+        {
+            "user": {"inbox_project": 1},
+            "items": [
+                {"id": 1, "content": "a", "due": due("2020-01-03")},
+                {"id": 2, "content": "b", "due": due("2020-01-01T09:00:00")},
+                {"id": 3, "content": "c", "due": None},
+                {"id": 4, "content": "d", "due": due("2020-01-02")},
+            ],
+        }
+    )
+    return api
+
+
+def ids(items):
+    return [item["id"] for item in items]
+
+
+def test_parse_due_date():
+    assert parse_due_date("2020-01-02") == datetime.datetime(2020, 1, 2)
+    assert parse_due_date("2020-01-02T10:30:00") == datetime.datetime(
+        2020, 1, 2, 10, 30
+    )
+    assert parse_due_date("2020-13-02") is None
+    assert parse_due_date(None) is None
+
+
+def test_due_datetime_is_cached_until_the_due_date_changes():
+    item = Item({"id": 1, "due": due("2020-01-02")}, None)
+    parsed = item.due_datetime
+    assert parsed == datetime.datetime(2020, 1, 2)
+    assert item.due_datetime is parsed
+    item["due"] = due("2020-01-05")
+    assert item.due_datetime == datetime.datetime(2020, 1, 5)
+    item["due"] = None
+    assert item.due_datetime is None
+
+
+def test_due_between(session):
+    api = make_api(session)
+    assert ids(api.items.due_between()) == [2, 4, 1]
+    assert ids(api.items.due_between(datetime.date(2020, 1, 2))) == [4, 1]
+    assert ids(api.items.due_between(end=datetime.date(2020, 1, 3))) == [2, 4]
+
+    # Merged, local and optimistic changes all update the index.
+    index = api.items.due_index
+    api._update_state(
+        {
+            "items": [
+                {"id": 1, "due": due("2019-12-31")},
+                {"id": 4, "is_deleted": 1},
+                {"id": 5, "content": "e", "due": due("2020-01-02T12:00:00")},
+            ]
+        }
+    )
+    assert ids(api.items.due_between()) == [1, 2, 5]
+    item = api.items.add("f", due=due("2020-01-01"))
+    api.items.get_by_id(3, only_local=True).update(due=due("2020-02-01"))
+    assert ids(api.items.due_between(datetime.date(2020, 1, 1))) == [
+        item["id"],
+        2,
+        5,
+        3,
+    ]
+    assert api.items.due_index is index
+
+
+def test_due_index_follows_optimistic_updates(session):
+    api = make_api(session, optimistic=True)
+    assert ids(api.items.due_between()) == [2, 4, 1]
+    api.items.update(4, due=due("2020-01-05"))
+    api.items.delete(2)
+    assert ids(api.items.due_between()) == [1, 4]
+    api.optimistic.rollback(api.queue)
+    assert ids(api.items.due_between()) == [2, 4, 1]
+
+
+def test_due_index_is_rebuilt_when_the_items_are_replaced(session):
+    api = make_api(session)
+    assert ids(api.items.due_between()) == [2, 4, 1]
+    api.state["items"] = api.state["items"][:2]
+    assert ids(api.items.due_between()) == [2, 1]
+
+
+def test_today_and_upcoming(session):
+    api = make_api(session, optimistic=True)
+    api._update_state(
+        {
+            "day_orders": {"2": 1, "5": 2, "6": 0},
+            "items": [
+                {"id": 5, "content": "e", "due": due("2020-01-01")},
+                {"id": 6, "content": "f", "due": due("2020-01-01T18:00:00")},
+                {"id": 7, "content": "g", "due": due("2020-01-01"), "checked": 1},
+            ],
+        }
+    )
+    today = datetime.date(2020, 1, 2)
+    assert ids(api.items.today(datetime.date(2020, 1, 1))) == [6, 2, 5]
+    assert ids(api.items.today(today)) == [6, 2, 5, 4]
+    upcoming = api.items.upcoming(days=3, start=today)
+    assert [(date.day, ids(items)) for date, items in upcoming] == [
+        (2, [4]),
+        (3, [1]),
+        (4, []),
+    ]
+
+    # Day orders, due dates and completions are applied incrementally.
+    index = api.items.day_index
+    api._update_state({"day_orders": {"5": 0, "6": 3}})
+    assert ids(index.day(datetime.date(2020, 1, 1))) == [5, 2, 6]
+    api.items.update_day_orders({2: -1})
+    assert ids(index.day(datetime.date(2020, 1, 1))) == [5, 6, 2]
+    api.items.get_by_id(1, only_local=True).update(due=due("2020-01-01"))
+    api.items.complete(5)
+    assert ids(index.day(datetime.date(2020, 1, 1))) == [6, 1, 2]
+    api.optimistic.rollback(api.queue)
+    assert ids(index.day(datetime.date(2020, 1, 1))) == [5, 2, 6]
+    assert ids(index.day(datetime.date(2020, 1, 3))) == [1]
+    assert api.items.day_index is index
@@ -0,0 +1,63 @@
+import json
+
+from todoist.api import TodoistAPI
+from todoist.interning import Interner
+
+
+def decoded(obj):
+    return json.loads(json.dumps(obj))
+
+
+def make_item(i):
+    return {
+        "id": 1000000 + i,
+        "content": "Task %d" % i,
+        "project_id": 2200000000,
+        "labels": [2300000000],
+        "due": {"date": "2020-01-01", "string": "every day"},
+    }
+
+
+def key(obj, name):
+    return next(k for k in obj if k == name)
+
+
+def test_interner_shares_repeated_values():
+    interner = Interner()
+    first, second = [interner.intern(decoded(make_item(i))) for i in range(2)]
+    assert first["project_id"] is second["project_id"]
+    assert first["labels"][0] is second["labels"][0]
+    assert first["due"]["date"] is second["due"]["date"]
+    assert key(first, "content") is key(second, "content")
+    assert first["content"] != second["content"]
+    assert interner.interned == 4  # project_id, labels, due date and string
+    assert interner.saved_bytes > 0
+
+
+def test_interner_keeps_types_apart():
+    interner = Interner(fields=["value"])
+    interner.intern({"value": 10**10})
+    assert type(interner.intern({"value": float(10**10)})["value"]) is float
+    assert interner.intern({"value": 1})["value"] == 1
+    assert interner.intern({"value": True})["value"] is True
+
+
+def test_interner_max_values():
+    interner = Interner(max_values=2)
+    interner.intern({"a": "x", "b": "y"})
+    assert interner.size == 2
+
+
+def test_api_interns_merged_objects(session, cache_dir):
+    api = TodoistAPI("token", session=session, cache=cache_dir, intern_values=True)
+    for i in range(3):
+        api._update_state({"items": [decoded(make_item(i))]})
+    first, second = api.state["items"][:2]
+    assert first["project_id"] is second["project_id"]
+    assert api.interner.stats()["interned"] > 0
+
+    api._write_cache()
+    api2 = TodoistAPI("token", session=session, cache=cache_dir, intern_values=True)
+    first, second = api2.state["items"][:2]
+    assert first["due"]["string"] is second["due"]["string"]
+    assert TodoistAPI("token", cache=None).interner is None
@@ -0,0 +1,43 @@
+import json
+
+from todoist.api import TodoistAPI
+
+
+def test_memory_report(session):
+    api = TodoistAPI("token", session=session, cache=None)
+    items = [
+        {"id": i, "content": "Task %d" % i, "due": {"date": "2020-01-01"}}
+        for i in range(20)
+    ]
+    # Decoded separately, the equal strings are distinct objects.
+    for item in items:
+        api._update_state({"items": [json.loads(json.dumps(item))]})
+    api._update_state({"projects": [{"id": 1, "name": "Project"}]})
+    api.state["user"] = {"full_name": "User"}
+
+    report = api.memory_report()
+    usage = report["types"]["items"]
+    assert usage["objects"] == 20
+    assert set(usage["fields"]) == {"id", "content", "due"}
+    assert usage["wrappers"] > 0 and usage["dicts"] > 0
+    assert usage["bytes"] == (
+        usage["wrappers"] + usage["dicts"] + sum(usage["fields"].values())
+    )
+    # "2020-01-01", "date", "due", "content", "id" repeated in 19 items.
+    assert usage["duplicate_strings"] >= 19 * 5
+    assert report["types"]["projects"]["objects"] == 1
+    assert report["other"]["user"] > 0
+    assert report["total"] > usage["bytes"]
+    assert "sync_allocations" not in report
+
+
+def test_memory_report_traces_sync(session):
+    api = TodoistAPI("token", session=session, cache=None)
+    session.responses = [
+        {"sync_token": "A", "items": [{"id": i, "content": "x"} for i in range(100)]}
+    ]
+    report = api.memory_report(trace_sync=True, top=3)
+    allocations = report["sync_allocations"]
+    assert allocations["size_diff"] > 0
+    assert len(allocations["top"]) == 3
+    assert report["types"]["items"]["objects"] == 100
@@ -0,0 +1,49 @@
+from todoist.api import TodoistAPI
+from todoist.metrics import Histogram, MetricsRegistry
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+    assert histogram.cumulative_counts() == [(1, 2), (10, 3), (float("inf"), 4)]
+    assert histogram.mean == 14.125
+    assert (histogram.min, histogram.max) == (0.5, 50)
+
+
+def test_metrics_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests.").inc(3)
+    registry.gauge("objects", 'Objects "by" type.', lambda: {"b": 2, "a": 1}, "type")
+    registry.histogram("latency_seconds", "Latency.", buckets=(1,)).observe(0.5)
+    assert registry.render() == (
+        "# HELP latency_seconds Latency.\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{le="1"} 1\n'
+        'latency_seconds_bucket{le="+Inf"} 1\n'
+        "latency_seconds_sum 0.5\n"
+        "latency_seconds_count 1\n"
+        '# HELP objects Objects "by" type.\n'
+        "# TYPE objects gauge\n"
+        'objects{type="a"} 1\n'
+        'objects{type="b"} 2\n'
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        "requests_total 3\n"
+    )
+
+
+def test_api_metrics(session, cache_dir):
+    api = TodoistAPI("token", session=session, cache=cache_dir)
+    session.responses = [{"sync_token": "A", "items": [{"id": 1, "content": "x"}]}]
+    api.sync()
+    api.items.add("Task", project_id=1)
+    assert api.metrics.get("todoist_cache_misses_total").value == 1
+    assert api.metrics.get("todoist_syncs_total").value == 1
+    assert api.metrics.get("todoist_sync_objects_total").value == 1
+    text = api.metrics.render()
+    assert "todoist_queue_depth 1\n" in text
+    assert 'todoist_state_objects{type="items"} 2\n' in text
+
+    api2 = TodoistAPI("token", session=session, cache=cache_dir)
+    assert api2.metrics.get("todoist_cache_hits_total").value == 1
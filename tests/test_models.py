@@ -0,0 +1,22 @@
+import pytest
+
+from todoist import models
+from todoist.api import RESP_MODELS_MAPPING, TodoistAPI
+
+
+@pytest.mark.parametrize("model", [model for _, model in RESP_MODELS_MAPPING])
+def test_models_are_slotted(model):
+    obj = model({"id": 1, "content": "Task"}, None)
+    assert not hasattr(obj, "__dict__")
+    obj["content"] = "Renamed"
+    assert obj["content"] == "Renamed"
+    assert "content" in obj and "due" not in obj
+    obj.temp_id = "temp"
+    with pytest.raises(AttributeError):
+        obj.other = 1
+
+
+def test_notes_local_manager():
+    api = TodoistAPI("token", cache=None)
+    assert models.Note({}, api).local_manager is api.notes
+    assert models.ProjectNote({}, api).local_manager is api.project_notes
@@ -0,0 +1,110 @@
+import datetime
+import json
+
+import pytest
+
+import todoist
+from todoist.backoff import Backoff
+
+PERMANENT = {"error": "Invalid argument", "http_code": 400}
+
+
+@pytest.fixture
+def api(session):
+    api = todoist.TodoistAPI("token", session=session, cache=None, optimistic=True)
+    api.backoff = Backoff(base=0, jitter=False)
+    api._update_state(
+        {
+            "user": {"inbox_project": 1},
+            "projects": [{"id": 1, "name": "Inbox"}, {"id": 2, "name": "Work"}],
+            "items": [
+                {"id": 10, "content": "Task", "project_id": 1, "checked": 0},
+                {"id": 11, "content": "Sub", "project_id": 1, "parent_id": 10},
+            ],
+        }
+    )
+    return api
+
+
+def reject(*cmd_types):
+    def reply(method, url, kwargs):
+        commands = json.loads(kwargs["data"]["commands"])
+        return {
+            "sync_status": {
+                cmd["uuid"]: PERMANENT if cmd["type"] in cmd_types else "ok"
+                for cmd in commands
+            }
+        }
+
+    return reply
+
+
+def test_queued_commands_are_applied_locally(api):
+    api.items.update(10, content="Updated")
+    api.items.complete(10)
+    api.items.move(11, project_id=2)
+    api.projects.archive(2)
+    item = api.items.get_by_id(10, only_local=True)
+    assert item["content"] == "Updated"
+    assert item["checked"] == 1
+    assert api.items.get_by_id(11, only_local=True)["project_id"] == 2
+    assert api.items.get_by_id(11, only_local=True)["parent_id"] is None
+    assert api.projects.get_by_id(2, only_local=True)["is_archived"] == 1
+
+
+def test_delete_removes_descendants(api):
+    api.items.delete(10)
+    assert api.state["items"] == []
+
+
+def test_failed_commands_are_rolled_back(api, session):
+    api.items.update(10, content="Updated")
+    api.items.complete(10)
+    api.items.delete(11)
+    new_item = api.items.add("New")
+    session.responses = [reject("item_complete", "item_delete", "item_add")]
+    api.commit(raise_on_error=False)
+
+    item = api.items.get_by_id(10, only_local=True)
+    assert item["content"] == "Updated"
+    assert item["checked"] == 0
+    assert [i["id"] for i in api.state["items"]] == [10, 11]
+    assert new_item not in api.state["items"]
+    assert api.optimistic.undo_records == {}
+
+
+def test_rejected_model_delete_is_rolled_back(api, session):
+    api.items.get_by_id(11, only_local=True).delete()
+    session.responses = [reject("item_delete")]
+    api.commit(raise_on_error=False)
+    item = api.items.get_by_id(11, only_local=True)
+    assert "is_deleted" not in item
+
+
+def test_day_orders_are_keyed_by_string_ids(api, session):
+    today = datetime.date(2020, 1, 1)
+    due = {"date": "2020-01-01", "string": "today", "is_recurring": False}
+    api._update_state(
+        {
+            "day_orders": {"10": 1, "11": 2},
+            "items": [{"id": 10, "due": due}, {"id": 11, "due": due}],
+        }
+    )
+    api.items.update_day_orders({10: 3, 11: 0})
+    assert api.state["day_orders"] == {"10": 3, "11": 0}
+    assert [item["id"] for item in api.items.today(today)] == [11, 10]
+
+    # The server confirms the change, with other orders.
+    api.commit()
+    api._update_state({"day_orders": {"10": 0, "11": 5}})
+    assert api.state["day_orders"] == {"10": 0, "11": 5}
+    assert [item["id"] for item in api.items.today(today)] == [10, 11]
+
+
+def test_commands_are_applied_before_they_are_queued(api):
+    queued = []
+    api.state_listeners.append(lambda *args: queued.append(len(api.queue)))
+    api.items.update(10, content="Updated")
+    api.items.complete(10)
+    assert queued == [0, 1]
+    assert len(api.queue) == 2
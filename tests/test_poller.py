@@ -0,0 +1,76 @@
+import threading
+
+import requests
+
+from todoist.api import TodoistAPI
+from todoist.poller import Poller, has_changes
+
+
+def make_poller(session, **kwargs):
+    api = TodoistAPI("token", session=session, cache=None)
+    return Poller(api, min_interval=1, max_interval=8, **kwargs)
+
+
+def test_poller_adapts_interval(session):
+    poller = make_poller(session)
+    session.responses = [
+        {"sync_token": "a", "full_sync": False},
+        {"sync_token": "b", "full_sync": False, "items": []},
+        {"sync_token": "c", "full_sync": False},
+        {"sync_token": "d", "full_sync": False},
+        {"sync_token": "e", "full_sync": False},
+        {"sync_token": "f", "items": [{"id": 1, "content": "Task"}]},
+    ]
+    intervals = []
+    for _ in range(6):
+        poller.poll()
+        intervals.append(poller.interval)
+    assert intervals == [2, 4, 8, 8, 8, 1]
+    assert poller.empty_syncs == 5
+    assert poller.durations.count == 6
+    assert poller.payload_sizes.sum == poller.api.received_bytes > 0
+
+
+def test_poller_honors_rate_limits(session):
+    poller = make_poller(session)
+    session.responses = [
+        {"error_code": 35, "http_code": 429, "error_extra": {"retry_after": 3}},
+        {"error_code": 35, "http_code": 429},
+    ]
+    poller.poll()
+    assert poller.interval == 3
+    poller.poll()
+    assert poller.interval == 8
+    assert poller.rate_limited == 2
+    assert poller.api.sync_token == "*"
+
+
+def test_poller_runs_callbacks_on_another_thread(session):
+    threads = []
+    errors = []
+    done = threading.Event()
+
+    def on_sync(api, response):
+        threads.append(threading.current_thread())
+
+    def on_error(e):
+        errors.append(e)
+        done.set()
+
+    session.responses = [
+        {"sync_token": "a", "items": [{"id": 1, "content": "Task"}]},
+        requests.ConnectionError(),
+    ]
+    api = TodoistAPI("token", session=session, cache=None)
+    poller = api.enable_polling(min_interval=0.01, on_sync=on_sync, on_error=on_error)
+    assert done.wait(5)
+    api.disable_polling()
+    assert threads and threads[0].name == "todoist-poller-callbacks"
+    assert isinstance(errors[0], requests.ConnectionError)
+    assert poller.syncs == 1 and poller.errors == 1
+
+
+def test_has_changes():
+    assert not has_changes({"sync_token": "a", "temp_id_mapping": {"x": 1}})
+    assert not has_changes({"sync_token": "a", "items": [], "day_orders": {}})
+    assert has_changes({"sync_token": "a", "day_orders": {"1": 2}})
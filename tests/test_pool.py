@@ -0,0 +1,139 @@
+import threading
+import time
+
+import requests
+
+from todoist.api import TodoistAPI
+from todoist.memory import approximate_size
+from todoist.models import Item
+from todoist.pool import StatePool, SyncPool
+
+
+def test_sync_pool_syncs_all_accounts(session):
+    active = []
+    max_active = []
+    lock = threading.Lock()
+
+    def reply(method, url, kwargs):
+        with lock:
+            active.append(1)
+            max_active.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.pop()
+        if kwargs["data"]["token"] == "bad":
+            return requests.ConnectionError()
+        return {"sync_token": "token-" + kwargs["data"]["token"]}
+
+    pool = SyncPool(max_workers=3, session=session, cache=None)
+    tokens = ["a", "b", "c", "d", "e", "bad"]
+    for token in tokens:
+        pool.add(token)
+    session.responses = [reply] * len(tokens)
+
+    results = pool.sync_all()
+    assert sorted(results) == sorted(tokens)
+    assert isinstance(results["bad"], requests.ConnectionError)
+    assert results["a"]["sync_token"] == "token-a"
+    assert pool.get("a").sync_token == "token-a"
+    assert max(max_active) <= 3
+    assert pool.stats["a"].count == 1
+    assert pool.stats["bad"].errors == 1
+    assert pool.stats["a"].mean > 0
+
+
+def test_sync_pool_schedules_least_recently_synced_first(session):
+    pool = SyncPool(max_workers=1, session=session, cache=None)
+    for token in ["a", "b", "c"]:
+        pool.add(token)
+    pool.sync_all(["b"])
+    session.requests = []
+    pool.sync_all()
+    order = [request[2]["data"]["token"] for request in session.requests]
+    assert order[-1] == "b"
+
+
+def sync_response(token, count):
+    items = [{"id": i, "content": "x" * 100, "project_id": 1} for i in range(count)]
+    return {"sync_token": "token-" + token, "full_sync": True, "items": items}
+
+
+def test_state_pool_spills_least_recently_used(session, cache_dir):
+    session.responses = [sync_response("a", 50), sync_response("b", 50)]
+    states = StatePool(max_bytes=1, cache=cache_dir, session=session)
+    states.sync("a")
+    assert "a" in states
+    states.sync("b")
+    assert "a" not in states and "b" in states
+    assert states.stats()["evictions"] == 1
+
+    # Read back from the cache, with its sync token.
+    session.responses = [{"sync_token": "token-a2"}]
+    api = states.sync("a")
+    assert len(api.state["items"]) == 50
+    assert session.requests[-1][2]["data"]["sync_token"] == "token-a"
+    assert states.stats()["misses"] == 3
+    assert "b" not in states
+
+
+def test_state_pool_keeps_accounts_within_budget(session, cache_dir):
+    session.responses = [sync_response("a", 10), sync_response("b", 10)]
+    states = StatePool(max_bytes=10**8, cache=cache_dir, session=session)
+    api = states.sync("a")
+    states.sync("b")
+    assert states.get("a") is api
+    assert len(states) == 2
+    assert states.stats()["hits"] == 1
+    assert states.size_bytes == approximate_size(api.state) + approximate_size(
+        states.get("b").state
+    )
+
+
+def test_approximate_size_counts_models():
+    small = approximate_size({"items": []})
+    assert approximate_size({"items": [Item({"content": "x" * 1000}, None)]}) > (
+        small + 1000
+    )
+
+
+def test_state_pool_writes_out_accounts_once_synced(session, cache_dir):
+    session.responses = [sync_response("a", 10), sync_response("b", 10)]
+    states = StatePool(max_bytes=10**8, cache=cache_dir, session=session)
+    api = states.sync("a")
+    states.sync("b")
+    removed = []
+    with api._sync_lock:  # As if syncing from another thread.
+        thread = threading.Thread(target=lambda: removed.append(states.remove("a")))
+        thread.start()
+        time.sleep(0.05)
+        assert removed == []
+        assert states.get("b") is not None  # The pool isn't blocked.
+        assert states.get("a") is api  # Taken back while being written out.
+    thread.join()
+    assert removed == [api]
+    assert "a" in states
+    assert states.size_bytes == approximate_size(api.state) + approximate_size(
+        states.get("b").state
+    )
+
+
+def test_state_pool_reloads_large_accounts_without_searching(
+    session, cache_dir, monkeypatch
+):
+    session.responses = [sync_response("a", 8000), sync_response("b", 10)]
+    states = StatePool(max_bytes=1, cache=cache_dir, session=session)
+    states.sync("a")
+    states.sync("b")
+    assert "a" not in states
+
+    searched = []
+    find_object = TodoistAPI._find_object
+    monkeypatch.setattr(
+        TodoistAPI,
+        "_find_object",
+        lambda self, *args: searched.append(args) or find_object(self, *args),
+    )
+    api = states.get("a")
+    assert len(api.state["items"]) == 8000
+    assert api.items.get_by_id(7999, only_local=True)["project_id"] == 1
+    assert searched == []
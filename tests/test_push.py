@@ -0,0 +1,123 @@
+import base64
+import hashlib
+import socket
+import struct
+import threading
+import time
+
+from conftest import wait_for
+
+from todoist.api import TodoistAPI
+from todoist.backoff import Backoff
+from todoist.push import _WEBSOCKET_GUID, WebSocketConnection
+
+
+class StandInServer(object):
+    """
+    Local websocket server, sending the queued messages to its clients.
+    """
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(5)
+        self.url = "ws://127.0.0.1:%d/ws?token=abc" % self.sock.getsockname()[1]
+        self.clients = []
+        self.requests = []
+        self.connected = threading.Event()
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            data = b""
+            while b"\r\n\r\n" not in data:
+                data += client.recv(4096)
+            request = data.decode("latin-1")
+            self.requests.append(request)
+            key = [
+                line.split(":", 1)[1].strip()
+                for line in request.split("\r\n")
+                if line.lower().startswith("sec-websocket-key")
+            ][0]
+            digest = hashlib.sha1((key + _WEBSOCKET_GUID).encode("ascii")).digest()
+            client.sendall(
+                b"HTTP/1.1 101 Switching Protocols\r\n"
+                b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                b"Sec-WebSocket-Accept: " + base64.b64encode(digest) + b"\r\n\r\n"
+            )
+            self.clients.append(client)
+            self.connected.set()
+
+    def send(self, payload, opcode=0x1, fin=True):
+        if not isinstance(payload, bytes):
+            payload = payload.encode("utf-8")
+        frame = struct.pack("!BB", (0x80 if fin else 0) | opcode, len(payload))
+        self.clients[-1].sendall(frame + payload)
+
+    def read_frame(self):
+        client = self.clients[-1]
+        first, second = struct.unpack("!BB", client.recv(2))
+        mask = bytearray(client.recv(4))
+        payload = bytearray(client.recv(second & 0x7F))
+        return first & 0x0F, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+    def close(self):
+        self.sock.close()
+        for client in self.clients:
+            client.close()
+
+
+def test_websocket_connection_messages():
+    server = StandInServer()
+    try:
+        connection = WebSocketConnection(server.url)
+        assert server.requests[0].startswith("GET /ws?token=abc HTTP/1.1")
+        server.send("hello")
+        assert connection.recv() == "hello"
+        server.send("frag", fin=False)
+        server.send("mented", opcode=0x0)
+        assert connection.recv() == "fragmented"
+        server.send(b"ping", opcode=0x9)
+        server.send("after ping")
+        assert connection.recv() == "after ping"
+        assert server.read_frame() == (0xA, b"ping")
+        server.send(b"\x03\xe8", opcode=0x8)
+        assert connection.recv() is None
+    finally:
+        server.close()
+
+
+def test_push_listener_debounces_syncs(session):
+    server = StandInServer()
+    synced = []
+    api = TodoistAPI("token", session=session, cache=None)
+    api.state["user"] = {"websocket_url": server.url}
+    session.responses = [{"sync_token": "token-%d" % i} for i in range(3)]
+    try:
+        listener = api.enable_push(debounce=0.1, on_sync=synced.append)
+        listener.backoff = Backoff(base=0.01)
+        assert server.connected.wait(5)
+        for _ in range(3):
+            server.send('{"type": "sync_needed"}')
+        server.send('{"type": "other"}')
+        assert wait_for(lambda: synced)
+        time.sleep(0.2)
+        assert listener.stats()["notifications"] == 3
+        assert len(session.requests) == 1
+        assert api.sync_token == "token-0"
+
+        # Reconnecting syncs again, to catch up.
+        server.connected.clear()
+        server.send(b"", opcode=0x8)
+        assert server.connected.wait(5)
+        assert wait_for(lambda: len(synced) == 2)
+    finally:
+        api.disable_push()
+        server.close()
+    assert api.push_listener is None
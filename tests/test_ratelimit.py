@@ -0,0 +1,91 @@
+import gc
+import threading
+
+from conftest import FakeResponse
+
+from todoist import ratelimit
+from todoist.api import TodoistAPI
+from todoist.ratelimit import RateLimiter, get_shared_limiter, parse_retry_after
+
+
+def test_rate_limiter_queues_requests():
+    limiter = RateLimiter(rate=100, burst=2)
+    waits = [limiter.acquire() for _ in range(4)]
+    assert waits[0] == waits[1] == 0
+    assert 0 < waits[2] and 0 < waits[3]
+    assert limiter.waits == 2
+    assert limiter.wait_times.count == 4
+
+
+def test_rate_limiter_pause():
+    limiter = RateLimiter(rate=1000, burst=5)
+    limiter.pause(0.05)
+    assert limiter.acquire() >= 0.04
+    assert limiter.rate_limited == 1
+
+
+def test_requests_resent_after_retry_after(session):
+    limiter = RateLimiter(rate=1000, burst=5)
+    api = TodoistAPI("token", session=session, cache=None, rate_limiter=limiter)
+    session.responses = [
+        FakeResponse({"error": "Too many"}, 429, {"Retry-After": "0.02"}),
+        FakeResponse(
+            {"error_code": 35, "http_code": 429, "error_extra": {"retry_after": 0.01}},
+            429,
+        ),
+        {"sync_token": "a"},
+    ]
+    assert api.sync() == {"sync_token": "a"}
+    assert len(session.requests) == 3
+    assert limiter.rate_limited == 2
+    assert limiter.wait_times.sum >= 0.03
+
+
+def test_requests_fail_after_max_retries(session):
+    limiter = RateLimiter(rate=1000, burst=5, max_retries=1)
+    api = TodoistAPI("token", session=session, cache=None, rate_limiter=limiter)
+    error = {"error_code": 35, "http_code": 429}
+    session.responses = [
+        FakeResponse(error, 429, {"Retry-After": "0"}),
+        FakeResponse(error, 429, {"Retry-After": "0"}),
+    ]
+    assert api.sync() == error
+    assert len(session.requests) == 2
+    assert api.metrics.get("todoist_rate_limited_total").value == 2
+    assert "# TYPE todoist_rate_limited_total counter" in api.metrics.render()
+
+
+def test_shared_limiter_by_token(session):
+    api = TodoistAPI("shared-token", session=session, cache=None, rate_limiter=True)
+    api2 = TodoistAPI("shared-token", session=session, cache=None, rate_limiter=True)
+    assert api.rate_limiter is api2.rate_limiter
+    assert api.rate_limiter is get_shared_limiter("shared-token")
+    assert TodoistAPI("token", cache=None).rate_limiter is None
+
+
+def test_shared_limiter_across_threads():
+    limiter = RateLimiter(rate=200, burst=1)
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.requests == 5
+    assert limiter.wait_times.max >= 0.015
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_shared_limiters_are_released_with_their_apis(session):
+    api = TodoistAPI("released-token", session=session, cache=None, rate_limiter=True)
+    limiter = api.rate_limiter
+    del api
+    assert get_shared_limiter("released-token") is limiter
+    del limiter
+    gc.collect()
+    assert "released-token" not in ratelimit._shared_limiters
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import todoist
+from todoist.streaming import ARRAY_ELEMENT, VALUE, iter_json_object
+
+SYNC_DATA = {
+    "sync_token": "A",
+    "full_sync": True,
+    "items": [{"id": 1, "content": "Tâche ✓"}, {"id": 2, "content": "B"}],
+    "notes": [],
+    "locations": [["Home", 1.5, 2.25]],
+    "user": {"id": 3, "karma": 12345},
+    "day_orders": {"1": 2},
+}
+
+
+def chunked(data, size):
+    return [data[start:][:size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1024])
+def test_iter_json_object(size):
+    data = json.dumps(SYNC_DATA, indent=1).encode("utf-8")
+    events = list(iter_json_object(chunked(data, size)))
+    assert ("items", SYNC_DATA["items"][0], ARRAY_ELEMENT) in events
+    assert ("items", SYNC_DATA["items"][1], ARRAY_ELEMENT) in events
+    assert ("user", SYNC_DATA["user"], VALUE) in events
+    assert ("sync_token", "A", VALUE) in events
+    assert not [e for e in events if e[0] == "notes"]
+
+
+def test_iter_json_object_truncated():
+    data = json.dumps(SYNC_DATA).encode("utf-8")[:-10]
+    with pytest.raises(ValueError):
+        list(iter_json_object(chunked(data, 16)))
+
+
+def test_streaming_sync(session):
+    api = todoist.TodoistAPI("token", session=session, cache=None, streaming=True)
+    session.responses = [SYNC_DATA]
+    response = api.sync()
+    assert session.requests[0][2]["stream"] is True
+    assert [i["id"] for i in api.state["items"]] == [1, 2]
+    assert api.state["items"][0]["content"] == SYNC_DATA["items"][0]["content"]
+    assert api.state["locations"] == SYNC_DATA["locations"]
+    assert api.state["user"]["karma"] == 12345
+    assert api.sync_token == "A"
+    assert "items" not in response
+    assert response["full_sync"] is True
@@ -0,0 +1,137 @@
+import json
+
+import pytest
+
+import todoist
+from todoist.api import INITIAL_SYNC_GROUPS, RESOURCE_TYPES
+
+
+def sync_request(session, index=-1):
+    data = session.requests[index][2]["data"]
+    return data["sync_token"], json.loads(data["resource_types"])
+
+
+def test_scoped_sync_keeps_other_types_tokens(session, cache_dir):
+    api = todoist.TodoistAPI("token", session=session, cache=cache_dir)
+    session.responses = [
+        {"sync_token": "A", "items": [{"id": 1, "content": "Task"}]},
+        {"sync_token": "B", "items": [{"id": 1, "content": "Updated"}]},
+    ]
+    api.sync()
+    assert sync_request(session) == ("*", ["all"])
+
+    api.items.sync()
+    assert sync_request(session) == ("A", ["items"])
+    assert api.get_sync_token("items") == "B"
+    assert api.get_sync_token("projects") == "A"
+    assert api.state["items"][0]["content"] == "Updated"
+
+    # Syncing several types at different tokens takes a request per token.
+    session.responses = [{"sync_token": "C"}, {"sync_token": "D"}]
+    api.sync(resource_types=["items", "projects"])
+    requests = sorted(sync_request(session, i) for i in (-2, -1))
+    assert requests == [("A", ["projects"]), ("B", ["items"])]
+
+    # A full sync is a single request, from the oldest token.
+    session.responses = [{"sync_token": "E"}]
+    count = len(session.requests)
+    api.sync()
+    assert len(session.requests) == count + 1
+    assert sync_request(session) == ("A", ["all"])
+    assert api.sync_token == "E"
+    assert api.sync_tokens == {}
+
+
+def test_sync_tokens_merge_back():
+    api = todoist.TodoistAPI("token", cache=None)
+    api.sync_tokens = {t: "A" for t in RESOURCE_TYPES if t != "items"}
+    api.sync_tokens["items"] = "B"
+    api._set_sync_token(["items"], "A")
+    assert api.sync_token == "A"
+    assert api.sync_tokens == {}
+
+
+def test_sync_tokens_are_cached(session, cache_dir):
+    api = todoist.TodoistAPI("token", session=session, cache=cache_dir)
+    session.responses = [{"sync_token": "A"}, {"sync_token": "B"}]
+    api.sync()
+    api.projects.sync()
+
+    api = todoist.TodoistAPI("token", session=session, cache=cache_dir)
+    assert api.sync_token == "A"
+    assert api.get_sync_token("projects") == "B"
+    assert api.get_sync_token("items") == "A"
+
+
+def test_initial_sync_in_parallel(session, cache_dir):
+    api = todoist.TodoistAPI("token", session=session, cache=cache_dir)
+
+    def reply(method, url, kwargs):
+        types = json.loads(kwargs["data"]["resource_types"])
+        ret = {"sync_token": "token-" + types[0], "full_sync": True}
+        if "items" in types:
+            ret["items"] = [{"id": 1, "content": "Task"}]
+        if "projects" in types:
+            ret["projects"] = [{"id": 2, "name": "Inbox"}]
+        if "user" in types:
+            ret["user"] = {"id": 3}
+        return ret
+
+    session.responses = [reply] * len(INITIAL_SYNC_GROUPS)
+    response = api.initial_sync()
+    assert len(session.requests) == len(INITIAL_SYNC_GROUPS)
+    assert sync_request(session, 0) == ("*", INITIAL_SYNC_GROUPS[0])
+    assert [i["id"] for i in api.state["items"]] == [1]
+    assert [p["id"] for p in api.state["projects"]] == [2]
+    assert api.state["user"]["id"] == 3
+    # Every type continues from the oldest token, fetched first.
+    assert api.sync_token == "token-notification_settings"
+    assert api.sync_tokens == {}
+    assert response["sync_token"] == "token-notification_settings"
+    assert response["items"][0]["id"] == 1
+
+    session.responses = [{"sync_token": "next"}]
+    api.initial_sync()
+    assert sync_request(session) == ("token-notification_settings", ["all"])
+
+
+def test_initial_sync_failure_keeps_group_tokens(session, cache_dir):
+    api = todoist.TodoistAPI("token", session=session, cache=cache_dir)
+
+    def reply(method, url, kwargs):
+        types = json.loads(kwargs["data"]["resource_types"])
+        if types == ["items"]:
+            raise ValueError("boom")
+        return {"sync_token": "token-" + types[0]}
+
+    session.responses = [reply] * len(INITIAL_SYNC_GROUPS)
+    with pytest.raises(ValueError):
+        api.initial_sync()
+    assert api.get_sync_token("items") == "*"
+    assert api.get_sync_token("notes") == "token-notes"
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_sync_timings(session, cache_dir, streaming):
+    api = todoist.TodoistAPI(
+        "token", session=session, cache=cache_dir, streaming=streaming
+    )
+    listened = []
+    api.sync_listeners.append(lambda api, timings: listened.append(timings))
+    session.responses = [
+        {
+            "sync_token": "A",
+            "items": [{"id": 1, "content": "Task"}, {"id": 2, "content": "Other"}],
+            "projects": [{"id": 3, "name": "Project"}],
+        }
+    ]
+    response = api.sync()
+    timings = response.timings
+    assert listened == [timings] and api.last_sync_timings is timings
+    assert timings.requests == 1
+    assert timings.objects == 3
+    assert timings.bytes_received == api.received_bytes > 0
+    for phase in timings.PHASES:
+        assert getattr(timings, phase) >= 0
+    assert timings.cache_write > 0
+    assert set(timings.as_dict()) >= set(timings.PHASES) | {"total", "objects"}
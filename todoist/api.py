@@ -1,12 +1,18 @@
-import datetime
 import functools
-import json
 import os
+import threading
+import time
 import uuid
 
 import requests
 
 from todoist import models
+from todoist.autocommit import AutoCommitter
+from todoist.backoff import Backoff
+from todoist.codec import default_codec, get_codec, json_default
+from todoist.commands import CommandJournal, CommandQueue
+from todoist.hooks import RequestInfo, request_size, response_size, sent_size
+from todoist.interning import Interner
 from todoist.managers.activity import ActivityManager
 from todoist.managers.archive import (
     ItemsArchiveManagerMaker,
@@ -34,12 +40,156 @@ from todoist.managers.templates import TemplatesManager
 from todoist.managers.uploads import UploadsManager
 from todoist.managers.user import UserManager
 from todoist.managers.user_settings import UserSettingsManager
+from todoist.memory import memory_report
+from todoist.metrics import MetricsRegistry, SyncTimings
+from todoist.optimistic import OptimisticUpdates
+from todoist.poller import Poller
+from todoist.push import PushListener
+from todoist.ratelimit import get_shared_limiter, parse_retry_after
+from todoist.streaming import ARRAY_ELEMENT, iter_json_object
+
+_now = getattr(time, "monotonic", time.time)
 
 DEFAULT_API_VERSION = "v8"
+COMMANDS_BATCH_SIZE = 100
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+# Types of objects in the local state, along with the models wrapping them.
+RESP_MODELS_MAPPING = [
+    ("collaborators", models.Collaborator),
+    ("collaborator_states", models.CollaboratorState),
+    ("filters", models.Filter),
+    ("items", models.Item),
+    ("labels", models.Label),
+    ("live_notifications", models.LiveNotification),
+    ("notes", models.Note),
+    ("project_notes", models.ProjectNote),
+    ("projects", models.Project),
+    ("reminders", models.Reminder),
+    ("sections", models.Section),
+]
+
+# Types of resources which can be synced separately.
+RESOURCE_TYPES = frozenset(
+    [
+        "collaborators",
+        "filters",
+        "items",
+        "labels",
+        "live_notifications",
+        "locations",
+        "notes",
+        "notification_settings",
+        "projects",
+        "reminders",
+        "sections",
+        "user",
+        "user_settings",
+    ]
+)
+
+# Groups of resource types fetched in parallel by an initial sync.  The first
+# group is fetched on its own before the others, and should be a small one.
+INITIAL_SYNC_GROUPS = [
+    ["notification_settings", "user", "user_settings"],
+    ["items"],
+    ["notes"],
+    ["filters", "labels", "projects", "sections"],
+    ["collaborators", "live_notifications", "locations", "reminders"],
+]
+
+# Errors reported in sync_status with these HTTP codes are worth retrying.
+TRANSIENT_HTTP_CODES = (429, 500, 502, 503, 504)
+
+# Types of objects of the webhook events (`item:added`, ...), along with the
+# keys of the local state holding them.
+WEBHOOK_OBJECT_TYPES = {
+    "filter": "filters",
+    "item": "items",
+    "label": "labels",
+    "note": "notes",
+    "project": "projects",
+    "reminder": "reminders",
+    "section": "sections",
+}
+
+# Actions of the webhook events, along with the fields they set on the object.
+WEBHOOK_ACTIONS = {
+    "added": {},
+    "updated": {},
+    "deleted": {"is_deleted": 1},
+    "completed": {"checked": 1},
+    "uncompleted": {"checked": 0},
+    "archived": {"is_archived": 1},
+    "unarchived": {"is_archived": 0},
+}
+
+
+class _MergeIndex(object):
+    """
+    Objects of a type of the local state by primary key, the way
+    `TodoistAPI._find_object()` finds them, so that merging many objects
+    doesn't search the local state for each of them.
+    """
+
+    def __init__(self, datatype, objects):
+        self.datatype = datatype
+        self._objects = {}
+        for obj in objects:
+            self.add(obj)
+
+    def find(self, remoteobj):
+        if self.datatype == "collaborator_states":
+            key = (remoteobj.get("project_id"), remoteobj.get("user_id"))
+            return self._objects.get(key)
+        obj_id = remoteobj.get("id")
+        obj = self._objects.get(("id", obj_id))
+        if obj is None:
+            obj = self._objects.get(("temp_id", str(obj_id)))
+        return obj
+
+    def add(self, obj):
+        for key in self._keys(obj):
+            # The first object wins, as when searching the local state.
+            self._objects.setdefault(key, obj)
+
+    def remove(self, obj):
+        for key in self._keys(obj):
+            if self._objects.get(key) is obj:
+                del self._objects[key]
+
+    def _keys(self, obj):
+        data = obj.data
+        if self.datatype == "collaborator_states":
+            return [(data.get("project_id"), data.get("user_id"))]
+        keys = [("id", data.get("id"))]
+        if obj.temp_id:
+            keys.append(("temp_id", obj.temp_id))
+        return keys
 
 
 class SyncError(Exception):
-    pass
+    """
+    Raised when some of the committed commands failed.  The arguments are the
+    uuid and the error of the first failed command, while `failures` holds
+    all the failed `(command, error)` pairs.
+    """
+
+    def __init__(self, uuid, error, failures=None):
+        super(SyncError, self).__init__(uuid, error)
+        self.uuid = uuid
+        self.error = error
+        self.failures = failures or []
+
+
+class SyncResponse(dict):
+    """
+    Data returned by the server after a sync, along with the `timings` of the
+    phases of the sync (see `todoist.metrics.SyncTimings`).
+    """
+
+    timings = None
 
 
 class TodoistAPI(object):
@@ -48,7 +198,16 @@ class TodoistAPI(object):
     account and its data.
     """
 
-    _serialize_fields = ("token", "api_endpoint", "sync_token", "state", "temp_ids")
+    _serialize_fields = (
+        "token",
+        "api_endpoint",
+        "sync_token",
+        "sync_tokens",
+        "state",
+        "temp_ids",
+    )
+
+    state_models = dict(RESP_MODELS_MAPPING)
 
     @classmethod
     def deserialize(cls, data):
@@ -65,14 +224,58 @@ class TodoistAPI(object):
         api_version=DEFAULT_API_VERSION,
         session=None,
         cache="~/.todoist-sync/",
+        persist_queue=False,
+        optimistic=False,
+        streaming=False,
+        codec=None,
+        rate_limiter=None,
+        intern_values=False,
     ):
         self.api_endpoint = api_endpoint
         self.api_version = api_version
         self.reset_state()
         self.token = token  # User's API token
         self.temp_ids = {}  # Mapping of temporary ids to real ids
-        self.queue = []  # Requests to be sent are appended here
+        self.queue = CommandQueue()  # Requests to be sent are appended here
+        self.retry_queue = []  # Requests that failed when they were committed
+        self.max_retries = 3  # Retries of requests failing with transient errors
+        self.max_resends = 0  # Resends of requests when the network fails
+        self.backoff = Backoff()  # Delays between retries and resends
         self.session = session or requests.Session()  # Session instance for requests
+        self.auto_committer = None  # Background committer, if enabled
+        self.push_listener = None  # Websocket listener, if enabled
+        self.poller = None  # Background poller, if enabled
+        self.received_bytes = 0  # Size of the response bodies received
+        self.sync_listeners = []  # Called with the API and timings of each sync
+        # Called with the type, the object, and whether it was removed, for
+        # each object of the local state added, changed or removed, and with
+        # "day_orders" and the day orders which changed
+        self.state_listeners = []
+        # Held while calling the state listeners, and while querying the
+        # indexes they maintain.  The parallel merges of initial_sync() hold
+        # the sync lock from another thread, so it's a lock of its own.
+        self._state_lock = threading.RLock()
+        self.item_columns = None  # Columnar copy of the items, if enabled
+        self.last_sync_timings = None  # Timings of the phases of the last sync
+        self.http_hooks = None  # Observes the HTTP requests sent, if set
+        self.cache_flush_interval = 5.0  # Seconds between cache writes by events
+        self._cache_dirty = False  # Changes not written to the cache yet
+        self._cache_written = None  # When the cache was last written
+        self.streaming = streaming  # Parse sync responses incrementally
+        self.codec = get_codec(codec)  # JSON codec for requests, responses and cache
+        self.queue.codec = self.codec
+        # Shares the values repeated across the objects merged, if enabled
+        self.interner = Interner() if intern_values else None
+        self._sync_lock = threading.RLock()
+
+        # Token bucket the requests wait on, shared by the API objects using
+        # the same token, unless one is specified
+        if rate_limiter is True:
+            rate_limiter = get_shared_limiter(token)
+        self.rate_limiter = rate_limiter
+
+        self.metrics = MetricsRegistry()  # Counters and histograms of the client
+        self._register_metrics()
 
         # managers
         self.biz_invitations = BizInvitationsManager(self)
@@ -104,14 +307,81 @@ class TodoistAPI(object):
         self.items_archive = ItemsArchiveManagerMaker(self)
         self.sections_archive = SectionsArchiveManagerMaker(self)
 
+        # Apply queued requests to the local state before they're committed
+        self.optimistic = None
+        if optimistic:
+            self.optimistic = OptimisticUpdates(self)
+            self.optimistic.start()
+
         if cache:  # Read and write user state on local disk cache
             self.cache = os.path.expanduser(cache)
             self._read_cache()
         else:
             self.cache = None
 
+        if persist_queue:  # Keep queued commands in a journal next to the cache
+            if not self.cache:
+                raise ValueError("persist_queue requires a cache directory")
+            journal = CommandJournal(
+                self.cache + self.token + ".queue", codec=self.codec
+            )
+            self.queue.attach_journal(journal)
+            self.temp_ids.update(journal.temp_ids)
+            self.retry_queue.extend(journal.failed)
+
+    def _register_metrics(self):
+        metrics = self.metrics
+        metrics.counter("todoist_syncs_total", "Syncs completed.")
+        metrics.histogram(
+            "todoist_sync_duration_seconds", "Duration of the syncs, over all phases."
+        )
+        metrics.counter("todoist_sync_received_bytes_total", "Bytes received by syncs.")
+        metrics.counter("todoist_sync_objects_total", "Objects merged by syncs.")
+        metrics.histogram(
+            "todoist_commit_commands",
+            "Commands sent by each commit request.",
+            buckets=(1, 2, 5, 10, 25, 50, 100, 250),
+        )
+        metrics.counter(
+            "todoist_command_retries_total", "Commands retried after transient errors."
+        )
+        metrics.counter("todoist_commands_failed_total", "Commands which failed.")
+        metrics.counter(
+            "todoist_resends_total", "Requests resent after network errors."
+        )
+        metrics.gauge(
+            "todoist_queue_depth", "Commands queued.", lambda: len(self.queue)
+        )
+        metrics.gauge(
+            "todoist_retry_queue_depth",
+            "Failed commands kept for retrying.",
+            lambda: len(self.retry_queue),
+        )
+        metrics.counter("todoist_cache_hits_total", "Local state read from the cache.")
+        metrics.counter(
+            "todoist_cache_misses_total", "Local state missing from the cache."
+        )
+        metrics.gauge(
+            "todoist_state_objects",
+            "Objects in the local state, by type.",
+            lambda: dict(
+                (datatype, len(self.state[datatype])) for datatype in self.state_models
+            ),
+            label="type",
+        )
+        if self.rate_limiter is not None:
+            metrics.register(
+                "todoist_rate_limit_wait_seconds",
+                "Time requests waited for the rate limiter.",
+                self.rate_limiter.wait_times,
+            )
+            metrics.counter(
+                "todoist_rate_limited_total", "Requests answered with a 429 status."
+            )
+
     def reset_state(self):
         self.sync_token = "*"
+        self.sync_tokens = {}  # Tokens of the resource types synced on their own
         self.state = {  # Local copy of all of the user's objects
             "collaborator_states": [],
             "collaborators": [],
@@ -156,6 +426,7 @@ class TodoistAPI(object):
         # either replace the local values or update them.
         if "day_orders" in syncdata:
             self.state["day_orders"].update(syncdata["day_orders"])
+            self._state_changed("day_orders", syncdata["day_orders"])
         if "day_orders_timestamp" in syncdata:
             self.state["day_orders_timestamp"] = syncdata["day_orders_timestamp"]
         if "live_notifications_last_read_id" in syncdata:
@@ -177,45 +448,60 @@ class TodoistAPI(object):
         # necessary to find out whether an object in the sync data is new,
         # updates an existing object, or marks an object to be deleted.  But
         # the same procedure takes place for each of these types of data.
-        resp_models_mapping = [
-            ("collaborators", models.Collaborator),
-            ("collaborator_states", models.CollaboratorState),
-            ("filters", models.Filter),
-            ("items", models.Item),
-            ("labels", models.Label),
-            ("live_notifications", models.LiveNotification),
-            ("notes", models.Note),
-            ("project_notes", models.ProjectNote),
-            ("projects", models.Project),
-            ("reminders", models.Reminder),
-            ("sections", models.Section),
-        ]
-        for datatype, model in resp_models_mapping:
+        for datatype, model in RESP_MODELS_MAPPING:
             if datatype not in syncdata:
                 continue
 
             # Process each object of this specific type in the sync data.
-            for remoteobj in syncdata[datatype]:
-                # Find out whether the object already exists in the local
-                # state.
-                localobj = self._find_object(datatype, remoteobj)
-                if localobj is not None:
-                    # If the object is already present in the local state, then
-                    # we either update it, or if marked as to be deleted, we
-                    # remove it.
-                    is_deleted = remoteobj.get("is_deleted", 0)
-                    if is_deleted == 0 or is_deleted is False:
-                        localobj.data.update(remoteobj)
-                    else:
-                        self.state[datatype].remove(localobj)
-                else:
-                    # If not, then the object is new and it should be added,
-                    # unless it is marked as to be deleted (in which case it's
-                    # ignored).
-                    is_deleted = remoteobj.get("is_deleted", 0)
-                    if is_deleted == 0 or is_deleted is False:
-                        newobj = model(remoteobj, self)
-                        self.state[datatype].append(newobj)
+            remoteobjs = syncdata[datatype]
+            index = None
+            if len(remoteobjs) > 1:
+                index = _MergeIndex(datatype, self.state[datatype])
+            for remoteobj in remoteobjs:
+                self._merge_object(datatype, model, remoteobj, index)
+
+    def _merge_object(self, datatype, model, remoteobj, index=None):
+        """
+        Merges an object of the sync data into the local state.  The objects
+        of the local state are searched one by one, unless a `_MergeIndex` of
+        them is specified, which is kept up to date.
+        """
+        if self.interner is not None:
+            remoteobj = self.interner.intern(remoteobj)
+        # Find out whether the object already exists in the local state.
+        if index is None:
+            localobj = self._find_object(datatype, remoteobj)
+        else:
+            localobj = index.find(remoteobj)
+        if localobj is not None:
+            # If the object is already present in the local state, then we
+            # either update it, or if marked as to be deleted, we remove it.
+            is_deleted = remoteobj.get("is_deleted", 0)
+            if is_deleted == 0 or is_deleted is False:
+                localobj.data.update(remoteobj)
+                self._state_changed(datatype, localobj)
+            else:
+                self.state[datatype].remove(localobj)
+                if index is not None:
+                    index.remove(localobj)
+                self._state_changed(datatype, localobj, removed=True)
+        else:
+            # If not, then the object is new and it should be added, unless it
+            # is marked as to be deleted (in which case it's ignored).
+            is_deleted = remoteobj.get("is_deleted", 0)
+            if is_deleted == 0 or is_deleted is False:
+                newobj = model(remoteobj, self)
+                self.state[datatype].append(newobj)
+                if index is not None:
+                    index.add(newobj)
+                self._state_changed(datatype, newobj)
+
+    def _state_changed(self, datatype, obj, removed=False):
+        # The state changes from the syncs, the background threads and the
+        # local changes alike, so the listeners are called one at a time.
+        with self._state_lock:
+            for listener in self.state_listeners:
+                listener(datatype, obj, removed)
 
     def _read_cache(self):
         if not self.cache:
@@ -230,23 +516,39 @@ class TodoistAPI(object):
         try:
             with open(self.cache + self.token + ".json") as f:
                 state = f.read()
-            state = json.loads(state)
+            state = self.codec.loads(state)
             self._update_state(state)
 
             with open(self.cache + self.token + ".sync") as f:
                 sync_token = f.read()
             self.sync_token = sync_token
         except Exception:
+            self.metrics.get("todoist_cache_misses_total").inc()
             return
+        self.metrics.get("todoist_cache_hits_total").inc()
+
+        try:
+            with open(self.cache + self.token + ".sync_tokens") as f:
+                self.sync_tokens = self.codec.loads(f.read())
+        except Exception:
+            self.sync_tokens = {}
 
     def _write_cache(self):
+        self._cache_dirty = False
+        self._cache_written = _now()
         if not self.cache:
             return
-        result = json.dumps(self.state, indent=2, sort_keys=True, default=state_default)
+        result = self.codec.dumps(self.state, default=state_default, pretty=True)
         with open(self.cache + self.token + ".json", "w") as f:
             f.write(result)
         with open(self.cache + self.token + ".sync", "w") as f:
             f.write(self.sync_token)
+        sync_tokens_path = self.cache + self.token + ".sync_tokens"
+        if self.sync_tokens:
+            with open(sync_tokens_path, "w") as f:
+                f.write(self.codec.dumps(self.sync_tokens, pretty=True))
+        elif os.path.exists(sync_tokens_path):
+            os.remove(sync_tokens_path)
 
     def _find_object(self, objtype, obj):
         """
@@ -310,30 +612,97 @@ class TodoistAPI(object):
         Sends an HTTP GET request to the specified URL, and returns the JSON
         object received (if any), or whatever answer it got otherwise.
         """
-        if not url:
-            url = self.get_api_url()
-
-        response = self.session.get(url + call, **kwargs)
-
-        try:
-            return response.json()
-        except ValueError:
-            return response.text
+        return self._request("GET", call, url, **kwargs)
 
     def _post(self, call, url=None, **kwargs):
         """
         Sends an HTTP POST request to the specified URL, and returns the JSON
         object received (if any), or whatever answer it got otherwise.
         """
+        return self._request("POST", call, url, **kwargs)
+
+    def _request(self, method, call, url=None, timings=None, **kwargs):
+        """
+        Sends an HTTP request, and returns the JSON object received (if any),
+        or whatever answer it got otherwise.  The time spent on the network
+        and on decoding is added to `timings`, if specified.
+        """
         if not url:
             url = self.get_api_url()
 
-        response = self.session.post(url + call, **kwargs)
+        start = _now()
+        response = self._send(method, url + call, **kwargs)
+        content = response.content
+        decode_start = _now()
+        self.received_bytes += len(content)
 
         try:
-            return response.json()
+            ret = self.codec.loads(content)
         except ValueError:
-            return response.text
+            ret = response.text
+        if timings is not None:
+            timings.network += decode_start - start
+            timings.decode += _now() - decode_start
+            timings.requests += 1
+            timings.bytes_received += len(content)
+        return ret
+
+    def _send(self, method, url, command_count=0, **kwargs):
+        """
+        Sends an HTTP request, and returns the response.  With a rate
+        limiter, the request first waits for its turn, and it's sent again
+        after the delay the server asks for when the rate limit was reached.
+        `command_count` is the number of commands sent along, reported to the
+        HTTP hooks.
+        """
+        if self.rate_limiter is None:
+            return self._send_once(method, url, command_count, kwargs)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            response = self._send_once(method, url, command_count, kwargs)
+            if response.status_code != 429:
+                return response
+            self.metrics.get("todoist_rate_limited_total").inc()
+            if attempt >= self.rate_limiter.max_retries:
+                return response
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                try:
+                    error_extra = self.codec.loads(response.content)["error_extra"]
+                    delay = float(error_extra["retry_after"])
+                except (ValueError, KeyError, TypeError):
+                    delay = self.backoff.delay(attempt)
+            self.rate_limiter.pause(delay)
+            attempt += 1
+
+    def _send_once(self, method, url, command_count, kwargs):
+        """
+        Sends an HTTP request, passing it to the HTTP hooks, if any.
+        """
+        send = self.session.get if method == "GET" else self.session.post
+        hooks = self.http_hooks
+        if hooks is None:
+            return send(url, **kwargs)
+
+        info = RequestInfo(method, url, request_size(kwargs), command_count)
+        hooks.before_request(info)
+        start = _now()
+        try:
+            response = send(url, **kwargs)
+        except Exception as e:
+            info.latency = _now() - start
+            info.error = e
+            hooks.after_response(info)
+            raise
+        info.latency = _now() - start
+        info.status = response.status_code
+        body_size = sent_size(response)
+        if body_size is not None:
+            info.request_bytes = body_size
+        info.response_bytes = response_size(response, kwargs.get("stream", False))
+        hooks.after_response(info)
+        return response
 
     # Sync
     def generate_uuid(self):
@@ -342,27 +711,292 @@ class TodoistAPI(object):
         """
         return str(uuid.uuid1())
 
-    def sync(self, commands=None):
+    def sync(self, commands=None, resource_types=None):
         """
         Sends to the server the changes that were made locally, and also
-        fetches the latest updated data from the server.
+        fetches the latest updated data from the server.  If `resource_types`
+        is specified, only the data of those types of resources (see
+        `RESOURCE_TYPES`) is fetched.
+        """
+        with self._sync_lock:
+            return self._sync(commands, resource_types)
+
+    def get_sync_token(self, resource_type):
+        """
+        Returns the sync token the specified type of resources is synced up to.
+        """
+        return self.sync_tokens.get(resource_type, self.sync_token)
+
+    def _sync(self, commands, resource_types):
+        if resource_types is None or "all" in resource_types:
+            resource_types = sorted(RESOURCE_TYPES)
+        groups = {}
+        if set(resource_types) >= RESOURCE_TYPES:
+            # The types synced on their own are ahead of `sync_token`, and
+            # merging their changes again is harmless, so a full sync is a
+            # single request, which brings all the tokens back together.
+            groups[self.sync_token] = resource_types
+        else:
+            # Resource types synced on their own may be at different sync
+            # tokens, so each group of types sharing a token is synced with
+            # its own request.  The commands are sent along with the first one.
+            for resource_type in resource_types:
+                token = self.get_sync_token(resource_type)
+                groups.setdefault(token, []).append(resource_type)
+
+        response = None
+        timings = SyncTimings()
+        for token, types in sorted(groups.items(), key=lambda g: g[1]):
+            ret = self._sync_resource_types(
+                types, token, commands if response is None else None, timings
+            )
+            if response is None:
+                response = ret
+            elif isinstance(ret, dict):
+                for key, value in ret.items():
+                    response.setdefault(key, value)
+        return self._sync_done(response, timings)
+
+    def _sync_done(self, response, timings):
+        """
+        Attaches the timings of a sync to its response, and passes them to
+        the sync listeners.
         """
-        post_data = {
+        if isinstance(response, dict):
+            response = SyncResponse(response)
+            response.timings = timings
+        self.last_sync_timings = timings
+        self.metrics.get("todoist_syncs_total").inc()
+        self.metrics.get("todoist_sync_duration_seconds").observe(timings.total)
+        self.metrics.get("todoist_sync_received_bytes_total").inc(
+            timings.bytes_received
+        )
+        self.metrics.get("todoist_sync_objects_total").inc(timings.objects)
+        for listener in self.sync_listeners:
+            listener(self, timings)
+        return response
+
+    def _sync_resource_types(self, resource_types, sync_token, commands, timings):
+        if self.streaming and not commands:
+            response = self._stream_sync(resource_types, sync_token, timings=timings)
+        else:
+            response = self._fetch(resource_types, sync_token, commands, timings)
+            self._apply_sync_response(resource_types, response, timings)
+        start = _now()
+        self._write_cache()
+        timings.cache_write += _now() - start
+        return response
+
+    def _sync_post_data(self, resource_types, sync_token, commands):
+        all_types = len(resource_types) == len(RESOURCE_TYPES)
+        return {
             "token": self.token,
-            "sync_token": self.sync_token,
+            "sync_token": sync_token,
             "day_orders_timestamp": self.state["day_orders_timestamp"],
             "include_notification_settings": 1,
-            "resource_types": json_dumps(["all"]),
-            "commands": json_dumps(commands or []),
+            "resource_types": self.codec.dumps(
+                ["all"] if all_types else resource_types
+            ),
+            "commands": self.codec.dumps(commands or []),
         }
-        response = self._post("sync", data=post_data)
+
+    def _fetch(self, resource_types, sync_token, commands=None, timings=None):
+        post_data = self._sync_post_data(resource_types, sync_token, commands)
+        return self._request(
+            "POST",
+            "sync",
+            data=post_data,
+            timings=timings,
+            command_count=len(commands or []),
+        )
+
+    def _stream_sync(self, resource_types, sync_token, merge_lock=None, timings=None):
+        """
+        Fetches the sync data and applies it, parsing the response body
+        incrementally, and merging each object into the local state as soon
+        as it's parsed.  The returned response holds the top-level values of
+        the sync data, but not the arrays of objects, which were merged.
+
+        Only used for syncs without commands, as the temporary ids of the
+        objects created by commands have to be replaced before merging them.
+        """
+        merge_lock = merge_lock or threading.Lock()
+        timings = timings or SyncTimings()
+        post_data = self._sync_post_data(resource_types, sync_token, None)
+        start = _now()
+        response = self._send(
+            "POST", self.get_api_url() + "sync", data=post_data, stream=True
+        )
+        timings.requests += 1
+        if response.status_code != 200:
+            content = response.content
+            timings.network += _now() - start
+            timings.bytes_received += len(content)
+            self.received_bytes += len(content)
+            try:
+                ret = self.codec.loads(content)
+            except ValueError:
+                ret = response.text
+            with merge_lock:
+                self._apply_sync_response(resource_types, ret, timings)
+            return ret
+
+        # Receiving, parsing and merging are interleaved: the time spent
+        # waiting for chunks and merging is measured, and the rest of the
+        # time is spent parsing.
+        ret = {}
+        indexes = {}  # type of objects -> _MergeIndex
+        network, merge = timings.network, timings.merge
+        chunks = self._receive_chunks(response.iter_content(STREAM_CHUNK_SIZE), timings)
+        for key, value, kind in iter_json_object(chunks):
+            if kind == ARRAY_ELEMENT and key in self.state_models:
+                merge_start = _now()
+                with merge_lock:
+                    index = indexes.get(key)
+                    if index is None:
+                        index = indexes[key] = _MergeIndex(key, self.state[key])
+                    self._merge_object(key, self.state_models[key], value, index)
+                timings.merge += _now() - merge_start
+                timings.objects += 1
+            elif kind == ARRAY_ELEMENT:
+                ret.setdefault(key, []).append(value)
+            else:
+                ret[key] = value
+        elapsed = _now() - start
+        timings.decode += (
+            elapsed - (timings.network - network) - (timings.merge - merge)
+        )
+        # The sync token and the rest of the data are applied at the end, so
+        # that the token isn't advanced if the stream breaks halfway.
+        with merge_lock:
+            self._apply_sync_response(resource_types, ret, timings)
+        return ret
+
+    def _receive_chunks(self, chunks, timings):
+        """
+        Yields the chunks of a streamed response, counting the bytes received
+        and the time spent waiting for them.
+        """
+        chunks = iter(chunks)
+        while True:
+            start = _now()
+            chunk = next(chunks, None)
+            timings.network += _now() - start
+            if chunk is None:
+                return
+            timings.bytes_received += len(chunk)
+            self.received_bytes += len(chunk)
+            yield chunk
+
+    def _apply_sync_response(self, resource_types, response, timings=None):
+        timings = timings or SyncTimings()
+        start = _now()
         if "temp_id_mapping" in response:
             for temp_id, new_id in response["temp_id_mapping"].items():
                 self.temp_ids[temp_id] = new_id
                 self._replace_temp_id(temp_id, new_id)
-        self._update_state(response)
-        self._write_cache()
-        return response
+        merge_start = _now()
+        timings.temp_id += merge_start - start
+        syncdata = response
+        if isinstance(response, dict) and "sync_token" in response:
+            self._set_sync_token(resource_types, response["sync_token"])
+            syncdata = dict(response)
+            del syncdata["sync_token"]
+        self._update_state(syncdata)
+        timings.merge += _now() - merge_start
+        if isinstance(syncdata, dict):
+            timings.objects += sum(
+                len(syncdata[datatype])
+                for datatype in self.state_models
+                if isinstance(syncdata.get(datatype), list)
+            )
+
+    def initial_sync(self, groups=INITIAL_SYNC_GROUPS):
+        """
+        Fetches the user's data with one request per group of resource types,
+        sent in parallel, which makes the first load of a large account
+        faster than a single sync.  Each response is parsed in its own thread,
+        and merged into the local state under a lock.  If the local state was
+        already synced, this is the same as `sync()`.
+
+        The first group is fetched before the others, and its sync token,
+        which is older than all the others, is used for all types afterwards.
+        The next sync then fetches whatever changed during the initial one
+        with a single request.
+        """
+        with self._sync_lock:
+            if self.sync_token != "*" or self.sync_tokens:
+                return self.sync()
+
+            first_types = groups[0]
+            timings = SyncTimings()
+            response = self._sync_resource_types(first_types, "*", None, timings)
+            if not isinstance(response, dict) or "sync_token" not in response:
+                return self._sync_done(response, timings)
+            oldest_sync_token = response["sync_token"]
+
+            merge_lock = threading.Lock()
+            responses = []
+            errors = []
+
+            def fetch(types):
+                # The phases of the parallel requests add up.
+                fetch_timings = SyncTimings()
+                try:
+                    if self.streaming:
+                        ret = self._stream_sync(
+                            types, "*", merge_lock, timings=fetch_timings
+                        )
+                    else:
+                        ret = self._fetch(types, "*", timings=fetch_timings)
+                        with merge_lock:
+                            self._apply_sync_response(types, ret, fetch_timings)
+                    with merge_lock:
+                        responses.append(ret)
+                except Exception as e:
+                    errors.append(e)
+                with merge_lock:
+                    timings.add(fetch_timings)
+
+            threads = [
+                threading.Thread(target=fetch, args=(types,)) for types in groups[1:]
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            if not errors:
+                types = set(t for group_types in groups for t in group_types)
+                self._set_sync_token(sorted(types), oldest_sync_token)
+            # Otherwise, the types which were fetched keep their own tokens.
+            start = _now()
+            self._write_cache()
+            timings.cache_write += _now() - start
+            if errors:
+                raise errors[0]
+
+            for ret in responses:
+                if isinstance(ret, dict):
+                    for key, value in ret.items():
+                        response.setdefault(key, value)
+            response["sync_token"] = oldest_sync_token
+            return self._sync_done(response, timings)
+
+    def _set_sync_token(self, resource_types, sync_token):
+        """
+        Records the sync token the specified resource types are synced up to.
+        """
+        if set(resource_types) >= RESOURCE_TYPES:
+            self.sync_token = sync_token
+            self.sync_tokens = {}
+            return
+        for resource_type in resource_types:
+            self.sync_tokens[resource_type] = sync_token
+        tokens = set(self.sync_tokens.values())
+        if len(self.sync_tokens) == len(RESOURCE_TYPES) and len(tokens) == 1:
+            self.sync_token = sync_token
+            self.sync_tokens = {}
 
     def commit(self, raise_on_error=True):
         """
@@ -371,25 +1005,372 @@ class TodoistAPI(object):
         synchronized to the server, unless one of the aforementioned Sync API
         calls are called directly.
         """
-        if len(self.queue) == 0:
-            return
-        ret = self.sync(commands=self.queue)
-        del self.queue[:]
-        if "sync_status" in ret:
-            if raise_on_error:
-                for k, v in ret["sync_status"].items():
-                    if v != "ok":
-                        raise SyncError(k, v)
+        with self._sync_lock:
+            if len(self.queue) == 0:
+                return
+            ret, failures, _ = self._commit_commands(self.queue.snapshot())
+        self._check_failures(failures, raise_on_error)
         return ret
 
+    def drain(self, batch_size=COMMANDS_BATCH_SIZE, raise_on_error=True):
+        """
+        Commits all requests that are queued in batches of at most
+        `batch_size` commands, which is how a queue that was filled while the
+        server was unreachable, or replayed from the journal, should be sent.
+        If the server can't be reached, the commands that weren't sent are
+        kept in the queue.  Returns the number of commands that were sent.
+        """
+        sent = 0
+        failures = []
+        while len(self.queue) > 0:
+            with self._sync_lock:
+                batch = self.queue.snapshot(batch_size)
+                try:
+                    ret, batch_failures, unknown = self._commit_commands(batch)
+                except requests.exceptions.RequestException:
+                    break
+            sent += len(batch) - len(unknown)
+            failures += batch_failures
+            if len(unknown) == len(batch):
+                break  # no progress, leave them for the next attempt
+        self._check_failures(failures, raise_on_error)
+        return sent
+
+    def retry_failed(self):
+        """
+        Moves the requests which failed when they were committed back to the
+        queue, so that they are sent again on the next commit.
+        """
+        with self._sync_lock:
+            failed = self.retry_queue[:]
+            del self.retry_queue[:]
+        self.queue.extend(failed)
+        return failed
+
+    def drop_failed(self, cmds=None):
+        """
+        Forgets for good the requests which failed when they were committed,
+        all of them or the specified ones, removing them from the retry queue
+        and from the journal of the queue, if any.
+        """
+        with self._sync_lock:
+            dropped = self.retry_queue[:] if cmds is None else list(cmds)
+            uuids = set(cmd.get("uuid") for cmd in dropped)
+            self.retry_queue[:] = [
+                cmd for cmd in self.retry_queue if cmd.get("uuid") not in uuids
+            ]
+            with self.queue.lock:
+                if self.queue.journal:
+                    self.queue.journal.acknowledge(uuids)
+        return dropped
+
+    def _commit_commands(self, commands):
+        """
+        Sends the specified queued commands, and maps the results reported in
+        `sync_status` back to them.  Succeeded commands are removed from the
+        queue, commands that failed with a transient error are retried with
+        backoff, and the rest of the failed ones are moved to the retry queue.
+        Returns the response to the first request, along with the failed
+        `(command, error)` pairs, and the commands whose outcome is unknown.
+
+        If the request had to be resent (see `_sync_resending()`), the server
+        may already have applied the commands, but it deduplicates them by
+        uuid.  In that case, commands missing from `sync_status` are kept in
+        the queue as their outcome is unknown, rather than assumed to be ok.
+        """
+        first_ret = None
+        failures = []
+        unknown = []
+        attempt = 0
+        commands = [self._resolve_temp_ids(cmd) for cmd in commands]
+        while commands:
+            self.metrics.get("todoist_commit_commands").observe(len(commands))
+            ret, resent = self._sync_resending(commands)
+            if first_ret is None:
+                first_ret = ret
+            elif (
+                isinstance(first_ret, dict)
+                and isinstance(ret, dict)
+                and "sync_status" in ret
+            ):
+                first_ret.setdefault("sync_status", {}).update(ret["sync_status"])
+            if isinstance(ret, dict) and "sync_status" in ret:
+                sync_status = ret["sync_status"]
+            else:
+                # The whole request failed, e.g. with {"error": ...,
+                # "http_code": 503}, and so did every command.
+                sync_status = dict((cmd.get("uuid"), ret) for cmd in commands)
+
+            transient = []
+            failed = []
+            for cmd in commands:
+                if resent and cmd.get("uuid") not in sync_status:
+                    unknown.append(cmd)
+                    continue
+                error = sync_status.get(cmd.get("uuid"), "ok")
+                if is_ok_status(error):
+                    continue
+                elif attempt < self.max_retries and is_transient_status(error):
+                    transient.append(cmd)
+                else:
+                    failed.append((cmd, error))
+
+            kept = set(id(cmd) for cmd in transient + unknown)
+            done = [cmd for cmd in commands if id(cmd) not in kept]
+            failed_cmds = [cmd for cmd, _ in failed]
+            if self.optimistic is not None:
+                self.optimistic.rollback(failed_cmds)
+                self.optimistic.settle(done)
+            created = dict(
+                (cmd["temp_id"], self.temp_ids[cmd["temp_id"]])
+                for cmd in done
+                if cmd.get("temp_id") in self.temp_ids
+            )
+            # The failed commands stay in the journal, until they are queued
+            # again or dropped for good.
+            rejected = set(id(cmd) for cmd in failed_cmds)
+            self.queue.discard(
+                [cmd for cmd in done if id(cmd) not in rejected],
+                created,
+                failed=failed_cmds,
+            )
+            self.retry_queue.extend(failed_cmds)
+            failures += failed
+            self.metrics.get("todoist_commands_failed_total").inc(len(failed))
+            if transient:
+                self.metrics.get("todoist_command_retries_total").inc(len(transient))
+                self.backoff.sleep(attempt)
+                attempt += 1
+            commands = transient
+        return first_ret, failures, unknown
+
+    def _sync_resending(self, commands):
+        """
+        Sends the specified commands, and if the request times out or the
+        connection fails, resends them up to `max_resends` times.  Since the
+        very same commands are resent, with their original uuids, the server
+        won't apply twice the ones it already applied.  Returns the response,
+        and whether the commands had to be resent.
+        """
+        attempt = 0
+        while True:
+            try:
+                return self.sync(commands=commands), attempt > 0
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ):
+                if attempt >= self.max_resends:
+                    raise
+                self.metrics.get("todoist_resends_total").inc()
+                self.backoff.sleep(attempt)
+                attempt += 1
+
+    def _check_failures(self, failures, raise_on_error):
+        if failures and raise_on_error:
+            cmd, error = failures[0]
+            raise SyncError(cmd.get("uuid"), error, failures)
+
+    def enable_auto_commit(
+        self, max_commands=COMMANDS_BATCH_SIZE, max_delay=1.0, on_error=None
+    ):
+        """
+        Starts committing the queued requests from a background thread, as
+        soon as `max_commands` of them are queued, or the oldest one has been
+        queued for `max_delay` seconds.  Errors raised while committing are
+        passed to `on_error`, if specified.
+        """
+        self.disable_auto_commit()
+        self.auto_committer = AutoCommitter(
+            self, max_commands=max_commands, max_delay=max_delay, on_error=on_error
+        )
+        self.auto_committer.start()
+        return self.auto_committer
+
+    def disable_auto_commit(self, flush=True):
+        """
+        Stops committing the queued requests in the background, committing
+        what is left in the queue unless told otherwise.
+        """
+        if self.auto_committer is not None:
+            self.auto_committer.stop(flush=flush)
+            self.auto_committer = None
+
+    def enable_push(
+        self, debounce=1.0, max_delay=5.0, on_sync=None, on_error=None, url=None
+    ):
+        """
+        Starts listening to the websocket of the user from a background
+        thread, and syncs whenever the server notifies of a change, once no
+        other notification arrived for `debounce` seconds (or at most
+        `max_delay` seconds after the first one).  The URL is taken from the
+        synced user, unless specified.
+        """
+        self.disable_push()
+        self.push_listener = PushListener(
+            self,
+            url=url,
+            debounce=debounce,
+            max_delay=max_delay,
+            on_sync=on_sync,
+            on_error=on_error,
+        )
+        self.push_listener.start()
+        return self.push_listener
+
+    def disable_push(self):
+        """
+        Stops listening to the websocket of the user.
+        """
+        if self.push_listener is not None:
+            self.push_listener.stop()
+            self.push_listener = None
+
+    def enable_polling(
+        self,
+        min_interval=5.0,
+        max_interval=300.0,
+        factor=2.0,
+        on_sync=None,
+        on_error=None,
+    ):
+        """
+        Starts syncing from a background thread, at an interval between
+        `min_interval` and `max_interval` seconds, which grows by `factor`
+        while the syncs bring no changes.  `on_sync` is called with the API
+        object and the response of the syncs bringing changes, and `on_error`
+        with the errors, both from a separate thread.
+        """
+        self.disable_polling()
+        self.poller = Poller(
+            self,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            factor=factor,
+            on_sync=on_sync,
+            on_error=on_error,
+        )
+        self.poller.start()
+        return self.poller
+
+    def disable_polling(self):
+        """
+        Stops syncing in the background.
+        """
+        if self.poller is not None:
+            self.poller.stop()
+            self.poller = None
+
+    def enable_item_columns(self):
+        """
+        Builds a columnar copy of the items of the local state, backed by
+        NumPy arrays, and keeps it up to date with the changes to the items
+        from then on.  See `todoist.columnar.ItemColumns`.
+        """
+        # Imported here, as it imports NumPy.
+        from todoist.columnar import ItemColumns
+
+        with self._state_lock:
+            self.disable_item_columns()
+            self.item_columns = ItemColumns(self.state["items"])
+            self.state_listeners.append(self._update_item_columns)
+            return self.item_columns
+
+    def disable_item_columns(self):
+        with self._state_lock:
+            if self.item_columns is not None:
+                self.state_listeners.remove(self._update_item_columns)
+                self.item_columns = None
+
+    def _update_item_columns(self, datatype, obj, removed):
+        if datatype != "items":
+            return
+        if removed:
+            self.item_columns.remove(obj)
+        else:
+            self.item_columns.update(obj)
+
+    def priority(self):
+        """
+        Context manager which marks the requests queued inside it as urgent,
+        so that the background committer sends them right away.
+        """
+        return self.queue.priority()
+
+    def _resolve_temp_ids(self, cmd):
+        """
+        Replaces the temporary ids referenced by a command with the real ids
+        already received from the server, since the server only resolves the
+        temporary ids created within the same request.
+        """
+        args = cmd.get("args")
+        if not isinstance(args, dict) or not self.temp_ids:
+            return cmd
+        for key, value in args.items():
+            if not isinstance(value, (dict, list)) and value in self.temp_ids:
+                args[key] = self.temp_ids[value]
+        return cmd
+
     # Miscellaneous
 
+    def apply_event(self, event_name, payload, flush=False):
+        """
+        Applies a webhook event to the local state, without syncing: the
+        object it carries (`event_data`, which can also be passed on its own)
+        is merged the same way as the data of a sync.  Returns whether the
+        event was applied: the events which don't update any object, such as
+        `reminder:fired`, are ignored.
+
+        Writing the whole cache for every event would be slow, so it's only
+        written once `cache_flush_interval` seconds passed since it last was,
+        or if `flush` is true.  Otherwise, the changes are written by the next
+        sync, or by `flush_cache()`.  The cache remains consistent meanwhile,
+        as its sync token is written along with the state.
+        """
+        if "event_data" in payload:
+            payload = payload["event_data"]
+        objtype, _, action = event_name.partition(":")
+        datatype = WEBHOOK_OBJECT_TYPES.get(objtype)
+        if datatype is None or action not in WEBHOOK_ACTIONS:
+            return False
+        if datatype == "notes" and not payload.get("item_id"):
+            datatype = "project_notes"
+        remoteobj = dict(payload)
+        remoteobj.update(WEBHOOK_ACTIONS[action])
+        with self._sync_lock:
+            self._update_state({datatype: [remoteobj]})
+            self._cache_dirty = True
+            if (
+                flush
+                or self._cache_written is None
+                or _now() - self._cache_written >= self.cache_flush_interval
+            ):
+                self._write_cache()
+        return True
+
+    def flush_cache(self):
+        """
+        Writes the changes applied by webhook events to the cache, if any.
+        """
+        with self._sync_lock:
+            if self._cache_dirty:
+                self._write_cache()
+
+    def memory_report(self, trace_sync=False, top=10):
+        """
+        Returns an estimate of the memory used by the local state, by type of
+        objects and by field, along with the duplicated strings.  With
+        `trace_sync`, also syncs, and reports what the sync allocated
+        according to `tracemalloc`.  See `todoist.memory.memory_report()`.
+        """
+        return memory_report(self, trace_sync=trace_sync, top=top)
+
     def query(self, queries, **kwargs):
         """
         DEPRECATED: query endpoint is deprecated for a long time and this
         method will be removed in the next major version of todoist-python
         """
-        params = {"queries": json_dumps(queries), "token": self.token}
+        params = {"queries": self.codec.dumps(queries), "token": self.token}
         params.update(kwargs)
         return self._get("query", params=params)
 
@@ -412,17 +1393,30 @@ class TodoistAPI(object):
         return "%s%s(%s)" % (name, unsaved, email_repr)
 
 
-def state_default(obj):
-    return obj.data
+def is_ok_status(status):
+    """
+    Returns whether a command succeeded, given its entry in sync_status.
+    """
+    if status == "ok":
+        return True
+    # Commands acting on several objects report a status for each of them.
+    return (
+        isinstance(status, dict)
+        and "error" not in status
+        and all(is_ok_status(v) for v in status.values())
+    )
 
 
-def json_default(obj):
-    if isinstance(obj, datetime.datetime):
-        return obj.strftime("%Y-%m-%dT%H:%M:%S")
-    elif isinstance(obj, datetime.date):
-        return obj.strftime("%Y-%m-%d")
-    elif isinstance(obj, datetime.time):
-        return obj.strftime("%H:%M:%S")
+def is_transient_status(status):
+    """
+    Returns whether a command failed with an error worth retrying, given its
+    entry in sync_status.
+    """
+    return isinstance(status, dict) and status.get("http_code") in TRANSIENT_HTTP_CODES
+
+
+def state_default(obj):
+    return obj.data
 
 
-json_dumps = functools.partial(json.dumps, separators=",:", default=json_default)
+json_dumps = functools.partial(default_codec.dumps, default=json_default)
@@ -0,0 +1,164 @@
+"""
+Background committer, which flushes the command queue on its own.
+
+The queue is flushed as soon as it holds `max_commands` commands, or when the
+oldest queued command has been waiting for `max_delay` seconds, whichever
+comes first.  Commands queued with priority are flushed right away.
+
+Usage example.
+
+```python
+import todoist
+api = todoist.TodoistAPI(token)
+api.enable_auto_commit(max_commands=50, max_delay=0.5)
+
+for line in lines:
+    api.items.add(line)  # no commit() required
+
+with api.priority():
+    api.items.complete(item_id)  # sent immediately
+
+print(api.auto_committer.stats())
+api.disable_auto_commit()  # flushes whatever is left
+```
+"""
+import threading
+import time
+
+_now = getattr(time, "monotonic", time.time)
+
+
+class AutoCommitter(object):
+    """
+    Flushes the command queue of an API object from a background thread.
+    """
+
+    def __init__(self, api, max_commands=100, max_delay=1.0, on_error=None):
+        self.api = api
+        self.max_commands = max_commands
+        self.max_delay = max_delay
+        self.on_error = on_error
+        self.last_error = None
+
+        # metrics
+        self.flushes = 0
+        self.flushed_commands = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+        self._cond = threading.Condition()
+        self._first_queued = None
+        self._urgent = False
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        """
+        Starts the background thread.
+        """
+        if self._thread is not None:
+            return
+        self._stopped = False
+        self.api.queue.listeners.append(self._on_queued)
+        if len(self.api.queue) > 0:
+            self._first_queued = _now()
+        self._thread = threading.Thread(target=self._run, name="todoist-autocommit")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, flush=True):
+        """
+        Stops the background thread, flushing the queue one last time unless
+        told otherwise.
+        """
+        if self._thread is None:
+            return
+        self.api.queue.listeners.remove(self._on_queued)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """
+        Sends all the queued commands now.
+        """
+        if len(self.api.queue) == 0:
+            return
+        start = _now()
+        try:
+            self.flushed_commands += self.api.drain(batch_size=self.max_commands)
+        except Exception as e:
+            self.last_error = e
+            if self.on_error is not None:
+                self.on_error(e)
+        latency = _now() - start
+        self.flushes += 1
+        self.last_flush_latency = latency
+        self.total_flush_latency += latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+
+    @property
+    def queue_depth(self):
+        return len(self.api.queue)
+
+    def stats(self):
+        """
+        Returns the queue depth and flush latency metrics.
+        """
+        return {
+            "queue_depth": self.queue_depth,
+            "flushes": self.flushes,
+            "flushed_commands": self.flushed_commands,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+            "avg_flush_latency": (
+                self.total_flush_latency / self.flushes if self.flushes else 0.0
+            ),
+        }
+
+    def _on_queued(self, cmds, priority):
+        with self._cond:
+            wake_up = priority or len(self.api.queue) >= self.max_commands
+            if self._first_queued is None:
+                # The thread has to learn about the new deadline.
+                self._first_queued = _now()
+                wake_up = True
+            if priority:
+                self._urgent = True
+            if wake_up:
+                self._cond.notify()
+
+    def _is_due(self):
+        if len(self.api.queue) == 0:
+            return False
+        if self._urgent or len(self.api.queue) >= self.max_commands:
+            return True
+        if self._first_queued is None:
+            self._first_queued = _now()
+        return _now() - self._first_queued >= self.max_delay
+
+    def _timeout(self):
+        if self._first_queued is None:
+            return None
+        return max(0, self._first_queued + self.max_delay - _now())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not self._is_due():
+                    self._cond.wait(self._timeout())
+                if self._stopped:
+                    return
+                self._urgent = False
+                self._first_queued = None
+            self.flush()
+            with self._cond:
+                # Whatever couldn't be sent, or was queued during the flush,
+                # waits for the next round.
+                if self._first_queued is None and len(self.api.queue) > 0:
+                    self._first_queued = _now()
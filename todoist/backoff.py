@@ -0,0 +1,38 @@
+"""
+Exponential backoff between retries.
+"""
+import random
+import time
+
+
+class Backoff(object):
+    """
+    Computes the delay before each retry: `base` seconds before the first
+    one, multiplied by `factor` before each of the following ones, up to
+    `max_delay` seconds.  With `jitter`, a random delay between zero and the
+    computed one is used instead, so that clients don't retry in lockstep.
+    """
+
+    def __init__(self, base=0.5, factor=2.0, max_delay=30.0, jitter=True):
+        self.base = base
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        """
+        Returns the delay before the retry number `attempt` (starting at 0).
+        """
+        delay = min(self.max_delay, self.base * self.factor ** attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def sleep(self, attempt):
+        """
+        Sleeps before the retry number `attempt`.
+        """
+        delay = self.delay(attempt)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
@@ -0,0 +1,100 @@
+"""
+JSON codecs used to encode the requests, and to decode the responses and the
+local cache.
+
+The fastest codec installed is picked by default: `orjson` if available, and
+the standard `json` module otherwise.  A codec can also be picked by name:
+
+```python
+import todoist
+api = todoist.TodoistAPI(token, codec="json")
+```
+"""
+import datetime
+import json
+
+
+def json_default(obj):
+    if isinstance(obj, datetime.datetime):
+        return obj.strftime("%Y-%m-%dT%H:%M:%S")
+    elif isinstance(obj, datetime.date):
+        return obj.strftime("%Y-%m-%d")
+    elif isinstance(obj, datetime.time):
+        return obj.strftime("%H:%M:%S")
+
+
+class JSONCodec(object):
+    """
+    Codec based on the standard `json` module, always available.
+    """
+
+    name = "json"
+
+    def dumps(self, obj, default=json_default, pretty=False):
+        """
+        Encodes an object as a JSON string, either compact, or indented with
+        sorted keys if `pretty`.  Objects that can't be encoded natively
+        (including dates and times) are passed to `default`.
+        """
+        if pretty:
+            return json.dumps(obj, indent=2, sort_keys=True, default=default)
+        return json.dumps(obj, separators=(",", ":"), default=default)
+
+    def loads(self, data):
+        """
+        Decodes a JSON string or UTF-8 encoded bytes.
+        """
+        if isinstance(data, bytes) and not isinstance(data, str):
+            data = data.decode("utf-8")
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Codec based on `orjson`.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self.orjson = orjson
+        # Dates and times go through `default`, to be formatted the same way
+        # as with the standard codec.
+        self.options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, default=json_default, pretty=False):
+        options = self.options
+        if pretty:
+            options |= self.orjson.OPT_INDENT_2 | self.orjson.OPT_SORT_KEYS
+        return self.orjson.dumps(obj, default=default, option=options).decode("utf-8")
+
+    def loads(self, data):
+        return self.orjson.loads(data)
+
+
+#: Codecs by order of preference.
+CODECS = [OrjsonCodec, JSONCodec]
+
+
+def get_codec(codec=None):
+    """
+    Returns a codec: the specified one if it's a codec already, the one with
+    the specified name, or otherwise the first available one.
+    """
+    if codec is not None and not isinstance(codec, str):
+        return codec
+    for codec_class in CODECS:
+        if codec is not None and codec_class.name != codec:
+            continue
+        try:
+            return codec_class()
+        except ImportError:
+            if codec is not None:
+                raise
+    raise ValueError("Unknown codec: %r" % codec)
+
+
+#: Codec used when none is specified.
+default_codec = get_codec()
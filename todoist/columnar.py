@@ -0,0 +1,334 @@
+"""
+Columnar copy of the items of the local state, backed by NumPy arrays, for
+statistics over all of the items without looping over the models.
+
+Numeric fields are stored as integer arrays, dates as `datetime64[s]` arrays
+(NaT when missing), and the ids of projects, sections and users are
+dictionary-encoded: each column holds small integer codes, the index of the
+id in a table of the distinct values (-1 for None).  The store is kept up to
+date with the changes to the items of the local state, whether they come from
+the syncs, the cache, the webhook events or local changes.  NumPy is only
+needed, and imported, once it's enabled.
+
+Usage example.
+
+```python
+import todoist
+api = todoist.TodoistAPI(token)
+api.sync()
+
+columns = api.enable_item_columns()
+print(columns.count_by("priority"))
+print(columns.completion_rates(by="project_id"))
+
+overdue = (columns["due"] < columns.now()) & (columns["checked"] == 0)
+for item in columns.select(overdue & columns.where(project_id=project_id)):
+    print(item["content"])
+```
+"""
+numpy = None  # Imported by the first ItemColumns, see _import_numpy()
+
+try:
+    _STRING_TYPES = (basestring,)  # type: ignore  # Python 2
+except NameError:
+    _STRING_TYPES = (str,)
+
+#: Integer columns, read from the fields of the same name (-1 when missing, or
+#: not an integer, such as the temporary id of an item added locally).
+INTEGER_COLUMNS = (
+    ("id", "int64"),
+    ("priority", "int8"),
+    ("checked", "int8"),
+    ("in_history", "int8"),
+    ("child_order", "int32"),
+    ("day_order", "int32"),
+)
+#: Dictionary-encoded columns.
+ENCODED_COLUMNS = (
+    "project_id",
+    "section_id",
+    "parent_id",
+    "responsible_uid",
+    "added_by_uid",
+)
+#: Date columns, the due date included.
+DATE_COLUMNS = ("due", "date_added", "date_completed")
+
+_NAT = "NaT"
+
+
+class ItemColumns(object):
+    """
+    Arrays holding a row per item, in no particular order.  The columns are
+    accessed by name (`columns["priority"]`), as views of `len(columns)`
+    elements which are only valid until the next change.
+    """
+
+    def __init__(self, items=(), capacity=1024):
+        _import_numpy()
+        self.size = 0
+        self.capacity = capacity
+        self._arrays = {}
+        for name, dtype in INTEGER_COLUMNS:
+            self._arrays[name] = numpy.empty(capacity, dtype=dtype)
+        for name in ENCODED_COLUMNS:
+            self._arrays[name] = numpy.empty(capacity, dtype="int32")
+        for name in DATE_COLUMNS:
+            self._arrays[name] = numpy.empty(capacity, dtype="datetime64[s]")
+        self._values = dict((name, []) for name in ENCODED_COLUMNS)
+        self._codes = dict((name, {}) for name in ENCODED_COLUMNS)
+        self._items = []  # row -> item
+        self._rows = {}  # id() of the item -> row
+        self._load(items)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        return self._arrays[name][: self.size]
+
+    def __contains__(self, item):
+        return id(item) in self._rows
+
+    def update(self, item):
+        """
+        Adds an item, or refreshes its row after it changed.
+        """
+        data = item.data
+        due = data.get("due")
+        # Converted before the row is allocated, so that it's never left
+        # half written.
+        values = [(name, _integer(data.get(name))) for name, _ in INTEGER_COLUMNS]
+        values.extend(
+            (name, self.encode(name, data.get(name))) for name in ENCODED_COLUMNS
+        )
+        values.append(("due", _datetime64(due.get("date") if due else None)))
+        for name in ("date_added", "date_completed"):
+            values.append((name, _datetime64(data.get(name))))
+
+        row = self._rows.get(id(item))
+        if row is None:
+            if self.size == self.capacity:
+                self._grow()
+            row = self.size
+            self.size += 1
+            self._rows[id(item)] = row
+            self._items.append(item)
+        arrays = self._arrays
+        for name, value in values:
+            arrays[name][row] = value
+
+    def remove(self, item):
+        """
+        Removes the row of an item, replacing it with the last row.
+        """
+        row = self._rows.pop(id(item), None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            for array in self._arrays.values():
+                array[row] = array[last]
+            moved = self._items[last]
+            self._items[row] = moved
+            self._rows[id(moved)] = row
+        self._items.pop()
+        self.size = last
+
+    def clear(self):
+        self.size = 0
+        self._items = []
+        self._rows = {}
+
+    def encode(self, name, value, add=True):
+        """
+        Returns the code of a value of a dictionary-encoded column, adding it
+        to the table unless `add` is false (-2 is returned for values not in
+        the table then, which match no row).
+        """
+        if value is None:
+            return -1
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None:
+            if not add:
+                return -2
+            code = codes[value] = len(self._values[name])
+            self._values[name].append(value)
+        return code
+
+    def decode(self, name, code):
+        return None if code < 0 else self._values[name][code]
+
+    def where(self, **conditions):
+        """
+        Returns the boolean mask of the rows whose columns equal the values
+        specified, or any of them when a list, tuple or set is specified.
+        Ids are specified as is, and translated to their codes.
+        """
+        mask = numpy.ones(self.size, dtype=bool)
+        for name, value in conditions.items():
+            column = self[name]
+            many = isinstance(value, (list, tuple, set, frozenset))
+            values = list(value) if many else [value]
+            if name in self._codes:
+                values = [self.encode(name, v, add=False) for v in values]
+            elif name in DATE_COLUMNS:
+                values = [_datetime64(v) for v in values]
+            if many:
+                mask &= numpy.isin(column, values)
+            else:
+                mask &= column == values[0]
+        return mask
+
+    def select(self, mask=None):
+        """
+        Returns the items of the rows selected by a mask, or all of them.
+        """
+        if mask is None:
+            return list(self._items)
+        items = self._items
+        return [items[row] for row in numpy.flatnonzero(mask)]
+
+    def count_by(self, name, mask=None):
+        """
+        Returns the number of rows (selected by `mask`) for each value of a
+        column, ids and dates included.
+        """
+        column = self[name]
+        if mask is not None:
+            column = column[mask]
+        if name in self._codes:
+            # Codes start at -1 (None).
+            counts = numpy.bincount(column + 1, minlength=1)
+            return dict(
+                (self.decode(name, code - 1), int(count))
+                for code, count in enumerate(counts)
+                if count
+            )
+        values, counts = numpy.unique(column, return_counts=True)
+        if name in DATE_COLUMNS:
+            values = [None if numpy.isnat(v) else v.astype(object) for v in values]
+        else:
+            values = values.tolist()
+        return dict(zip(values, counts.tolist()))
+
+    def count_by_date(self, name="due", unit="D", mask=None):
+        """
+        Returns the number of rows (selected by `mask`) for each day (or other
+        NumPy time `unit`, such as "W" or "M") of a date column, omitting the
+        rows with no date.
+        """
+        column = self[name]
+        if mask is not None:
+            column = column[mask]
+        column = column[~numpy.isnat(column)].astype("datetime64[%s]" % unit)
+        values, counts = numpy.unique(column, return_counts=True)
+        return dict(zip(values.astype(object).tolist(), counts.tolist()))
+
+    def completion_rates(self, by="project_id", mask=None):
+        """
+        Returns the fraction of the items (selected by `mask`) which are
+        checked, for each value of a dictionary-encoded column.
+        """
+        codes = self[by] + 1
+        checked = self["checked"] == 1
+        if mask is not None:
+            codes, checked = codes[mask], checked[mask]
+        totals = numpy.bincount(codes, minlength=1)
+        done = numpy.bincount(codes, weights=checked, minlength=len(totals))
+        return dict(
+            (self.decode(by, code - 1), float(done[code]) / total)
+            for code, total in enumerate(totals.tolist())
+            if total
+        )
+
+    def now(self):
+        """
+        Returns the current UTC time, to compare with the date columns.
+        """
+        return numpy.datetime64("now", "s")
+
+    def _load(self, items):
+        """
+        Adds items in bulk, converting each column at once.
+        """
+        items = [item for item in items if id(item) not in self._rows]
+        if not items:
+            return
+        start, end = self.size, self.size + len(items)
+        while self.capacity < end:
+            self._grow()
+        datas = [item.data for item in items]
+        arrays = self._arrays
+        for name, _ in INTEGER_COLUMNS:
+            values = [data.get(name) for data in datas]
+            arrays[name][start:end] = [_integer(v) for v in values]
+        for name in ENCODED_COLUMNS:
+            encode = self.encode
+            arrays[name][start:end] = [encode(name, data.get(name)) for data in datas]
+        dues = [data.get("due") for data in datas]
+        arrays["due"][start:end] = _datetime64_array(
+            [due.get("date") if due else None for due in dues]
+        )
+        for name in ("date_added", "date_completed"):
+            values = [data.get(name) for data in datas]
+            arrays[name][start:end] = _datetime64_array(values)
+        for row, item in enumerate(items, start):
+            self._rows[id(item)] = row
+        self._items.extend(items)
+        self.size = end
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, array in self._arrays.items():
+            grown = numpy.empty(self.capacity, dtype=array.dtype)
+            grown[: self.size] = array[: self.size]
+            self._arrays[name] = grown
+
+
+def _import_numpy():
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as module
+        except ImportError:
+            raise ImportError("ItemColumns requires NumPy")
+        numpy = module
+
+
+def _integer(value):
+    if value is None:
+        return -1
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+def _datetime64(value):
+    """
+    Converts a date of the API ("2020-01-02", "2020-01-02T10:00:00" or
+    "2020-01-02T10:00:00Z") to a `datetime64[s]`, NaT if missing or invalid.
+    """
+    if not value:
+        return numpy.datetime64(_NAT, "s")
+    if isinstance(value, _STRING_TYPES) and value.endswith("Z"):
+        value = value[:-1]
+    try:
+        return numpy.datetime64(value, "s")
+    except ValueError:
+        return numpy.datetime64(_NAT, "s")
+
+
+def _datetime64_array(values):
+    try:
+        return numpy.array(
+            [
+                value[:-1] if value and value.endswith("Z") else value or _NAT
+                for value in values
+            ],
+            dtype="datetime64[s]",
+        )
+    except ValueError:  # Invalid dates, converted one by one.
+        return numpy.array([_datetime64(value) for value in values])
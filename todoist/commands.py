@@ -0,0 +1,442 @@
+"""
+Queue of the commands that are waiting to be sent to the server.
+
+The queue behaves like a plain list, so the managers simply append their
+commands to it, but a journal can optionally be attached to it.  In that case
+every queued command is also recorded in an append-only file, and it's only
+forgotten once the server has acknowledged it.  This means that the pending
+commands survive a crash of the process, and that they can be queued while
+the server is unreachable, to be sent later on.
+
+Usage example.
+
+```python
+import todoist
+api = todoist.TodoistAPI(token, persist_queue=True)
+
+# Commands queued before a crash are already back in the queue at this point.
+api.items.add("Buy milk")
+
+# Send the queue in batches, keeping whatever couldn't be sent.
+api.drain()
+```
+"""
+import contextlib
+import os
+import threading
+import time
+
+from todoist.codec import default_codec
+
+_now = getattr(time, "monotonic", time.time)
+# Atomic on Python 3, and on POSIX with Python 2.
+_replace = getattr(os, "replace", os.rename)
+
+
+class QueueFull(Exception):
+    """
+    Raised when a command can't be queued because the queue is full.
+    """
+
+    pass
+
+
+class CommandJournal(object):
+    """
+    Append-only file which records the queued commands.
+
+    Each line of the file is a JSON object, either `{"cmd": {...}}` when a
+    command is queued, or `{"ack": [uuid, ...], "temp_ids": {...}}` when some
+    commands were acknowledged by the server and don't have to be sent again,
+    along with the real ids of the objects they created.  Pending commands
+    may reference these temporary ids, which the server can't resolve once
+    the commands creating them were sent.  Commands which the server
+    rejected are recorded with `{"failed": [uuid, ...]}`, and kept (see
+    `failed`) until they are queued again, or acknowledged to drop them.
+
+    The journal is compacted once `compact_after` commands were
+    acknowledged, so that it doesn't grow while the queue never empties.
+    """
+
+    def __init__(self, path, fsync=False, codec=default_codec, compact_after=1000):
+        self.path = path
+        self.fsync = fsync
+        self.codec = codec
+        self.compact_after = compact_after
+        self.acknowledged = 0  # commands acknowledged since the last compaction
+        self.temp_ids = {}  # temporary ids -> real ids, recorded and replayed
+        self.failed = []  # commands rejected by the server, recorded and replayed
+
+    def record(self, cmd):
+        """
+        Records a newly queued command.
+        """
+        self._write([{"cmd": cmd}])
+        self._forget_failed([cmd.get("uuid")])
+
+    def record_many(self, cmds):
+        """
+        Records several newly queued commands at once.
+        """
+        self._write([{"cmd": cmd} for cmd in cmds])
+        self._forget_failed(cmd.get("uuid") for cmd in cmds)
+
+    def fail(self, cmds):
+        """
+        Records that the server rejected the specified commands, which are
+        replayed into `failed` rather than queued again.
+        """
+        cmds = list(cmds)
+        if cmds:
+            self._write([{"failed": [cmd.get("uuid") for cmd in cmds]}])
+            self.failed.extend(cmds)
+
+    def acknowledge(self, uuids, temp_ids=None):
+        """
+        Records that the commands with the specified uuids were handled, and
+        the real ids of the temporary ids they created, if any.
+        """
+        uuids = list(uuids)
+        if uuids:
+            entry = {"ack": uuids}
+            if temp_ids:
+                entry["temp_ids"] = temp_ids
+                self.temp_ids.update(temp_ids)
+            self._write([entry])
+            self.acknowledged += len(uuids)
+            self._forget_failed(uuids)
+
+    def replay(self):
+        """
+        Returns the commands which were recorded but never acknowledged, in
+        the order they were queued, and with duplicated uuids removed.  The
+        temporary ids recorded are read into `temp_ids`, and the commands
+        which failed, unless they were queued again, into `failed`.
+        """
+        self._recover()
+        pending = []
+        seen = set()
+        acked = set()
+        failed = {}  # uuid -> whether it's still failed
+        try:
+            f = open(self.path)
+        except IOError:
+            return pending
+        with f:
+            for line in f:
+                try:
+                    entry = self.codec.loads(line)
+                except ValueError:
+                    # A partially written line, left behind by a crash.
+                    continue
+                if "cmd" in entry:
+                    uuid = entry["cmd"].get("uuid")
+                    if uuid not in seen:
+                        seen.add(uuid)
+                        pending.append(entry["cmd"])
+                    if uuid in failed:
+                        failed[uuid] = False  # queued again
+                if "ack" in entry:
+                    acked.update(entry["ack"])
+                if "failed" in entry:
+                    failed.update((uuid, True) for uuid in entry["failed"])
+                if "temp_ids" in entry:
+                    self.temp_ids.update(entry["temp_ids"])
+        pending = [cmd for cmd in pending if cmd.get("uuid") not in acked]
+        self.failed = [cmd for cmd in pending if failed.get(cmd.get("uuid"))]
+        return [cmd for cmd in pending if not failed.get(cmd.get("uuid"))]
+
+    def compact(self, pending):
+        """
+        Rewrites the journal so that it only contains the specified pending
+        commands and the failed ones, along with the temporary ids they
+        reference.  The new
+        journal is written aside and then moved over the current one, so that
+        either of them is left complete by a crash.
+        """
+        pending = list(pending)
+        self.temp_ids = _referenced_temp_ids(pending + self.failed, self.temp_ids)
+        self.acknowledged = 0
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            if self.temp_ids:
+                f.write(self.codec.dumps({"temp_ids": self.temp_ids}) + "\n")
+            for cmd in self.failed + pending:
+                f.write(self.codec.dumps({"cmd": cmd}) + "\n")
+            if self.failed:
+                uuids = [cmd.get("uuid") for cmd in self.failed]
+                f.write(self.codec.dumps({"failed": uuids}) + "\n")
+            self._sync(f)
+        _replace(tmp_path, self.path)
+
+    def _recover(self):
+        """
+        Cleans up after a crash during a compaction: the journal written aside
+        is only used if the current one is missing, as it may be incomplete
+        otherwise.
+        """
+        tmp_path = self.path + ".tmp"
+        if not os.path.exists(tmp_path):
+            return
+        if os.path.exists(self.path):
+            os.remove(tmp_path)
+        else:
+            _replace(tmp_path, self.path)
+
+    def _forget_failed(self, uuids):
+        if self.failed:
+            uuids = set(uuids)
+            self.failed = [cmd for cmd in self.failed if cmd.get("uuid") not in uuids]
+
+    def _write(self, entries):
+        lines = "".join(self.codec.dumps(e) + "\n" for e in entries)
+        with open(self.path, "a") as f:
+            f.write(lines)
+            self._sync(f)
+
+    def _sync(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+
+class CommandQueue(list):
+    """
+    List of the commands waiting to be sent to the server, optionally backed
+    by a journal.
+
+    The queue can be shared between threads, and listeners can be registered
+    to be told about every queued command, along with whether it was queued
+    with priority, i.e. whether it should be sent right away.  Appliers can
+    also be registered, which get the commands before they are queued, while
+    holding `apply_lock` if set, so that no other thread sees the commands
+    before they were applied.
+
+    The queue can also be bounded (see `set_limits()`), in which case queuing
+    a command while the queue is full either blocks until some commands are
+    sent, or raises `QueueFull`.
+    """
+
+    def __init__(self, iterable=(), journal=None, codec=default_codec):
+        list.__init__(self, iterable)
+        self.journal = journal
+        self.codec = codec  # Measures the encoded commands, see set_limits()
+        self.listeners = []
+        self.appliers = []
+        self.apply_lock = None
+        self.lock = threading.RLock()
+        self.max_commands = None
+        self.max_bytes = None
+        self.block = True
+        self.timeout = None
+        self.size_bytes = 0
+        self._sizes = {}
+        self._not_full = threading.Condition(self.lock)
+        self._local = threading.local()
+
+    def set_limits(self, max_commands=None, max_bytes=None, block=True, timeout=None):
+        """
+        Bounds the queue to `max_commands` commands and/or `max_bytes` bytes
+        of encoded commands.  When the queue is full, queuing a command waits
+        for the queue to be drained, up to `timeout` seconds if specified, or
+        raises `QueueFull` right away if `block` is False.
+
+        Only block when something else drains the queue, such as the
+        background committer, or the producer will wait forever.
+        """
+        with self.lock:
+            self.max_commands = max_commands
+            self.max_bytes = max_bytes
+            self.block = block
+            self.timeout = timeout
+            self._sizes = {}
+            self.size_bytes = 0
+            if max_bytes is not None:
+                for cmd in self:
+                    self._track(cmd)
+            self._not_full.notify_all()
+
+    def is_full(self, incoming_bytes=0):
+        """
+        Returns whether the queue reached its limits.
+        """
+        if len(self) == 0:
+            return False  # a single command is always accepted
+        if self.max_commands is not None and len(self) >= self.max_commands:
+            return True
+        if self.max_bytes is not None:
+            return self.size_bytes + incoming_bytes > self.max_bytes
+        return False
+
+    def append(self, cmd, priority=False):
+        incoming = self._encoded_size(cmd) if self.max_bytes is not None else 0
+        while True:
+            # Waiting for room while holding `apply_lock` would keep the
+            # committer from draining the queue, so the limits are checked
+            # again once it's held.
+            with self.lock:
+                self._wait_not_full(incoming)
+            with self._applying():
+                with self.lock:
+                    if self.is_full(incoming):
+                        continue
+                    self._apply([cmd])
+                    list.append(self, cmd)
+                    self._track(cmd)
+                    if self.journal:
+                        self.journal.record(cmd)
+                    break
+        self._notify([cmd], priority)
+
+    def extend(self, cmds, priority=False):
+        cmds = list(cmds)
+        if self.max_commands is not None or self.max_bytes is not None:
+            for cmd in cmds:
+                self.append(cmd, priority=priority)
+            return
+        with self._applying():
+            with self.lock:
+                self._apply(cmds)
+                list.extend(self, cmds)
+                if self.journal:
+                    self.journal.record_many(cmds)
+        self._notify(cmds, priority)
+
+    def discard(self, cmds, temp_ids=None, failed=()):
+        """
+        Removes the specified commands from the queue, usually after the
+        server has handled them, along with the real ids of the temporary ids
+        they created.  The `failed` ones, which the server rejected, are kept
+        in the journal.  Commands that were queued in the meantime are left
+        untouched.
+        """
+        failed = list(failed)
+        uuids = set(cmd.get("uuid") for cmd in list(cmds) + failed)
+        with self.lock:
+            self[:] = [cmd for cmd in self if cmd.get("uuid") not in uuids]
+            self._untrack(uuids)
+            journal = self.journal
+            if journal:
+                journal.temp_ids.update(temp_ids or {})
+                journal.fail(failed)
+                if len(self) == 0:
+                    journal.compact([])
+                else:
+                    failed_uuids = set(cmd.get("uuid") for cmd in failed)
+                    journal.acknowledge(uuids - failed_uuids, temp_ids)
+                    if journal.acknowledged >= journal.compact_after:
+                        journal.compact(self)
+
+    def __delitem__(self, key):
+        with self.lock:
+            removed = self[key] if isinstance(key, slice) else [self[key]]
+            list.__delitem__(self, key)
+            self._untrack(cmd.get("uuid") for cmd in removed)
+            if self.journal:
+                self.journal.acknowledge(cmd.get("uuid") for cmd in removed)
+
+    def __delslice__(self, i, j):
+        # Python 2 calls this one for `del queue[:]`.
+        self.__delitem__(slice(i, j))
+
+    def snapshot(self, limit=None):
+        """
+        Returns a copy of the first `limit` queued commands (or all of them).
+        """
+        with self.lock:
+            return list(self[:limit])
+
+    @contextlib.contextmanager
+    def priority(self):
+        """
+        Context manager which marks all the commands queued by the current
+        thread inside it as priority ones.
+        """
+        previous = getattr(self._local, "priority", False)
+        self._local.priority = True
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def attach_journal(self, journal):
+        """
+        Attaches a journal to the queue, replaying in the queue the commands
+        that are still pending in it.  Commands already in the queue are
+        deduplicated by uuid, and the journal is compacted afterwards.
+        """
+        with self.lock:
+            uuids = set(cmd.get("uuid") for cmd in self)
+            for cmd in journal.replay():
+                if cmd.get("uuid") not in uuids:
+                    uuids.add(cmd.get("uuid"))
+                    list.append(self, cmd)
+                    self._track(cmd)
+            journal.compact(self)
+            self.journal = journal
+
+    def _wait_not_full(self, incoming):
+        if self.max_commands is None and self.max_bytes is None:
+            return
+        if not self.is_full(incoming):
+            return
+        if not self.block:
+            raise QueueFull(len(self), self.size_bytes)
+        deadline = None if self.timeout is None else _now() + self.timeout
+        while self.is_full(incoming):
+            # Ask the committer, if any, to drain the queue right away.
+            self._notify([], True)
+            remaining = None if deadline is None else deadline - _now()
+            if remaining is not None and remaining <= 0:
+                raise QueueFull(len(self), self.size_bytes)
+            self._not_full.wait(remaining)
+
+    def _track(self, cmd):
+        if self.max_bytes is not None:
+            size = self._encoded_size(cmd)
+            self._sizes[cmd.get("uuid")] = size
+            self.size_bytes += size
+
+    def _untrack(self, uuids):
+        for uuid in uuids:
+            self.size_bytes -= self._sizes.pop(uuid, 0)
+        self._not_full.notify_all()
+
+    def _encoded_size(self, cmd):
+        return len(self.codec.dumps(cmd))
+
+    @contextlib.contextmanager
+    def _applying(self):
+        lock = self.apply_lock
+        if lock is None:
+            yield
+            return
+        with lock:
+            yield
+
+    def _apply(self, cmds):
+        for applier in self.appliers:
+            applier(cmds)
+
+    def _notify(self, cmds, priority):
+        priority = priority or getattr(self._local, "priority", False)
+        for listener in self.listeners:
+            listener(cmds, priority)
+
+
+def _referenced_temp_ids(cmds, temp_ids):
+    """
+    Returns the temporary ids, along with their real ids, which are arguments
+    of the specified commands.
+    """
+    if not temp_ids:
+        return {}
+    referenced = {}
+    for cmd in cmds:
+        args = cmd.get("args")
+        if not isinstance(args, dict):
+            continue
+        for value in args.values():
+            if not isinstance(value, (dict, list)) and value in temp_ids:
+                referenced[value] = temp_ids[value]
+    return referenced
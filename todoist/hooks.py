@@ -0,0 +1,114 @@
+"""
+Hooks observing the HTTP requests sent to the server.
+
+Every request sent by an API object, including the syncs and the pages of the
+archives, goes through its `http_hooks`, if set: `before_request()` is called
+with a `RequestInfo` right before sending it, and `after_response()` with the
+same object once the response arrived, or the request failed.  Requests
+resent after a rate limit are observed each time.
+
+Usage example.
+
+```python
+import todoist
+from todoist.hooks import HTTPHooks
+
+class LogHooks(HTTPHooks):
+    def after_response(self, info):
+        print(info.method, info.endpoint, info.status, info.latency)
+
+api = todoist.TodoistAPI(token)
+api.http_hooks = LogHooks()
+```
+"""
+try:
+    from urllib.parse import urlsplit
+except ImportError:  # Python 2
+    from urlparse import urlsplit  # type: ignore
+
+
+class RequestInfo(object):
+    """
+    Describes an HTTP request, and then its response.
+    """
+
+    def __init__(self, method, url, request_bytes=0, command_count=0):
+        self.method = method
+        self.url = url
+        # Approximate size of the parameters, and then size of the body sent
+        self.request_bytes = request_bytes
+        self.command_count = command_count  # commands sent along
+        self.status = None  # HTTP status of the response
+        self.response_bytes = None  # size of the body, if known
+        self.latency = None  # seconds until the response, or the failure
+        self.error = None  # exception raised while sending
+
+    @property
+    def endpoint(self):
+        """
+        Path of the URL, such as `/sync/v8/sync`.
+        """
+        return urlsplit(self.url).path
+
+    def __repr__(self):
+        return "RequestInfo(%s %s, status=%r, latency=%r)" % (
+            self.method,
+            self.endpoint,
+            self.status,
+            self.latency,
+        )
+
+
+class HTTPHooks(object):
+    """
+    Hooks which do nothing, to be subclassed.
+    """
+
+    def before_request(self, info):
+        pass
+
+    def after_response(self, info):
+        pass
+
+
+def request_size(kwargs):
+    """
+    Returns the approximate size of the parameters of a request, given the
+    keyword arguments of the `requests` call, from the raw lengths of the
+    keys and values, as encoding them again would be as slow as sending
+    them.  Uploaded files aren't counted.
+    """
+    size = 0
+    for key in ("params", "data"):
+        value = kwargs.get(key)
+        if isinstance(value, dict):
+            for name, item in value.items():
+                size += len(str(name)) + len(str(item)) + 2  # "=" and "&"
+        elif value:
+            size += len(value)
+    return size
+
+
+def sent_size(response):
+    """
+    Returns the size of the body sent for a response, or None if unknown,
+    e.g. when streamed from a file.
+    """
+    request = getattr(response, "request", None)
+    body = getattr(request, "body", None)
+    if body is None or not hasattr(body, "__len__"):
+        return None
+    return len(body)
+
+
+def response_size(response, stream=False):
+    """
+    Returns the size of the body of a response, or None if it's streamed
+    with no `Content-Length`.
+    """
+    if not stream:
+        return len(response.content)
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError, TypeError):
+        return None
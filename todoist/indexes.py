@@ -0,0 +1,200 @@
+"""
+Indexes of the local state, kept up to date with the changes to its objects
+instead of being computed again for every query.
+"""
+import datetime
+from bisect import bisect_left, insort
+
+_UNORDERED = float("inf")  # Day order of the items with none, placed last
+
+
+class DueIndex(object):
+    """
+    Items sorted by due datetime (see `Item.due_datetime`), for range queries
+    in O(log n + k).  The items with no due date are tracked, but not sorted.
+    """
+
+    def __init__(self, items=()):
+        self._keys = []  # sorted (due datetime, sequence number)
+        self._items = {}  # sequence number -> item
+        self._entries = {}  # id() of the item -> (due datetime, sequence number)
+        self._next = 0
+        for item in items:
+            entry = self._add(item)
+            if entry[0] is not None:
+                self._keys.append(entry)
+        self._keys.sort()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return id(item) in self._entries
+
+    def update(self, item):
+        """
+        Adds an item, or moves it after its due date changed.
+        """
+        entry = self._entries.get(id(item))
+        if entry is not None:
+            if entry[0] == item.due_datetime:
+                return
+            self._discard(entry)
+        entry = self._add(item)
+        if entry[0] is not None:
+            insort(self._keys, entry)
+
+    def remove(self, item):
+        entry = self._entries.pop(id(item), None)
+        if entry is not None:
+            self._discard(entry)
+
+    def between(self, start=None, end=None):
+        """
+        Returns the items due from `start` (included) until `end` (excluded),
+        sorted by due datetime.  Either bound can be None, and dates stand for
+        their midnight.
+        """
+        keys = self._keys
+        low = 0 if start is None else bisect_left(keys, (as_datetime(start),))
+        high = len(keys) if end is None else bisect_left(keys, (as_datetime(end),))
+        items = self._items
+        return [items[seq] for _, seq in keys[low:high]]
+
+    def _add(self, item):
+        seq = self._next
+        self._next += 1
+        entry = self._entries[id(item)] = (item.due_datetime, seq)
+        self._items[seq] = item
+        return entry
+
+    def _discard(self, entry):
+        del self._items[entry[1]]
+        if entry[0] is not None:
+            del self._keys[bisect_left(self._keys, entry)]
+
+
+def as_datetime(value):
+    """
+    Returns a datetime as is, and the midnight of a date.
+    """
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime(value.year, value.month, value.day)
+
+
+class DayIndex(object):
+    """
+    Uncompleted items grouped by due day (local date of `Item.due_datetime`),
+    each day sorted by day order, and then by due datetime: the Today and
+    Upcoming views.  The day orders are read from `day_orders` (the dict of
+    the state, by string item id), or else from the `day_order` of the items;
+    `update_orders()` has to be called with the ones which changed.
+    """
+
+    def __init__(self, items=(), day_orders=None):
+        self.day_orders = {} if day_orders is None else day_orders
+        self._dates = []  # sorted dates with items due
+        self._days = {}  # date -> sorted (day order, due datetime, sequence number)
+        self._items = {}  # sequence number -> item
+        self._entries = {}  # id() of the item -> (date, key)
+        self._ids = {}  # str() of the item id -> item
+        self._next = 0
+        for item in items:
+            self.update(item)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return id(item) in self._entries
+
+    def update(self, item):
+        """
+        Adds an item, moves it after its due date or day order changed, or
+        removes it if it was completed, deleted, or is no longer due.
+        """
+        data = item.data
+        due = item.due_datetime
+        self._ids[str(data.get("id"))] = item
+        entry = self._entries.pop(id(item), None)
+        if due is None or data.get("checked") or data.get("is_deleted"):
+            if entry is not None:
+                self._discard(entry)
+            return
+        order = self._day_order(data)
+        if entry is not None:
+            if entry[1][:2] == (order, due):
+                self._entries[id(item)] = entry
+                return
+            self._discard(entry)
+        date = due.date()
+        seq = self._next
+        self._next += 1
+        key = (order, due, seq)
+        self._entries[id(item)] = (date, key)
+        self._items[seq] = item
+        day = self._days.get(date)
+        if day is None:
+            day = self._days[date] = []
+            insort(self._dates, date)
+        insort(day, key)
+
+    def remove(self, item):
+        entry = self._entries.pop(id(item), None)
+        if entry is not None:
+            self._discard(entry)
+        item_id = str(item.data.get("id"))
+        if self._ids.get(item_id) is item:
+            del self._ids[item_id]
+
+    def update_orders(self, ids_to_orders):
+        """
+        Moves the items whose day order changed, given their ids.
+        """
+        for item_id in ids_to_orders:
+            item = self._ids.get(str(item_id))
+            if item is not None and str(item.data.get("id")) == str(item_id):
+                self.update(item)
+
+    def day(self, date):
+        """
+        Returns the items due on a date, in order.
+        """
+        items = self._items
+        return [items[key[2]] for key in self._days.get(date, ())]
+
+    def days(self, start=None, end=None):
+        """
+        Returns the `(date, items)` pairs of the days with items due, from
+        `start` (included) until `end` (excluded), either of which can be
+        None.
+        """
+        dates = self._dates
+        low = 0 if start is None else bisect_left(dates, start)
+        high = len(dates) if end is None else bisect_left(dates, end)
+        return [(date, self.day(date)) for date in dates[low:high]]
+
+    def overdue(self, today):
+        """
+        Returns the items due before a date, by day.
+        """
+        return [item for _, items in self.days(end=today) for item in items]
+
+    def _discard(self, entry):
+        date, key = entry
+        del self._items[key[2]]
+        day = self._days[date]
+        del day[bisect_left(day, key)]
+        if not day:
+            del self._days[date]
+            del self._dates[bisect_left(self._dates, date)]
+
+    def _day_order(self, data):
+        # Keyed by the string ids, as sent by the server.
+        order = self.day_orders.get(str(data.get("id")))
+        if order is None:
+            order = data.get("day_order")
+        if order is None or order < 0:
+            return _UNORDERED
+        return order
@@ -0,0 +1,119 @@
+"""
+Deduplication of the values repeated across the objects of the local state.
+
+Decoding JSON creates a new object for every string, and for every large
+integer, even when the same value appears in thousands of objects: the keys,
+the ids of projects, sections and users, the dates, and so on.  With
+interning enabled, every object merged into the local state, from a sync or
+from the cache, has its keys and the values of low-cardinality fields
+replaced by a single shared object per value, and the duplicates are freed.
+
+Usage example.
+
+```python
+import todoist
+api = todoist.TodoistAPI(token, intern_values=True)
+api.sync()
+print(api.interner.stats())
+```
+"""
+import sys
+
+#: Fields whose values are repeated across objects, and interned.
+INTERNED_FIELDS = (
+    "added_by_uid",
+    "assigned_by_uid",
+    "color",
+    "date",
+    "item_id",
+    "labels",
+    "lang",
+    "notify_uid",
+    "parent_id",
+    "posted_uid",
+    "project_id",
+    "responsible_uid",
+    "section_id",
+    "string",
+    "timezone",
+    "type",
+    "user_id",
+)
+
+
+class Interner(object):
+    """
+    Table of canonical values, holding up to `max_values` of them.  The keys
+    of the objects are always interned, and their values only for the
+    specified `fields` (of nested objects as well, such as `due`).
+    """
+
+    def __init__(self, fields=INTERNED_FIELDS, max_values=100000):
+        self.fields = frozenset(fields)
+        self.max_values = max_values
+        self.size = 0
+        self.interned = 0  # duplicates replaced by the canonical value
+        self.saved_bytes = 0  # size of the duplicates replaced
+        self._tables = {}  # type -> value -> canonical value
+
+    def intern(self, obj):
+        """
+        Returns a copy of an object (dict), with its keys and the values of
+        the interned fields replaced by the canonical ones.
+        """
+        result = {}
+        fields = self.fields
+        for key, value in obj.items():
+            # Keys are shared by the decoder already within a response, so
+            # replacing them isn't counted as a saving.
+            key = self._lookup(key)
+            if isinstance(value, dict):
+                value = self.intern(value)
+            elif isinstance(value, list):
+                if key in fields:
+                    value = [self.canonical(v) for v in value]
+                else:
+                    value = [
+                        self.intern(v) if isinstance(v, dict) else v for v in value
+                    ]
+            elif key in fields:
+                value = self.canonical(value)
+            result[key] = value
+        return result
+
+    def canonical(self, value):
+        """
+        Returns the canonical object equal to a value.  None and booleans are
+        singletons already, and floats aren't worth it.
+        """
+        canonical = self._lookup(value)
+        if canonical is not value:
+            self.interned += 1
+            self.saved_bytes += sys.getsizeof(value)
+        return canonical
+
+    def _lookup(self, value):
+        if value is None or isinstance(value, (bool, float)):
+            return value
+        # 1 == 1.0 == True, hence a table per type.
+        table = self._tables.get(type(value))
+        if table is None:
+            table = self._tables[type(value)] = {}
+        canonical = table.get(value)
+        if canonical is None:
+            if self.size < self.max_values:
+                table[value] = value
+                self.size += 1
+            return value
+        return canonical
+
+    def clear(self):
+        self._tables = {}
+        self.size = 0
+
+    def stats(self):
+        return {
+            "values": self.size,
+            "interned": self.interned,
+            "saved_bytes": self.saved_bytes,
+        }
@@ -45,13 +45,14 @@ class ArchiveManager(object):
     def next_page(self, cursor):
         # type: (Optional[str]) -> Dict
         """Return response for the next page of the archive."""
-        resp = self.api.session.get(
+        resp = self.api._send(
+            "GET",
             self._next_url(),
             params=self._next_query_params(cursor),
             headers=self._request_headers(),
         )
         resp.raise_for_status()
-        return resp.json()
+        return self.api.codec.loads(resp.content)
 
     def _next_url(self):
         return "{0}/sync/{1}/archive/{2}".format(
@@ -6,6 +6,7 @@ class CollaboratorStatesManager(Manager, SyncMixin):
 
     state_name = "collaborator_states"
     object_type = None  # there is no object type associated
+    resource_type = "collaborators"
 
     def get_by_ids(self, project_id, user_id):
         """
@@ -6,6 +6,7 @@ class CollaboratorsManager(Manager, GetByIdMixin, SyncMixin):
 
     state_name = "collaborators"
     object_type = None  # there is no object type associated
+    resource_type = "collaborators"
 
     def delete(self, project_id, email):
         """
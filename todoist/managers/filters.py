@@ -7,6 +7,7 @@ class FiltersManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
 
     state_name = "filters"
     object_type = "filter"
+    resource_type = "filters"
 
     def add(self, name, query, **kwargs):
         """
@@ -4,6 +4,7 @@ class Manager(object):
     # should be re-defined in a subclass
     state_name = None
     object_type = None
+    resource_type = None
 
     def __init__(self, api):
         self.api = api
@@ -56,4 +57,6 @@ class SyncMixin(object):
     """
 
     def sync(self):
-        return self.api.sync()
+        if self.resource_type is None:
+            return self.api.sync()
+        return self.api.sync(resource_types=[self.resource_type])
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
+import datetime
+
 from .. import models
+from ..indexes import DayIndex, DueIndex
 from .generic import AllMixin, GetByIdMixin, Manager, SyncMixin
 
 
@@ -7,6 +10,15 @@ class ItemsManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
 
     state_name = "items"
     object_type = "item"
+    resource_type = "items"
+
+    def __init__(self, api):
+        super(ItemsManager, self).__init__(api)
+        self._due_index = None  # Built on the first query by due date
+        self._due_indexed = None  # List of items indexed
+        self._day_index = None  # Built on the first query by day
+        self._day_indexed = None  # Due index it was built from
+        api.state_listeners.append(self._item_changed)
 
     def add(self, content, **kwargs):
         """
@@ -19,6 +31,7 @@ class ItemsManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
         obj.temp_id = obj["id"] = self.api.generate_uuid()
         obj.data.update(kwargs)
         self.state[self.state_name].append(obj)
+        self.api._state_changed(self.state_name, obj)
         cmd = {
             "type": "item_add",
             "temp_id": obj.temp_id,
@@ -196,3 +209,90 @@ class ItemsManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
             data["notes"] += obj.get("notes")
         self.api._update_state(data)
         return obj
+
+    def due_between(self, start=None, end=None):
+        """
+        Returns the local items due from `start` (included) until `end`
+        (excluded), dates or naive datetimes, sorted by due date.  Either
+        bound can be None.
+        """
+        with self.api._state_lock:
+            return self.due_index.between(start, end)
+
+    @property
+    def due_index(self):
+        """
+        Index of the local items by due date, built on first use and then
+        kept up to date with the changes to the items.
+        """
+        items = self.state[self.state_name]
+        with self.api._state_lock:
+            index = self._due_index
+            # Built again if the items were replaced, or added or removed
+            # without notifying the state listeners.
+            if (
+                index is None
+                or self._due_indexed is not items
+                or len(index) != len(items)
+            ):
+                index = self._due_index = DueIndex(items)
+                self._due_indexed = items
+            return index
+
+    def today(self, date=None):
+        """
+        Returns the uncompleted local items of the Today view: the overdue
+        ones, by day, and then the ones due today (or on `date`), in their
+        day order.
+        """
+        if date is None:
+            date = datetime.date.today()
+        with self.api._state_lock:
+            index = self.day_index
+            return index.overdue(date) + index.day(date)
+
+    def upcoming(self, days=7, start=None):
+        """
+        Returns the `(date, items)` pairs of the Upcoming view: each of the
+        `days` days from today (or from `start`), with the uncompleted local
+        items due that day, in their day order.
+        """
+        if start is None:
+            start = datetime.date.today()
+        with self.api._state_lock:
+            index = self.day_index
+            return [
+                (date, index.day(date))
+                for date in (start + datetime.timedelta(days=n) for n in range(days))
+            ]
+
+    @property
+    def day_index(self):
+        """
+        Index of the uncompleted local items by due day and day order, built
+        from the due index on first use, and then kept up to date with the
+        changes to the items and to `day_orders`.
+        """
+        with self.api._state_lock:
+            due_index = self.due_index
+            if self._day_index is None or self._day_indexed is not due_index:
+                self._day_index = DayIndex(
+                    due_index.between(), self.state["day_orders"]
+                )
+                self._day_indexed = due_index
+            return self._day_index
+
+    def _item_changed(self, datatype, obj, removed):
+        if datatype == "day_orders":
+            if self._day_index is not None:
+                self._day_index.update_orders(obj)
+            return
+        if datatype != self.state_name:
+            return
+        for index in (self._due_index, self._day_index):
+            if index is None:
+                continue
+            if removed:
+                index.remove(obj)
+            else:
+                index.update(obj)
@@ -7,6 +7,7 @@ class LabelsManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
 
     state_name = "labels"
     object_type = "label"
+    resource_type = "labels"
 
     def add(self, name, **kwargs):
         """
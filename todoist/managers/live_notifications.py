@@ -6,6 +6,7 @@ class LiveNotificationsManager(Manager, GetByIdMixin, AllMixin, SyncMixin):
 
     state_name = "live_notifications"
     object_type = None  # there is no object type associated
+    resource_type = "live_notifications"
 
     def set_last_read(self, id):
         """
@@ -6,6 +6,7 @@ class LocationsManager(Manager, AllMixin, SyncMixin):
 
     state_name = "locations"
     object_type = None  # there is no local state associated
+    resource_type = "locations"
 
     def clear(self):
         """
@@ -6,6 +6,7 @@ from .generic import AllMixin, GetByIdMixin, Manager, SyncMixin
 class GenericNotesManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
 
     object_type = "note"
+    resource_type = "notes"
 
     def update(self, note_id, **kwargs):
         """
@@ -7,6 +7,7 @@ class ProjectsManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
 
     state_name = "projects"
     object_type = "project"
+    resource_type = "projects"
 
     def add(self, name, **kwargs):
         """
@@ -29,10 +30,6 @@ class ProjectsManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
         """
         Updates a project remotely.
         """
-        obj = self.get_by_id(project_id)
-        if obj:
-            obj.data.update(kwargs)
-
         args = {"id": project_id}
         args.update(kwargs)
         cmd = {
@@ -42,6 +39,10 @@ class ProjectsManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
         }
         self.queue.append(cmd)
 
+        obj = self.get_by_id(project_id)
+        if obj:
+            obj.data.update(kwargs)
+
     def delete(self, project_id):
         """
         Deletes a project remotely.
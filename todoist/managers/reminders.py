@@ -7,6 +7,7 @@ class RemindersManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
 
     state_name = "reminders"
     object_type = "reminder"
+    resource_type = "reminders"
 
     def add(self, item_id, **kwargs):
         """
@@ -7,6 +7,7 @@ class SectionsManager(Manager, AllMixin, GetByIdMixin, SyncMixin):
 
     state_name = "sections"
     object_type = "section"
+    resource_type = "sections"
 
     def add(self, name, project_id, **kwargs):
         """
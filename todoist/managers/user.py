@@ -3,6 +3,9 @@ from .generic import Manager
 
 
 class UserManager(Manager):
+
+    resource_type = "user"
+
     def update(self, **kwargs):
         """
         Updates the user data.
@@ -26,7 +29,7 @@ class UserManager(Manager):
         self.queue.append(cmd)
 
     def sync(self):
-        return self.api.sync()
+        return self.api.sync(resource_types=[self.resource_type])
 
     def get(self, key=None, default=None):
         ret = self.state["user"]
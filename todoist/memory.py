@@ -0,0 +1,192 @@
+"""
+Estimation of the memory used by the local state.
+
+Usage example.
+
+```python
+import todoist
+api = todoist.TodoistAPI(token)
+api.sync()
+
+report = api.memory_report()
+for datatype, usage in sorted(report["types"].items()):
+    print(datatype, usage["bytes"], usage["fields"])
+
+# What a sync allocates, measured with tracemalloc.
+print(api.memory_report(trace_sync=True)["sync_allocations"]["size_diff"])
+```
+"""
+import sys
+
+from todoist.models import Model
+
+try:
+    _STRING_TYPES = (basestring,)  # type: ignore  # Python 2
+except NameError:
+    _STRING_TYPES = (str, bytes)
+
+
+def approximate_size(obj, seen=None):
+    """
+    Returns the approximate number of bytes used by an object, and all the
+    containers and models it holds: dicts, lists, tuples, sets, and the data
+    of models.  Objects reachable more than once are only counted once.
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, Model):
+            size += sys.getsizeof(obj) + sys.getsizeof(obj.temp_id)
+            stack.append(obj.data)
+            continue
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            for key, value in obj.items():
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return size
+
+
+def memory_report(api, trace_sync=False, top=10):
+    """
+    Returns an estimate of the memory used by the local state of an API
+    object, in bytes:
+
+    - `total`: the whole state,
+    - `types`: for each type of objects, the number of `objects`, the
+      `bytes` they use, the overhead of the model `wrappers` and of the
+      `dicts` holding their data, the bytes used by the values of each of
+      their `fields` (keys included), and the strings which are duplicates:
+      equal to another one, but stored separately (`duplicate_strings`, and
+      `duplicate_string_bytes` which could be saved),
+    - `other`: the bytes used by the other members of the state (`user`,
+      `day_orders`, ...).
+
+    Objects referenced more than once are counted once, where first found.
+    With `trace_sync`, the API object also syncs, and `sync_allocations`
+    holds the memory allocated during the sync according to `tracemalloc`:
+    the total `size_diff`, and the `top` lines allocating the most.
+    """
+    report = {}
+    if trace_sync:
+        report["sync_allocations"] = trace_allocations(api.sync, top=top)
+
+    seen = set()
+    strings = {}  # value -> ids of the string objects holding it
+    types = {}
+    for datatype in sorted(api.state_models):
+        objects = api.state.get(datatype) or []
+        usage = {
+            "objects": len(objects),
+            "bytes": 0,
+            "wrappers": 0,
+            "dicts": 0,
+            "fields": {},
+            "duplicate_strings": 0,
+            "duplicate_string_bytes": 0,
+        }
+        type_strings = {}
+        for obj in objects:
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            data = getattr(obj, "data", obj)
+            if data is not obj:
+                usage["wrappers"] += _wrapper_size(obj, seen)
+            if id(data) in seen:
+                continue
+            seen.add(id(data))
+            usage["dicts"] += sys.getsizeof(data)
+            for key, value in data.items():
+                size = approximate_size(key, seen) + approximate_size(value, seen)
+                usage["fields"][key] = usage["fields"].get(key, 0) + size
+                _collect_strings(key, type_strings)
+                _collect_strings(value, type_strings)
+        for value, ids in type_strings.items():
+            strings.setdefault(value, set()).update(ids)
+            duplicates = len(ids) - 1
+            usage["duplicate_strings"] += duplicates
+            usage["duplicate_string_bytes"] += duplicates * sys.getsizeof(value)
+        usage["bytes"] = (
+            usage["wrappers"] + usage["dicts"] + sum(usage["fields"].values())
+        )
+        types[datatype] = usage
+
+    other = {}
+    for key in sorted(api.state):
+        if key not in api.state_models:
+            other[key] = approximate_size(api.state[key], seen)
+
+    report.update(
+        total=sum(usage["bytes"] for usage in types.values()) + sum(other.values()),
+        types=types,
+        other=other,
+        duplicate_strings=sum(len(ids) - 1 for ids in strings.values()),
+        duplicate_string_bytes=sum(
+            (len(ids) - 1) * sys.getsizeof(value) for value, ids in strings.items()
+        ),
+    )
+    return report
+
+
+def trace_allocations(func, top=10):
+    """
+    Calls a function while tracing memory allocations with `tracemalloc`,
+    and returns the total `size_diff` between the snapshots taken before and
+    after, along with the `top` lines allocating the most (as `(location,
+    size_diff)` pairs).
+    """
+    import tracemalloc
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        func()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+    stats = after.compare_to(before, "lineno")
+    return {
+        "size_diff": sum(stat.size_diff for stat in stats),
+        "top": [(str(stat.traceback), stat.size_diff) for stat in stats[:top]],
+    }
+
+
+def _wrapper_size(obj, seen):
+    size = sys.getsizeof(obj)
+    attributes = getattr(obj, "__dict__", None)
+    if attributes is not None and id(attributes) not in seen:
+        seen.add(id(attributes))
+        size += sys.getsizeof(attributes)
+    temp_id = getattr(obj, "temp_id", None)
+    if temp_id and id(temp_id) not in seen:
+        seen.add(id(temp_id))
+        size += sys.getsizeof(temp_id)
+    return size
+
+
+def _collect_strings(value, strings):
+    """
+    Records the ids of the string objects found in a value, by their value.
+    """
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, _STRING_TYPES):
+            strings.setdefault(value, set()).add(id(value))
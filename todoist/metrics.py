@@ -0,0 +1,249 @@
+"""
+Metrics collected by the client.
+
+Every API object keeps its counters, gauges and histograms in a
+`MetricsRegistry`, which renders them in the Prometheus text format, to be
+served on a metrics endpoint.
+
+Usage example.
+
+```python
+import todoist
+api = todoist.TodoistAPI(token)
+api.sync()
+print(api.metrics.render())
+```
+"""
+import bisect
+import threading
+
+#: Default buckets of histograms of durations, in seconds.
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+#: Default buckets of histograms of sizes, in bytes.
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Counter(object):
+    """
+    Value which only goes up.
+    """
+
+    type = "counter"
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [("", {}, self.value)]
+
+
+class Gauge(object):
+    """
+    Value which goes up and down: either set, or returned by `func` when
+    collected.  With a `label`, the value is a dict mapping the values of
+    the label to the values of the gauge.
+    """
+
+    type = "gauge"
+
+    def __init__(self, func=None, label=None):
+        self.func = func
+        self.label = label
+        self.value = {} if label else 0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        value = self.func() if self.func is not None else self.value
+        if self.label is None:
+            return [("", {}, value)]
+        return [("", {self.label: key}, value[key]) for key in sorted(value)]
+
+
+class Histogram(object):
+    """
+    Counts the observed values falling in each bucket, where the bucket of a
+    value is the first one whose upper bound is greater than or equal to it,
+    along with their count and sum.  Values above the last bound fall in an
+    extra bucket.
+    """
+
+    type = "histogram"
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def cumulative_counts(self):
+        """
+        Returns `(upper bound, count of values less than or equal to it)`
+        pairs, ending with an infinite bound counting all the values.
+        """
+        with self._lock:
+            counts = list(self.counts)
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def samples(self):
+        samples = [
+            ("_bucket", {"le": bound}, count)
+            for bound, count in self.cumulative_counts()
+        ]
+        samples.append(("_sum", {}, self.sum))
+        samples.append(("_count", {}, self.count))
+        return samples
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "buckets": self.cumulative_counts(),
+        }
+
+
+class SyncTimings(object):
+    """
+    Time spent in each phase of a sync, in seconds, along with the number of
+    requests sent, bytes received, and objects merged.  The phases are:
+
+    - `network`: sending the requests, and receiving the responses,
+    - `decode`: decoding the responses,
+    - `temp_id`: replacing the temporary ids of the objects created,
+    - `merge`: merging the objects into the local state,
+    - `cache_write`: writing the local cache.
+    """
+
+    PHASES = ("network", "decode", "temp_id", "merge", "cache_write")
+
+    def __init__(self):
+        self.network = 0.0
+        self.decode = 0.0
+        self.temp_id = 0.0
+        self.merge = 0.0
+        self.cache_write = 0.0
+        self.requests = 0
+        self.bytes_received = 0
+        self.objects = 0
+
+    @property
+    def total(self):
+        return sum(getattr(self, phase) for phase in self.PHASES)
+
+    def add(self, other):
+        """
+        Adds the timings and counters of another sync to these ones.
+        """
+        for phase in self.PHASES:
+            setattr(self, phase, getattr(self, phase) + getattr(other, phase))
+        self.requests += other.requests
+        self.bytes_received += other.bytes_received
+        self.objects += other.objects
+
+    def as_dict(self):
+        result = dict((phase, getattr(self, phase)) for phase in self.PHASES)
+        result.update(
+            total=self.total,
+            requests=self.requests,
+            bytes_received=self.bytes_received,
+            objects=self.objects,
+        )
+        return result
+
+    def __repr__(self):
+        return "SyncTimings(%s)" % ", ".join(
+            "%s=%r" % item for item in sorted(self.as_dict().items())
+        )
+
+
+class MetricsRegistry(object):
+    """
+    Named metrics, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.metrics = {}  # name -> (description, metric)
+
+    def register(self, name, description, metric):
+        """
+        Registers a metric (or anything with a `type` and `samples()`) under
+        the specified name, replacing any other one, and returns it.
+        """
+        self.metrics[name] = (description, metric)
+        return metric
+
+    def counter(self, name, description):
+        return self.register(name, description, Counter())
+
+    def gauge(self, name, description, func=None, label=None):
+        return self.register(name, description, Gauge(func, label))
+
+    def histogram(self, name, description, buckets=DURATION_BUCKETS):
+        return self.register(name, description, Histogram(buckets))
+
+    def get(self, name):
+        return self.metrics[name][1]
+
+    def render(self):
+        """
+        Returns the metrics in the Prometheus text format.
+        """
+        lines = []
+        for name in sorted(self.metrics):
+            description, metric = self.metrics[name]
+            lines.append("# HELP %s %s" % (name, _escape(description)))
+            lines.append("# TYPE %s %s" % (name, metric.type))
+            for suffix, labels, value in metric.samples():
+                if labels:
+                    suffix += "{%s}" % ",".join(
+                        '%s="%s"' % (key, _escape(_format_value(labels[key]), '"'))
+                        for key in sorted(labels)
+                    )
+                lines.append("%s%s %s" % (name, suffix, _format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _escape(text, quote=""):
+    text = text.replace("\\", "\\\\").replace("\n", "\\n")
+    if quote:
+        text = text.replace(quote, "\\" + quote)
+    return text
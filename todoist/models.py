@@ -1,3 +1,5 @@
+import calendar
+import datetime
 from pprint import pformat
 
 
@@ -6,6 +8,10 @@ class Model(object):
     Implements a generic object.
     """
 
+    # Models have no __dict__, as there are many of them.  Subclasses have to
+    # define __slots__ as well, even if empty, to keep it that way.
+    __slots__ = ("temp_id", "data", "api")
+
     def __init__(self, data, api):
         self.temp_id = ""
         self.data = data
@@ -31,6 +37,8 @@ class Collaborator(Model):
     Implements a collaborator.
     """
 
+    __slots__ = ()
+
     def delete(self, project_id):
         """
         Deletes a collaborator from a shared project.
@@ -43,7 +51,7 @@ class CollaboratorState(Model):
     Implements a collaborator state.
     """
 
-    pass
+    __slots__ = ()
 
 
 class Filter(Model):
@@ -51,6 +59,8 @@ class Filter(Model):
     Implements a filter.
     """
 
+    __slots__ = ()
+
     def update(self, **kwargs):
         """
         Updates filter.
@@ -71,12 +81,34 @@ class Item(Model):
     Implements an item.
     """
 
+    # Due date string and datetime last parsed from it.
+    __slots__ = ("_due",)
+
+    @property
+    def due_datetime(self):
+        """
+        Returns the due date as a naive datetime (midnight for the dates with
+        no time, and the local time for the dates in UTC), or None.  It is
+        only parsed again after the due date changed.
+        """
+        due = self.data.get("due")
+        date = due.get("date") if due else None
+        # Not set by the constructor, to keep it fast.
+        cached = getattr(self, "_due", None)
+        if cached is None or cached[0] != date:
+            cached = self._due = (date, parse_due_date(date))
+        return cached[1]
+
+    def _changed(self):
+        self.api._state_changed("items", self)
+
     def update(self, **kwargs):
         """
         Updates item.
         """
         self.api.items.update(self["id"], **kwargs)
         self.data.update(kwargs)
+        self._changed()
 
     def delete(self):
         """
@@ -84,6 +116,10 @@ class Item(Model):
         """
         self.api.items.delete(self["id"])
         self.data["is_deleted"] = 1
+        # With optimistic updates, the item was removed from the state, and
+        # the listeners notified already.
+        if self.api.optimistic is None:
+            self._changed()
 
     def move(self, **kwargs):
         """
@@ -100,6 +136,7 @@ class Item(Model):
             self.data["section_id"] = kwargs.get("section_id")
         else:
             raise TypeError("move() takes one of parent_id, project_id, or section_id arguments")
+        self._changed()
 
     def reorder(self, child_order):
         """
@@ -107,6 +144,7 @@ class Item(Model):
         """
         self.api.items.reorder([{"id": self["id"], "child_order": child_order}])
         self.data["child_order"] = child_order
+        self._changed()
 
     def close(self):
         """
@@ -120,6 +158,7 @@ class Item(Model):
         """
         self.api.items.complete(self["id"], date_completed=date_completed)
         self.data["checked"] = 1
+        self._changed()
 
     def uncomplete(self):
         """
@@ -127,6 +166,7 @@ class Item(Model):
         """
         self.api.items.uncomplete(self["id"])
         self.data["checked"] = 0
+        self._changed()
 
     def archive(self):
         """
@@ -134,6 +174,7 @@ class Item(Model):
         """
         self.api.items.archive(self["id"])
         self.data["in_history"] = 1
+        self._changed()
 
     def unarchive(self):
         """
@@ -141,6 +182,7 @@ class Item(Model):
         """
         self.api.items.unarchive(self["id"])
         self.data["in_history"] = 0
+        self._changed()
 
     def update_date_complete(self, due=None):
         """
@@ -149,6 +191,7 @@ class Item(Model):
         self.api.items.update_date_complete(self["id"], due=due)
         if due:
             self.data["due"] = due
+            self._changed()
 
 
 class Label(Model):
@@ -156,6 +199,8 @@ class Label(Model):
     Implements a label.
     """
 
+    __slots__ = ()
+
     def update(self, **kwargs):
         """
         Updates label.
@@ -176,7 +221,7 @@ class LiveNotification(Model):
     Implements a live notification.
     """
 
-    pass
+    __slots__ = ()
 
 
 class GenericNote(Model):
@@ -184,6 +229,8 @@ class GenericNote(Model):
     Implements a note.
     """
 
+    __slots__ = ()
+
     #: has to be defined in subclasses
     local_manager = None
 
@@ -207,9 +254,11 @@ class Note(GenericNote):
     Implement an item note.
     """
 
-    def __init__(self, data, api):
-        GenericNote.__init__(self, data, api)
-        self.local_manager = self.api.notes
+    __slots__ = ()
+
+    @property
+    def local_manager(self):
+        return self.api.notes
 
 
 class ProjectNote(GenericNote):
@@ -217,9 +266,11 @@ class ProjectNote(GenericNote):
     Implement a project note.
     """
 
-    def __init__(self, data, api):
-        GenericNote.__init__(self, data, api)
-        self.local_manager = self.api.project_notes
+    __slots__ = ()
+
+    @property
+    def local_manager(self):
+        return self.api.project_notes
 
 
 class Project(Model):
@@ -227,6 +278,8 @@ class Project(Model):
     Implements a project.
     """
 
+    __slots__ = ()
+
     def update(self, **kwargs):
         """
         Updates project.
@@ -286,6 +339,8 @@ class Reminder(Model):
     Implements a reminder.
     """
 
+    __slots__ = ()
+
     def update(self, **kwargs):
         """
         Updates reminder.
@@ -306,6 +361,8 @@ class Section(Model):
     Implements a section.
     """
 
+    __slots__ = ()
+
     def update(self, **kwargs):
         """
         Updates section.
@@ -347,3 +404,29 @@ class Section(Model):
         """
         self.api.sections.unarchive(self["id"])
         self.data["is_archived"] = 0
+
+
+def parse_due_date(date):
+    """
+    Parses a due date of the API: "2020-01-02" (all day), "2020-01-02T10:00:00"
+    (floating time) or "2020-01-02T10:00:00Z" (UTC, converted to the local
+    time).  Returns None for a missing or invalid date.
+    """
+    if not date:
+        return None
+    try:
+        if len(date) == 10:
+            return datetime.datetime(int(date[:4]), int(date[5:7]), int(date[8:10]))
+        parsed = datetime.datetime(
+            int(date[:4]),
+            int(date[5:7]),
+            int(date[8:10]),
+            int(date[11:13]),
+            int(date[14:16]),
+            int(date[17:19]),
+        )
+    except ValueError:
+        return None
+    if date.endswith("Z"):
+        parsed = datetime.datetime.fromtimestamp(calendar.timegm(parsed.timetuple()))
+    return parsed
@@ -0,0 +1,319 @@
+"""
+Optimistic application of the queued commands to the local state.
+
+Normally the local state only reflects a command once it was committed and
+the server sent back the updated objects.  With optimistic updates enabled,
+every queued command is also applied right away to the local state, and an
+undo record is kept for it, so that the change can be rolled back if the
+server reports that the command failed.
+
+Usage example.
+
+```python
+import todoist
+api = todoist.TodoistAPI(token, optimistic=True)
+api.sync()
+
+api.items.complete(item_id)
+assert api.items.get_by_id(item_id)["checked"] == 1  # before any commit
+
+api.commit()  # failed commands are rolled back
+```
+"""
+
+_MISSING = object()
+
+# State lists holding the objects each command type acts on.
+_ADD_COMMANDS = {
+    "filter_add": "filters",
+    "item_add": "items",
+    "label_add": "labels",
+    "project_add": "projects",
+    "reminder_add": "reminders",
+    "section_add": "sections",
+}
+_UPDATE_COMMANDS = {
+    "filter_update": "filters",
+    "item_update": "items",
+    "label_update": "labels",
+    "project_update": "projects",
+    "reminder_update": "reminders",
+    "section_update": "sections",
+    "note_update": ("notes", "project_notes"),
+}
+_DELETE_COMMANDS = {
+    "filter_delete": "filters",
+    "item_delete": "items",
+    "label_delete": "labels",
+    "project_delete": "projects",
+    "reminder_delete": "reminders",
+    "section_delete": "sections",
+    "note_delete": ("notes", "project_notes"),
+}
+# Commands setting some fields of a single object to fixed values.
+_FLAG_COMMANDS = {
+    "item_close": ("items", {"checked": 1}),
+    "item_complete": ("items", {"checked": 1}),
+    "item_uncomplete": ("items", {"checked": 0}),
+    "item_archive": ("items", {"in_history": 1}),
+    "item_unarchive": ("items", {"in_history": 0}),
+    "project_archive": ("projects", {"is_archived": 1}),
+    "project_unarchive": ("projects", {"is_archived": 0}),
+    "section_archive": ("sections", {"is_archived": 1}),
+    "section_unarchive": ("sections", {"is_archived": 0}),
+    "live_notifications_mark_read": ("live_notifications", {"is_unread": 0}),
+    "live_notifications_mark_unread": ("live_notifications", {"is_unread": 1}),
+}
+# Commands setting some of their arguments on a single object.
+_MOVE_COMMANDS = {
+    "project_move": ("projects", ("parent_id",)),
+    "section_move": ("sections", ("project_id",)),
+    "item_update_date_complete": ("items", ("due",)),
+}
+# Commands reordering several objects, with the list argument holding them.
+_REORDER_COMMANDS = {
+    "item_reorder": ("items", "items"),
+    "project_reorder": ("projects", "projects"),
+    "section_reorder": ("sections", "sections"),
+}
+_UPDATE_ORDERS_COMMANDS = {
+    "filter_update_orders": "filters",
+    "label_update_orders": "labels",
+}
+# Commands updating a dict of the state.
+_STATE_UPDATE_COMMANDS = {
+    "user_update": "user",
+    "update_goals": "user",
+    "user_settings_update": "user_settings",
+}
+
+
+class OptimisticUpdates(object):
+    """
+    Applies the commands queued on an API object to its local state, and
+    keeps the undo records needed to roll them back.
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self.undo_records = {}  # uuid -> list of undo functions
+        self._datatypes = dict(  # model -> type of objects
+            (model, datatype) for datatype, model in api.state_models.items()
+        )
+
+    def start(self):
+        # Applied while holding the lock of the syncs, before the commands
+        # are queued, so that no commit or sync can see them before then.
+        queue = self.api.queue
+        queue.apply_lock = self.api._sync_lock
+        queue.appliers.append(self._on_queued)
+
+    def stop(self):
+        queue = self.api.queue
+        queue.appliers.remove(self._on_queued)
+        queue.apply_lock = None
+
+    def apply(self, cmd):
+        """
+        Applies a command to the local state, and records how to undo it.
+        """
+        undo = []
+        self._apply(cmd, undo)
+        if undo:
+            self.undo_records[cmd.get("uuid")] = undo
+
+    def settle(self, cmds):
+        """
+        Forgets the undo records of the commands the server applied.
+        """
+        for cmd in cmds:
+            self.undo_records.pop(cmd.get("uuid"), None)
+
+    def rollback(self, cmds):
+        """
+        Undoes the local changes made by the commands the server rejected,
+        the most recent ones first.
+        """
+        for cmd in reversed(list(cmds)):
+            for undo in reversed(self.undo_records.pop(cmd.get("uuid"), [])):
+                undo()
+
+    def _on_queued(self, cmds):
+        for cmd in cmds:
+            self.apply(cmd)
+
+    def _apply(self, cmd, undo):
+        cmd_type = cmd.get("type")
+        args = cmd.get("args") or {}
+        if cmd_type in _ADD_COMMANDS:
+            self._add(_ADD_COMMANDS[cmd_type], cmd, undo)
+        elif cmd_type == "note_add":
+            datatype = "notes" if "item_id" in args else "project_notes"
+            self._add(datatype, cmd, undo)
+        elif cmd_type in _UPDATE_COMMANDS:
+            fields = dict((k, v) for k, v in args.items() if k != "id")
+            obj = self._find(_UPDATE_COMMANDS[cmd_type], args.get("id"))
+            self._set_fields(obj, fields, undo)
+        elif cmd_type in _DELETE_COMMANDS:
+            self._delete(_DELETE_COMMANDS[cmd_type], args.get("id"), undo)
+        elif cmd_type in _FLAG_COMMANDS:
+            datatype, fields = _FLAG_COMMANDS[cmd_type]
+            fields = dict(fields)
+            if cmd_type == "item_complete" and "date_completed" in args:
+                fields["date_completed"] = args["date_completed"]
+            self._set_fields(self._find(datatype, args.get("id")), fields, undo)
+        elif cmd_type in _MOVE_COMMANDS:
+            datatype, keys = _MOVE_COMMANDS[cmd_type]
+            fields = dict((k, args[k]) for k in keys if k in args)
+            self._set_fields(self._find(datatype, args.get("id")), fields, undo)
+        elif cmd_type == "item_move":
+            self._move_item(args, undo)
+        elif cmd_type in _REORDER_COMMANDS:
+            datatype, key = _REORDER_COMMANDS[cmd_type]
+            for entry in args.get(key, []):
+                fields = dict((k, v) for k, v in entry.items() if k != "id")
+                self._set_fields(self._find(datatype, entry.get("id")), fields, undo)
+        elif cmd_type in _UPDATE_ORDERS_COMMANDS:
+            datatype = _UPDATE_ORDERS_COMMANDS[cmd_type]
+            for obj_id, order in args.get("id_order_mapping", {}).items():
+                obj = self._find(datatype, obj_id)
+                self._set_fields(obj, {"item_order": order}, undo)
+        elif cmd_type == "item_update_day_orders":
+            day_orders = self.api.state["day_orders"]
+            # Keyed by string, as the server sends them.
+            ids_to_orders = dict(
+                (str(item_id), order)
+                for item_id, order in args.get("ids_to_orders", {}).items()
+            )
+            # Undone in reverse order: notified once the orders are restored.
+            undo.append(lambda: self.api._state_changed("day_orders", ids_to_orders))
+            self._set_fields(day_orders, ids_to_orders, undo)
+            self.api._state_changed("day_orders", ids_to_orders)
+        elif cmd_type in _STATE_UPDATE_COMMANDS:
+            target = self.api.state[_STATE_UPDATE_COMMANDS[cmd_type]]
+            self._set_fields(target, args, undo)
+        elif cmd_type == "live_notifications_mark_read_all":
+            for obj in self.api.state["live_notifications"]:
+                self._set_fields(obj, {"is_unread": 0}, undo)
+        elif cmd_type == "live_notifications_set_last_read":
+            self._set_state("live_notifications_last_read_id", args.get("id"), undo)
+        elif cmd_type == "clear_locations":
+            self._set_state("locations", [], undo)
+        # The remaining commands (sharing, invitations, collaborators) have no
+        # local representation to update.
+
+    def _find(self, datatypes, obj_id):
+        if not isinstance(datatypes, tuple):
+            datatypes = (datatypes,)
+        for datatype in datatypes:
+            for obj in self.api.state[datatype]:
+                if obj["id"] == obj_id or obj.temp_id == str(obj_id):
+                    return obj
+        return None
+
+    def _add(self, datatype, cmd, undo):
+        objects = self.api.state[datatype]
+        obj = self._find(datatype, cmd.get("temp_id"))
+        if obj is None:
+            # Queued directly, rather than created by a manager.
+            model = self.api.state_models[datatype]
+            obj = model(dict(cmd.get("args") or {}), self.api)
+            obj.temp_id = obj["id"] = cmd.get("temp_id")
+            objects.append(obj)
+        self._changed(obj)
+
+        def remove():
+            if obj in objects:
+                objects.remove(obj)
+                self._changed(obj, removed=True)
+
+        undo.append(remove)
+
+    def _delete(self, datatypes, obj_id, undo):
+        obj = self._find(datatypes, obj_id)
+        if obj is None:
+            return
+        for datatype in datatypes if isinstance(datatypes, tuple) else (datatypes,):
+            if obj in self.api.state[datatype]:
+                break
+        if datatype in ("items", "projects"):
+            # Deleting an item or a project deletes its descendants as well.
+            for child in list(self.api.state[datatype]):
+                if child.data.get("parent_id") == obj["id"]:
+                    self._delete(datatype, child["id"], undo)
+        objects = self.api.state[datatype]
+        index = objects.index(obj)
+        del objects[index]
+        self._changed(obj, removed=True)
+        # The delete() methods of the models flag the object once queued.
+        is_deleted = obj.data.get("is_deleted", _MISSING)
+
+        def restore():
+            if is_deleted is _MISSING:
+                obj.data.pop("is_deleted", None)
+            else:
+                obj.data["is_deleted"] = is_deleted
+            objects.insert(min(index, len(objects)), obj)
+            self._changed(obj)
+
+        undo.append(restore)
+
+    def _move_item(self, args, undo):
+        obj = self._find("items", args.get("id"))
+        if "parent_id" in args:
+            parent = self._find("items", args["parent_id"])
+            fields = {"parent_id": args["parent_id"]}
+            if parent is not None:
+                fields["project_id"] = parent.data.get("project_id")
+                fields["section_id"] = parent.data.get("section_id")
+        elif "section_id" in args:
+            fields = {"section_id": args["section_id"], "parent_id": None}
+            section = self._find("sections", args["section_id"])
+            if section is not None:
+                fields["project_id"] = section.data.get("project_id")
+        else:
+            fields = {
+                "project_id": args.get("project_id"),
+                "section_id": None,
+                "parent_id": None,
+            }
+        self._set_fields(obj, fields, undo)
+
+    def _set_fields(self, target, fields, undo):
+        """
+        Sets the fields of a model or of a dict of the state, recording their
+        previous values.
+        """
+        if target is None or not fields:
+            return
+        data = getattr(target, "data", target)
+        previous = dict((key, data.get(key, _MISSING)) for key in fields)
+        data.update(fields)
+        self._changed(target)
+
+        def restore():
+            for key, value in previous.items():
+                if value is _MISSING:
+                    data.pop(key, None)
+                else:
+                    data[key] = value
+            self._changed(target)
+
+        undo.append(restore)
+
+    def _changed(self, obj, removed=False):
+        """
+        Notifies the state listeners of a change to an object of the state.
+        """
+        datatype = self._datatypes.get(type(obj))
+        if datatype is not None:
+            self.api._state_changed(datatype, obj, removed)
+
+    def _set_state(self, key, value, undo):
+        previous = self.api.state[key]
+        self.api.state[key] = value
+
+        def restore():
+            self.api.state[key] = previous
+
+        undo.append(restore)
@@ -0,0 +1,229 @@
+"""
+Background polling of the sync endpoint, at an adaptive interval.
+
+The poller syncs right away, and then again and again at an interval which
+adapts to the activity of the account: it's multiplied by `factor` after each
+sync that brought no changes, up to `max_interval`, and goes back to
+`min_interval` as soon as a sync brings some.  When the server answers that
+the rate limit was reached, the poller waits for as long as it was told to,
+or for `max_interval`.
+
+The callbacks run on their own thread, so that a slow callback doesn't delay
+the next sync.
+
+Usage example.
+
+```python
+import todoist
+api = todoist.TodoistAPI(token)
+api.enable_polling(min_interval=5, max_interval=300,
+                   on_sync=lambda api, response: print("synced"))
+...
+print(api.poller.stats())
+api.disable_polling()
+```
+"""
+import threading
+import time
+
+from todoist.metrics import DURATION_BUCKETS, SIZE_BUCKETS, Histogram
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue  # type: ignore
+
+_now = getattr(time, "monotonic", time.time)
+
+# Members of a sync response which don't hold changes of the account.
+_METADATA_KEYS = ("sync_token", "full_sync", "temp_id_mapping", "sync_status")
+
+
+def has_changes(response):
+    """
+    Returns whether a sync response holds any change of the account.
+    """
+    if not isinstance(response, dict):
+        return False
+    for key, value in response.items():
+        if key not in _METADATA_KEYS and isinstance(value, (dict, list)) and value:
+            return True
+    return False
+
+
+def retry_after(response):
+    """
+    Returns whether a sync response reports that the rate limit was reached,
+    and if so, how many seconds the server asked to wait (or None if it
+    didn't say).
+    """
+    if not isinstance(response, dict) or response.get("http_code") != 429:
+        return False, None
+    extra = response.get("error_extra") or {}
+    return True, extra.get("retry_after")
+
+
+class Poller(object):
+    """
+    Syncs an API object from a background thread, at an adaptive interval.
+
+    `on_sync` is called with the API object and the response of each sync
+    which brought changes, and `on_error` with the exceptions raised while
+    syncing or by `on_sync`.  Both run on the callbacks thread.
+    """
+
+    def __init__(
+        self,
+        api,
+        min_interval=5.0,
+        max_interval=300.0,
+        factor=2.0,
+        on_sync=None,
+        on_error=None,
+    ):
+        self.api = api
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.on_sync = on_sync
+        self.on_error = on_error
+        self.interval = min_interval  # before the next sync
+        self.last_error = None
+
+        # metrics
+        self.syncs = 0
+        self.empty_syncs = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.durations = Histogram(DURATION_BUCKETS)
+        self.payload_sizes = Histogram(SIZE_BUCKETS)
+
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._woken = False
+        self._callbacks = queue.Queue()
+        self._thread = None
+        self._callbacks_thread = None
+
+    def start(self):
+        """
+        Starts the background threads.
+        """
+        if self._thread is not None:
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="todoist-poller")
+        self._thread.daemon = True
+        self._callbacks_thread = threading.Thread(
+            target=self._run_callbacks, name="todoist-poller-callbacks"
+        )
+        self._callbacks_thread.daemon = True
+        self._thread.start()
+        self._callbacks_thread.start()
+
+    def stop(self):
+        """
+        Stops the background threads, after the callbacks already scheduled
+        have run.
+        """
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+        self._callbacks.put(None)
+        self._callbacks_thread.join()
+        self._thread = self._callbacks_thread = None
+
+    def wake(self):
+        """
+        Syncs now, without waiting for the end of the interval, and goes back
+        to the shortest interval.
+        """
+        with self._cond:
+            self._woken = True
+            self.interval = self.min_interval
+            self._cond.notify()
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "syncs": self.syncs,
+            "empty_syncs": self.empty_syncs,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "durations": self.durations.as_dict(),
+            "payload_sizes": self.payload_sizes.as_dict(),
+        }
+
+    def poll(self):
+        """
+        Syncs once, updating the metrics and the interval, and schedules the
+        callbacks.  Returns the response.
+        """
+        received = self.api.received_bytes
+        start = _now()
+        try:
+            response = self.api.sync()
+        except Exception as e:
+            self.errors += 1
+            self._schedule(self._error, e)
+            self.interval = min(self.max_interval, self.interval * self.factor)
+            return None
+        self.syncs += 1
+        self.durations.observe(_now() - start)
+        self.payload_sizes.observe(self.api.received_bytes - received)
+
+        limited, delay = retry_after(response)
+        if limited:
+            self.rate_limited += 1
+            self.interval = self.max_interval if delay is None else delay
+        elif has_changes(response):
+            self.interval = self.min_interval
+            if self.on_sync is not None:
+                self._schedule(self._call_on_sync, response)
+        else:
+            self.empty_syncs += 1
+            self.interval = min(self.max_interval, self.interval * self.factor)
+        return response
+
+    def _schedule(self, func, *args):
+        self._callbacks.put((func, args))
+
+    def _call_on_sync(self, response):
+        try:
+            self.on_sync(self.api, response)
+        except Exception as e:
+            self._error(e)
+
+    def _error(self, e):
+        self.last_error = e
+        if self.on_error is not None:
+            self.on_error(e)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                self._woken = False
+            self.poll()
+            with self._cond:
+                deadline = _now() + self.interval
+                while not self._stopped and not self._woken:
+                    timeout = deadline - _now()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+
+    def _run_callbacks(self):
+        while True:
+            callback = self._callbacks.get()
+            if callback is None:
+                return
+            func, args = callback
+            try:
+                func(*args)
+            except Exception:
+                pass  # on_error itself failed: nothing left to report to
@@ -0,0 +1,343 @@
+"""
+Syncing of many accounts at once.
+
+A `SyncPool` keeps the API objects of many accounts, and syncs them
+concurrently on a pool of threads.  All the API objects share a single HTTP
+session, whose connection pool is bounded per host.
+
+Usage example.
+
+```python
+from todoist.pool import SyncPool
+pool = SyncPool(max_workers=16)
+for token in tokens:
+    pool.add(token)
+
+results = pool.sync_all()  # token -> response, or the exception raised
+print(pool.stats[tokens[0]].as_dict())
+```
+
+A `StatePool` keeps the API objects of the most recently used accounts in
+memory, up to a budget in bytes, and spills the others to the disk cache.
+
+```python
+from todoist.pool import StatePool
+states = StatePool(max_bytes=512 * 1024 * 1024)
+api = states.sync(token)  # loaded from the cache if needed, then synced
+```
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from todoist.api import TodoistAPI
+from todoist.memory import approximate_size
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue  # type: ignore
+
+_now = getattr(time, "monotonic", time.time)
+
+
+class LatencyStats(object):
+    """
+    Latency statistics of the syncs of an account.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self.last_synced = None  # when the last sync started
+
+    def record(self, latency, error=False):
+        self.count += 1
+        self.total += latency
+        self.last = latency
+        self.max = max(self.max, latency)
+        if error:
+            self.errors += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "last": self.last,
+            "mean": self.mean,
+            "max": self.max,
+        }
+
+
+class SyncPool(object):
+    """
+    Keeps the API objects of many accounts, and syncs them concurrently on
+    up to `max_workers` threads.  All of them share one `requests.Session`,
+    which opens at most `max_connections` connections to each host (by
+    default, one per worker), and keeps the pools of up to `max_hosts` hosts.
+    Other keyword arguments are passed to the API objects.
+    """
+
+    def __init__(
+        self, max_workers=8, max_connections=None, max_hosts=10, session=None, **kwargs
+    ):
+        self.max_workers = max_workers
+        self.session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(
+                pool_connections=max_hosts,
+                pool_maxsize=max_connections or max_workers,
+                pool_block=True,
+            )
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self.api_kwargs = kwargs
+        self.accounts = {}  # token -> API object
+        self.stats = {}  # token -> LatencyStats
+        self._lock = threading.Lock()
+
+    def add(self, token, **kwargs):
+        """
+        Adds an account to the pool, and returns its API object.
+        """
+        api_kwargs = dict(self.api_kwargs)
+        api_kwargs.update(kwargs)
+        api = TodoistAPI(token, session=self.session, **api_kwargs)
+        with self._lock:
+            self.accounts[token] = api
+            self.stats.setdefault(token, LatencyStats())
+        return api
+
+    def remove(self, token):
+        """
+        Removes an account from the pool.
+        """
+        with self._lock:
+            self.stats.pop(token, None)
+            return self.accounts.pop(token, None)
+
+    def get(self, token):
+        return self.accounts.get(token)
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def __contains__(self, token):
+        return token in self.accounts
+
+    def sync_all(self, tokens=None):
+        """
+        Syncs the specified accounts (by default, all of them) concurrently,
+        and returns the response of each sync, or the exception it raised, by
+        token.
+
+        Accounts are scheduled by the time of their last sync, the ones that
+        waited the longest first, so that none of them starves when the pool
+        is too busy to get through all of them in time.
+        """
+        with self._lock:
+            if tokens is None:
+                tokens = list(self.accounts)
+            tokens = [token for token in tokens if token in self.accounts]
+            tokens.sort(key=self._schedule_key)
+
+        pending = queue.Queue()
+        for token in tokens:
+            pending.put(token)
+        results = {}
+
+        def work():
+            while True:
+                try:
+                    token = pending.get_nowait()
+                except queue.Empty:
+                    return
+                results[token] = self._sync_account(token)
+
+        workers = [
+            threading.Thread(target=work, name="todoist-sync-pool")
+            for _ in range(min(self.max_workers, len(tokens)))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+    def _schedule_key(self, token):
+        last_synced = self.stats[token].last_synced
+        return (last_synced is not None, last_synced or 0)
+
+    def _sync_account(self, token):
+        api = self.accounts.get(token)
+        stats = self.stats.get(token)
+        if api is None or stats is None:
+            return None  # removed in the meantime
+        start = stats.last_synced = _now()
+        try:
+            result = api.sync()
+        except Exception as e:
+            result = e
+        stats.record(_now() - start, error=isinstance(result, Exception))
+        return result
+
+
+class StatePool(object):
+    """
+    Keeps the API objects of the most recently used accounts in memory, as
+    long as the approximate size of their states fits in `max_bytes`.  The
+    least recently used accounts are evicted beyond that: their state is
+    written to the disk cache, and read back the next time they're accessed,
+    sync token included, so that their next sync is incremental.
+
+    Accounts with uncommitted commands are only evicted if their queue is
+    persisted as well.  Other keyword arguments are passed to the API
+    objects.
+    """
+
+    def __init__(self, max_bytes, cache="~/.todoist-sync/", **kwargs):
+        if not cache:
+            raise ValueError("StatePool requires a cache directory")
+        self.max_bytes = max_bytes
+        self.api_kwargs = dict(kwargs, cache=cache)
+        self.accounts = OrderedDict()  # token -> API object, least recent first
+        self.sizes = {}  # token -> approximate size of the state
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._evicting = {}  # token -> (API object, size) being written out
+        self._lock = threading.RLock()
+
+    def get(self, token):
+        """
+        Returns the API object of an account, reading it from the cache if
+        it's not in memory, and marks it as the most recently used.
+        """
+        with self._lock:
+            api = self.accounts.pop(token, None)
+            if api is None and token in self._evicting:
+                # Still being written to the cache: taken back as is.
+                api, size = self._evicting.pop(token)
+                self.sizes[token] = size
+                self.size_bytes += size
+            if api is not None:
+                self.hits += 1
+                self.accounts[token] = api
+                return api
+            self.misses += 1
+            api = TodoistAPI(token, **self.api_kwargs)
+            self.accounts[token] = api
+            self.sizes[token] = 0
+        self.update_size(token)
+        return api
+
+    def sync(self, token, **kwargs):
+        """
+        Syncs an account, and returns its API object.
+        """
+        api = self.get(token)
+        api.sync(**kwargs)
+        self.update_size(token)
+        return api
+
+    def update_size(self, token):
+        """
+        Measures again the state of an account, after it changed, and evicts
+        other accounts if the pool went over its budget.
+        """
+        with self._lock:
+            api = self.accounts.get(token)
+        if api is None:
+            return
+        # Walking the whole state is slow, so the other accounts of the pool
+        # aren't blocked meanwhile.
+        with api._sync_lock:
+            size = approximate_size(api.state)
+        with self._lock:
+            if self.accounts.get(token) is not api:
+                return
+            self.size_bytes += size - self.sizes[token]
+            self.sizes[token] = size
+            evicted = self._evict()
+        for token in evicted:
+            self._write_out(token)
+
+    def remove(self, token):
+        """
+        Removes an account from the pool, after writing it to the cache.
+        """
+        with self._lock:
+            api = self._take_out(token)
+        if api is not None:
+            self._write_out(token)
+        return api
+
+    def stats(self):
+        with self._lock:
+            return {
+                "accounts": len(self.accounts),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def __contains__(self, token):
+        return token in self.accounts
+
+    def _evict(self):
+        """
+        Takes out the least recently used accounts while the pool is over its
+        budget, and returns their tokens, for them to be written out.
+        """
+        evicted = []
+        # The most recently used account always stays, even if it's larger
+        # than the whole budget.
+        for token in list(self.accounts)[:-1]:
+            if self.size_bytes <= self.max_bytes:
+                break
+            api = self.accounts[token]
+            if api.queue and api.queue.journal is None:
+                continue  # the queued commands would be lost
+            self._take_out(token)
+            self.evictions += 1
+            evicted.append(token)
+        return evicted
+
+    def _take_out(self, token):
+        api = self.accounts.pop(token, None)
+        if api is not None:
+            size = self.sizes.pop(token)
+            self.size_bytes -= size
+            self._evicting[token] = (api, size)
+        return api
+
+    def _write_out(self, token):
+        """
+        Writes an account taken out to the cache, outside of the lock of the
+        pool, but not while it's syncing.
+        """
+        with self._lock:
+            api, _ = self._evicting.get(token, (None, None))
+        if api is None:
+            return
+        with api._sync_lock:
+            api._write_cache()
+        with self._lock:
+            if self._evicting.get(token, (None,))[0] is api:
+                del self._evicting[token]
@@ -0,0 +1,391 @@
+"""
+Incremental syncs pushed by the server, instead of polling.
+
+Once synced, the `user` object holds a `websocket_url`, on which the server
+notifies the clients of the account whenever something changed.  The
+listener here connects to it from a background thread, and syncs when a
+notification arrives.  Notifications arriving in bursts are debounced: the
+sync only runs once no other one arrived for `debounce` seconds, or once the
+first one of the burst has waited for `max_delay` seconds.
+
+Usage example.
+
+```python
+import todoist
+api = todoist.TodoistAPI(token)
+api.sync()
+api.enable_push(debounce=0.5, on_sync=lambda api: print("synced"))
+...
+api.disable_push()
+```
+"""
+import base64
+import hashlib
+import json
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+
+from todoist.backoff import Backoff
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:  # Python 2
+    from urlparse import urlsplit  # type: ignore
+
+_now = getattr(time, "monotonic", time.time)
+
+_WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+#: Types of the notifications meaning that the account changed.
+SYNC_NOTIFICATIONS = ("sync_needed", "agenda_updated")
+
+
+class WebSocketError(Exception):
+    pass
+
+
+class WebSocketConnection(object):
+    """
+    Minimal client side of a websocket (RFC 6455), enough to receive the
+    notifications of the server: it reads text and binary messages, answers
+    pings, and closes cleanly.
+    """
+
+    def __init__(self, url, timeout=30.0):
+        parts = urlsplit(url)
+        if parts.scheme not in ("ws", "wss"):
+            raise WebSocketError("Unsupported websocket URL: %r" % url)
+        secure = parts.scheme == "wss"
+        port = parts.port or (443 if secure else 80)
+        sock = socket.create_connection((parts.hostname, port), timeout)
+        if secure:
+            context = ssl.create_default_context()
+            sock = context.wrap_socket(sock, server_hostname=parts.hostname)
+        self.sock = sock
+        self._buf = b""
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        host = parts.hostname if parts.port is None else parts.netloc
+        try:
+            self._handshake(host, path)
+        except Exception:
+            self.sock.close()
+            raise
+        self.sock.settimeout(None)
+
+    def _handshake(self, host, path):
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        request = (
+            "GET %s HTTP/1.1\r\n"
+            "Host: %s\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            "Sec-WebSocket-Key: %s\r\n"
+            "Sec-WebSocket-Version: 13\r\n"
+            "\r\n" % (path, host, key)
+        )
+        self.sock.sendall(request.encode("ascii"))
+        while b"\r\n\r\n" not in self._buf:
+            self._fill()
+        head, self._buf = self._buf.split(b"\r\n\r\n", 1)
+        lines = head.decode("latin-1").split("\r\n")
+        status = lines[0].split(" ")
+        if len(status) < 2 or status[1] != "101":
+            raise WebSocketError("Handshake failed: %s" % lines[0])
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        digest = hashlib.sha1((key + _WEBSOCKET_GUID).encode("ascii")).digest()
+        accept = base64.b64encode(digest).decode("ascii")
+        if headers.get("sec-websocket-accept") != accept:
+            raise WebSocketError("Handshake failed: invalid Sec-WebSocket-Accept")
+
+    def _fill(self):
+        data = self.sock.recv(4096)
+        if not data:
+            raise WebSocketError("Connection closed")
+        self._buf += data
+
+    def _read(self, size):
+        while len(self._buf) < size:
+            self._fill()
+        data, self._buf = self._buf[:size], self._buf[size:]
+        return data
+
+    def _read_frame(self):
+        first, second = struct.unpack("!BB", self._read(2))
+        fin = bool(first & 0x80)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", self._read(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", self._read(8))
+        mask = self._read(4) if second & 0x80 else None
+        payload = self._read(length)
+        if mask:
+            payload = _apply_mask(payload, mask)
+        return fin, opcode, payload
+
+    def send(self, payload, opcode=OPCODE_TEXT):
+        """
+        Sends a single frame, masked as clients have to.
+        """
+        if not isinstance(payload, bytes):
+            payload = payload.encode("utf-8")
+        header = struct.pack("!B", 0x80 | opcode)
+        length = len(payload)
+        if length < 126:
+            header += struct.pack("!B", 0x80 | length)
+        elif length < 1 << 16:
+            header += struct.pack("!BH", 0x80 | 126, length)
+        else:
+            header += struct.pack("!BQ", 0x80 | 127, length)
+        mask = os.urandom(4)
+        self.sock.sendall(header + mask + _apply_mask(payload, mask))
+
+    def recv(self):
+        """
+        Returns the next message, as a string for text messages and as bytes
+        for binary ones, or None once the server closed the connection.
+        """
+        message = b""
+        message_opcode = None
+        while True:
+            fin, opcode, payload = self._read_frame()
+            if opcode == OPCODE_PING:
+                self.send(payload, OPCODE_PONG)
+                continue
+            if opcode == OPCODE_PONG:
+                continue
+            if opcode == OPCODE_CLOSE:
+                try:
+                    self.send(payload[:2], OPCODE_CLOSE)
+                except (socket.error, OSError):
+                    pass
+                self.close()
+                return None
+            if opcode != OPCODE_CONTINUATION:
+                message_opcode = opcode
+            message += payload
+            if fin:
+                if message_opcode == OPCODE_TEXT:
+                    return message.decode("utf-8")
+                return message
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except (socket.error, OSError):
+            pass
+        self.sock.close()
+
+
+def _apply_mask(payload, mask):
+    mask = bytearray(mask)
+    data = bytearray(payload)
+    for i in range(len(data)):
+        data[i] ^= mask[i % 4]
+    return bytes(data)
+
+
+class PushListener(object):
+    """
+    Listens to the websocket of an account from a background thread, and
+    syncs the API object when the server notifies of a change.
+
+    `on_sync` is called with the API object after each sync, and `on_error`
+    with the exceptions raised while syncing or listening.  The connection is
+    opened again, with backoff, when it's lost, and an extra sync then makes
+    up for the notifications that may have been missed in the meantime.
+    """
+
+    def __init__(
+        self,
+        api,
+        url=None,
+        debounce=1.0,
+        max_delay=5.0,
+        on_sync=None,
+        on_error=None,
+        backoff=None,
+    ):
+        if url is None:
+            url = (api.state.get("user") or {}).get("websocket_url")
+            if not url:
+                raise ValueError("No websocket_url: the user must be synced first")
+        self.api = api
+        self.url = url
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.on_sync = on_sync
+        self.on_error = on_error
+        self.backoff = backoff or Backoff(base=1.0, max_delay=60.0)
+        self.last_error = None
+
+        # metrics
+        self.notifications = 0
+        self.syncs = 0
+        self.connections = 0
+
+        self._cond = threading.Condition()
+        self._first_notified = None
+        self._last_notified = None
+        self._stopped = False
+        self._connection = None
+        self._listener = None
+        self._syncer = None
+
+    def start(self):
+        """
+        Starts the background threads.
+        """
+        if self._listener is not None:
+            return
+        self._stopped = False
+        self._listener = threading.Thread(target=self._listen, name="todoist-push")
+        self._listener.daemon = True
+        self._syncer = threading.Thread(target=self._run, name="todoist-push-sync")
+        self._syncer.daemon = True
+        self._listener.start()
+        self._syncer.start()
+
+    def stop(self):
+        """
+        Closes the connection and stops the background threads.
+        """
+        if self._listener is None:
+            return
+        with self._cond:
+            self._stopped = True
+            connection = self._connection
+            self._cond.notify_all()
+        if connection is not None:
+            connection.close()
+        self._listener.join()
+        self._syncer.join()
+        self._listener = self._syncer = None
+
+    def notify(self):
+        """
+        Records a change notification, and schedules a sync.
+        """
+        with self._cond:
+            self.notifications += 1
+            self._last_notified = _now()
+            if self._first_notified is None:
+                self._first_notified = self._last_notified
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            "connections": self.connections,
+            "notifications": self.notifications,
+            "syncs": self.syncs,
+        }
+
+    def _error(self, e):
+        self.last_error = e
+        if self.on_error is not None:
+            self.on_error(e)
+
+    def _listen(self):
+        attempt = 0
+        while not self._stopped:
+            try:
+                connection = WebSocketConnection(self.url)
+            except Exception as e:
+                self._error(e)
+                self._wait(self.backoff.delay(attempt))
+                attempt += 1
+                continue
+            with self._cond:
+                if self._stopped:
+                    connection.close()
+                    return
+                self._connection = connection
+            attempt = 0
+            self.connections += 1
+            if self.connections > 1:
+                self.notify()  # catch up with what was missed while offline
+            try:
+                while True:
+                    message = connection.recv()
+                    if message is None:
+                        break
+                    if self._is_sync_notification(message):
+                        self.notify()
+            except Exception as e:
+                if not self._stopped:
+                    self._error(e)
+            finally:
+                with self._cond:
+                    self._connection = None
+                connection.close()
+            self._wait(self.backoff.delay(attempt))
+
+    def _is_sync_notification(self, message):
+        if isinstance(message, bytes):
+            message = message.decode("utf-8", "replace")
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return True  # unknown format: better safe than sorry
+        if not isinstance(data, dict) or "type" not in data:
+            return True
+        return data["type"] in SYNC_NOTIFICATIONS
+
+    def _wait(self, delay):
+        with self._cond:
+            if not self._stopped:
+                self._cond.wait(delay)
+
+    def _is_due(self):
+        if self._first_notified is None:
+            return False
+        now = _now()
+        return (
+            now - self._last_notified >= self.debounce
+            or now - self._first_notified >= self.max_delay
+        )
+
+    def _timeout(self):
+        if self._first_notified is None:
+            return None
+        return max(
+            0,
+            min(
+                self._last_notified + self.debounce,
+                self._first_notified + self.max_delay,
+            )
+            - _now(),
+        )
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not self._is_due():
+                    self._cond.wait(self._timeout())
+                if self._stopped:
+                    return
+                self._first_notified = self._last_notified = None
+            try:
+                self.api.sync()
+                self.syncs += 1
+                if self.on_sync is not None:
+                    self.on_sync(self.api)
+            except Exception as e:
+                self._error(e)
@@ -0,0 +1,143 @@
+"""
+Client-side rate limiting of the requests sent to the server.
+
+A `RateLimiter` is a token bucket: it holds up to `burst` tokens, refilled at
+`rate` tokens per second, and every request takes one.  When the bucket is
+empty, requests wait in line for their token instead of being sent, and
+failing.  When the server answers with a 429 status anyway, the requests are
+paused for as long as its `Retry-After` header says, and resent.
+
+Usage example.
+
+```python
+import todoist
+api = todoist.TodoistAPI(token, rate_limiter=True)  # shared by token
+api2 = todoist.TodoistAPI(token, rate_limiter=True)
+assert api.rate_limiter is api2.rate_limiter
+print(api.rate_limiter.stats())
+```
+"""
+import email.utils
+import threading
+import time
+import weakref
+
+from todoist.metrics import DURATION_BUCKETS, Histogram
+
+_now = getattr(time, "monotonic", time.time)
+
+#: Default rate, in requests per second.
+DEFAULT_RATE = 50 / 60.0
+#: Default number of requests which can be sent at once.
+DEFAULT_BURST = 10
+
+
+class RateLimiter(object):
+    """
+    Token bucket holding up to `burst` tokens, refilled at `rate` tokens per
+    second.  Requests answered with a 429 status are resent up to
+    `max_retries` times.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_retries=3):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.tokens = float(burst)
+
+        # metrics
+        self.requests = 0
+        self.waits = 0
+        self.rate_limited = 0
+        self.wait_times = Histogram(DURATION_BUCKETS)
+
+        self._lock = threading.Lock()
+        self._updated = _now()
+        self._paused_until = 0.0
+
+    def acquire(self):
+        """
+        Takes a token, waiting in line for it if the bucket is empty, and
+        returns how long it waited.
+        """
+        with self._lock:
+            now = self._refill()
+            # Tokens can be taken in advance, so that the waiting requests
+            # are sent in order.
+            self.tokens -= 1
+            wait = max(-self.tokens / self.rate, self._paused_until - now)
+            self.requests += 1
+            if wait > 0:
+                self.waits += 1
+        waited = 0.0
+        if wait > 0:
+            start = _now()
+            while wait > 0:
+                time.sleep(wait)
+                # The server may have asked to pause in the meantime.
+                with self._lock:
+                    wait = self._paused_until - _now()
+            waited = _now() - start
+        self.wait_times.observe(waited)
+        return waited
+
+    def pause(self, delay):
+        """
+        Holds all the requests for `delay` seconds, after the server
+        reported that the rate limit was reached.
+        """
+        with self._lock:
+            self.rate_limited += 1
+            now = self._refill()
+            self._paused_until = max(self._paused_until, now + delay)
+            self.tokens = min(self.tokens, 0.0)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "waits": self.waits,
+            "rate_limited": self.rate_limited,
+            "wait_times": self.wait_times.as_dict(),
+        }
+
+    def _refill(self):
+        now = _now()
+        elapsed = now - self._updated
+        self._updated = now
+        self.tokens = min(float(self.burst), self.tokens + elapsed * self.rate)
+        return now
+
+
+# token -> RateLimiter, as long as an API object (or anything else) uses it, so
+# that the limiters of the accounts no longer used don't pile up.
+_shared_limiters = weakref.WeakValueDictionary()
+_shared_limiters_lock = threading.Lock()
+
+
+def get_shared_limiter(token, **kwargs):
+    """
+    Returns the rate limiter shared by all the API objects using the
+    specified token, creating it with the specified arguments if needed.
+    """
+    with _shared_limiters_lock:
+        limiter = _shared_limiters.get(token)
+        if limiter is None:
+            limiter = _shared_limiters[token] = RateLimiter(**kwargs)
+        return limiter
+
+
+def parse_retry_after(value):
+    """
+    Returns the delay in seconds specified by a `Retry-After` header, either
+    as a number of seconds or as an HTTP date, or None if it can't be parsed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(parsed) - time.time())
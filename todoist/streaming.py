@@ -0,0 +1,117 @@
+"""
+Incremental parsing of sync responses.
+
+A sync response is a JSON object whose largest members are the arrays of
+objects (`items`, `notes`, ...).  Instead of loading the whole body, and then
+decoding all of it at once, the parser here reads the body chunk by chunk and
+yields the members of the top-level object one by one, and the elements of
+the top-level arrays one by one, so that each of them can be merged into the
+local state and forgotten right away.  Peak memory is then bounded by the
+largest single object, rather than by the size of the response.
+"""
+import codecs
+import json
+
+_WHITESPACE = " \t\n\r"
+
+#: Marks the elements of top-level arrays in the events yielded by the parser.
+ARRAY_ELEMENT = "element"
+#: Marks the other top-level values in the events yielded by the parser.
+VALUE = "value"
+
+
+class _Reader(object):
+    """
+    Buffer over an iterator of byte chunks, decoded as UTF-8.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Reads one more chunk, returning False at the end of the stream.
+        """
+        if self.eof:
+            return False
+        # Forget what was consumed already, not to grow the buffer forever.
+        consumed, self.pos = self.pos, 0
+        self.buf = self.buf[consumed:]
+        for chunk in self.chunks:
+            if chunk:
+                self.buf += self.decoder.decode(chunk)
+                return True
+        self.buf += self.decoder.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self):
+        """
+        Returns the next non-whitespace character, without consuming it.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError("Expecting one of %r, got %r" % (chars, char))
+        self.pos += 1
+        return char
+
+    def decode(self, decoder):
+        """
+        Decodes the next JSON value, reading more chunks until it's complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self.fill():
+                    continue
+                raise
+            # A number at the end of the buffer may go on in the next chunk.
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_object(chunks, decoder=None):
+    """
+    Parses a JSON object from an iterator of byte chunks, and yields
+    `(key, value, kind)` events: each element of a top-level array is yielded
+    with the `ARRAY_ELEMENT` kind, and the other top-level values with the
+    `VALUE` kind.  An empty array yields nothing.
+    """
+    decoder = decoder or json.JSONDecoder()
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode(decoder)
+        reader.expect(":")
+        if reader.peek() == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.decode(decoder), ARRAY_ELEMENT
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            yield key, reader.decode(decoder), VALUE
+        if reader.expect(",}") == "}":
+            return